@@ -0,0 +1,205 @@
+"""
+POST /predict under overload, with admission control off and on.
+
+    capacity   closed loop: --clients clients back to back for --seconds with
+               admission off; completed requests per second is the capacity
+    load       open loop: requests arrive as a Poisson process at each of
+               --loads times the capacity for --seconds. Latency counts from
+               the scheduled arrival, so a backlog shows up in it instead of
+               slowing the arrivals down. Every answer is sorted into full,
+               degraded (X-Degraded) or shed (429/503) and p50/p99 reported
+               for all of them and for the served ones. --deadline-ms
+               sends a tighter deadline than the server's default, to see
+               the degraded path take over from the queue
+    degraded   agreement of the first --degraded-trees trees with the whole
+               forest on rows sampled from stress_data.csv
+
+Requests go straight into the ASGI app in-process, without an HTTP client,
+so the load generator takes as little of the CPU as it can:
+
+    python benchmark_admission.py --loads 0.5 1 5 --seconds 5
+    python benchmark_admission.py --loads 5 --deadline-ms 25
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, ".."))
+from utils.feature_spec import FEATURE_COLUMNS, LABEL_COLUMNS
+
+DATA_PATH = os.path.join(BASE_DIR, "..", "training", "stress_data.csv")
+
+
+def load_payloads(path: str) -> list:
+    with open(path, newline="") as f:
+        return [
+            {k: row[k] if k in LABEL_COLUMNS else int(float(row[k])) for k in FEATURE_COLUMNS}
+            for row in csv.DictReader(f)
+        ]
+
+
+async def post(app, path: str, body: bytes, headers=()) -> tuple:
+    """(status, degraded) of one request, sent to the app as raw ASGI messages."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *headers],
+        "client": ("bench", 1), "server": ("bench", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    response = {}
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["degraded"] = any(name == b"x-degraded" for name, _ in message["headers"])
+
+    await app(scope, receive, send)
+    return response["status"], response["degraded"]
+
+
+async def closed_loop(app, bodies: list, clients: int, seconds: float) -> float:
+    done = 0
+    stop = time.perf_counter() + seconds
+
+    async def client(offset):
+        nonlocal done
+        i = offset
+        while time.perf_counter() < stop:
+            status, _ = await post(app, "/predict", bodies[i % len(bodies)])
+            assert status == 200, status
+            done += 1
+            i += clients
+    started = time.perf_counter()
+    await asyncio.gather(*[client(n) for n in range(clients)])
+    return done / (time.perf_counter() - started)
+
+
+async def open_loop(app, bodies: list, rate: float, seconds: float, seed: int, headers=()) -> dict:
+    rng = np.random.default_rng(seed)
+    arrivals = np.cumsum(rng.exponential(1.0 / rate, int(rate * seconds * 1.2) + 10))
+    arrivals = arrivals[arrivals < seconds]
+    latency = np.empty(len(arrivals))
+    kind = np.empty(len(arrivals), dtype=object)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    async def one(i):
+        status, degraded = await post(app, "/predict", bodies[i % len(bodies)], headers)
+        latency[i] = loop.time() - start - arrivals[i]
+        kind[i] = "shed" if status in (429, 503) else "degraded" if degraded else "full" if status == 200 else str(status)
+
+    tasks = []
+    for i, at in enumerate(arrivals):
+        delay = start + at - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(i)))
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+
+    def percentiles(mask):
+        values = latency[mask] * 1e3
+        if not len(values):
+            return {"p50_ms": None, "p99_ms": None, "max_ms": None}
+        return {"p50_ms": float(np.percentile(values, 50)), "p99_ms": float(np.percentile(values, 99)),
+                "max_ms": float(values.max())}
+
+    served = (kind == "full") | (kind == "degraded")
+    return {
+        "offered_rps": len(arrivals) / seconds,
+        "requests": len(arrivals),
+        "drain_seconds": elapsed - seconds,
+        "outcomes": {name: int((kind == name).sum()) for name in sorted(set(kind))},
+        "full_rps": float((kind == "full").sum() / elapsed),
+        "all": percentiles(np.ones(len(kind), dtype=bool)),
+        "served": percentiles(served),
+    }
+
+
+def degraded_agreement(bundle, payloads: list, trees: list) -> dict:
+    X, _ = bundle.spec.encode_records(payloads)
+    full = bundle.forest.predict(X)
+    return {k: float((bundle.forest.head(k).predict(X) == full).mean()) for k in trees}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /predict with and without admission control")
+    parser.add_argument("--loads", type=float, nargs="+", default=[0.5, 1.0, 5.0], help="Offered load as multiples of capacity")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run")
+    parser.add_argument("--deadline-ms", type=float, help="Sent as X-Deadline-Ms; the server's default otherwise")
+    parser.add_argument("--clients", type=int, default=8, help="Closed-loop clients for the capacity run")
+    parser.add_argument("--degraded-trees", type=int, nargs="+", default=[5, 15, 30, 75])
+    parser.add_argument("--rows", type=int, default=5000, help="Rows resampled from stress_data.csv")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    os.environ.setdefault("MODEL_POLL_INTERVAL", "0")
+    import main as api
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(open(os.devnull, "w"))
+    api.request_log.slow_ms = float("inf")
+
+    bundle = api.model_service.bundle()
+    rng = np.random.default_rng(args.seed)
+    source = load_payloads(DATA_PATH)
+    payloads = [source[i] for i in rng.integers(0, len(source), args.rows)]
+    bodies = [json.dumps(p).encode() for p in payloads]
+
+    controller = api.admission
+    if controller is None:
+        print("❌ Admission control is off (ADMISSION_MAX_CONCURRENCY=0)")
+        return
+    api.admission = None
+    asyncio.run(closed_loop(api.app, bodies, args.clients, 1.0))
+    capacity = asyncio.run(closed_loop(api.app, bodies, args.clients, args.seconds))
+    print(f"📊 Capacity: {capacity:,.0f} requests/s ({args.clients} closed-loop clients, admission off)")
+
+    headers = [(b"x-deadline-ms", str(args.deadline_ms).encode())] if args.deadline_ms is not None else []
+    runs = []
+    for load in args.loads:
+        for name, value in (("off", None), ("on", controller)):
+            api.admission = value
+            result = asyncio.run(open_loop(api.app, bodies, capacity * load, args.seconds, args.seed, headers))
+            result.update(load=load, admission=name, deadline_ms=args.deadline_ms)
+            if value is not None:
+                result["service_ms"] = value.stats()["service_ms"]
+            runs.append(result)
+            outcomes = " ".join(f"{k}={v:,}" for k, v in result["outcomes"].items())
+            served = result["served"]
+            print(f"  {load:>4.1f}x admission {name:>3}: all p50 {result['all']['p50_ms']:9.2f} ms "
+                  f"p99 {result['all']['p99_ms']:9.2f} ms | served p99 "
+                  f"{served['p99_ms'] if served['p99_ms'] is not None else float('nan'):9.2f} ms | "
+                  f"full {result['full_rps']:6,.0f}/s | {outcomes}")
+    api.admission = controller
+
+    agreement = degraded_agreement(bundle, payloads, args.degraded_trees)
+    print(f"🌳 Degraded answers agree with all {bundle.forest.n_trees} trees: " +
+          ", ".join(f"{k} trees {share:.1%}" for k, share in agreement.items()))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "capacity_rps": capacity,
+                "admission": {key: value for key, value in controller.stats().items() if key != "queue_wait_ms"},
+                "runs": runs,
+                "degraded_agreement": agreement,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
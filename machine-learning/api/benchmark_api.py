@@ -0,0 +1,331 @@
+"""
+Load test for the prediction API.
+
+Drives api/main.py with --concurrency async clients for --duration seconds
+per scenario and reports throughput and p50/p95/p99 latency:
+
+    predict  POST /predict, one row per request sampled from stress_data.csv
+    batch    POST /predict/batch with --batch-size sampled rows per request
+    frame    POST /analyze/frame with frame.jpg as the raw body
+    swap     the predict load while a new model version is published into
+             MODEL_DIR every --swap-interval seconds, so the registry keeps
+             loading, validating and swapping bundles under traffic
+
+--target inprocess (default) imports main.app and calls it through httpx's
+ASGI transport: no sockets, one event loop shared with the clients.
+--target port starts uvicorn on a free local port in a subprocess. Either
+way the model files are copied into a scratch MODEL_DIR, so training/ is
+never touched. App settings (MICRO_BATCH_MAX_SIZE, PREDICTION_CACHE_SIZE,
+MODEL_FORMAT, ...) are taken from the environment and recorded in the report.
+
+    python benchmark_api.py --concurrency 32 --duration 10 --output baseline.json
+    python benchmark_api.py --output new.json --compare baseline.json
+
+With --compare the run exits non-zero when a scenario's throughput drops, or
+its p99 grows, by more than --tolerance percent.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRAINING_DIR = os.path.join(BASE_DIR, "..", "training")
+sys.path.append(os.path.join(BASE_DIR, ".."))
+
+SCENARIOS = ("predict", "batch", "frame", "swap")
+APP_SETTINGS = (
+    "MODEL_FORMAT", "MODEL_POLL_INTERVAL", "PREDICTION_CACHE_SIZE", "PREDICTION_CACHE_WARM",
+    "MICRO_BATCH_MAX_SIZE", "MICRO_BATCH_MAX_WAIT_MS", "CV_WORKERS", "WARMUP",
+)
+FEATURES = ("mood", "sleep_hours", "workload", "face_emotion", "blink_rate",
+            "caffeine_intake", "exercise_hours", "screen_time")
+
+
+def load_payloads(path: str) -> list:
+    with open(path, newline="") as f:
+        return [
+            {k: row[k] if k in ("mood", "face_emotion") else int(float(row[k])) for k in FEATURES}
+            for row in csv.DictReader(f)
+        ]
+
+
+def prepare_model_dir(directory: str) -> None:
+    """Publish the current training/ model into a scratch registry directory."""
+    import joblib
+    from utils.model_registry import publish_artifacts
+
+    model = joblib.load(os.path.join(TRAINING_DIR, "stress_model.pkl"))
+    encoders = joblib.load(os.path.join(TRAINING_DIR, "encoders.pkl"))
+    publish_artifacts(model, encoders, directory, version="bench0000")
+
+
+def publish_copies(directory: str, interval: float, stop: threading.Event, published: list) -> None:
+    """Re-publish the scratch model under a new version every interval seconds."""
+    import joblib
+    from utils.model_registry import publish_artifacts
+
+    model = joblib.load(os.path.join(directory, "stress_model-bench0000.pkl"))
+    encoders = joblib.load(os.path.join(directory, "encoders-bench0000.pkl"))
+    while not stop.wait(interval):
+        published.append(publish_artifacts(model, encoders, directory, version=f"bench{len(published) + 1:04d}"))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Target:
+    """An httpx client factory for the app under test."""
+
+    def __init__(self, kind: str, env: dict):
+        self.kind = kind
+        self.process = None
+        self.app = None
+        for key, value in env.items():
+            os.environ[key] = value
+        if kind == "inprocess":
+            started = time.perf_counter()
+            import main
+            self.app = main.app
+            main.model_service.start()
+            # Keep the app's per-request logging (it is part of its cost) but out of the terminal
+            for handler in logging.getLogger().handlers:
+                if isinstance(handler, logging.StreamHandler):
+                    handler.setStream(open(os.devnull, "w"))
+            self.startup_seconds = time.perf_counter() - started
+            self.base_url = "http://bench"
+        else:
+            port = free_port()
+            self.base_url = f"http://127.0.0.1:{port}"
+            started = time.perf_counter()
+            self.process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                 "--log-level", "warning"],
+                cwd=BASE_DIR, env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            self._wait_ready(120.0)
+            self.startup_seconds = time.perf_counter() - started
+
+    def _wait_ready(self, timeout: float) -> None:
+        import httpx
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {self.process.returncode}")
+            try:
+                if httpx.get(self.base_url + "/health", timeout=1.0).json().get("model_loaded"):
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError("API did not become healthy in time")
+
+    def client(self, concurrency: int):
+        import httpx
+
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        if self.app is not None:
+            return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url=self.base_url,
+                                     timeout=60.0)
+        return httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=60.0)
+
+    def close(self) -> None:
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(10)
+
+
+def request_factory(scenario: str, payloads: list, args, frame: bytes):
+    """Return (send(client, rng) -> (ok, rows))."""
+    if scenario in ("predict", "swap"):
+        async def send(client, rng):
+            response = await client.post("/predict", json=payloads[rng.integers(len(payloads))])
+            return response.status_code == 200 and "error" not in response.json(), 1
+    elif scenario == "batch":
+        async def send(client, rng):
+            batch = [payloads[i] for i in rng.integers(len(payloads), size=args.batch_size)]
+            response = await client.post("/predict/batch", json=batch)
+            return response.status_code == 200 and response.json()["errors"] == 0, len(batch)
+    else:
+        async def send(client, rng):
+            row = payloads[rng.integers(len(payloads))]
+            params = {k: v for k, v in row.items() if k not in ("mood", "face_emotion")}
+            response = await client.post("/analyze/frame", content=frame, params=params,
+                                         headers={"Content-Type": "image/jpeg"})
+            return response.status_code == 200 and all("error" not in r for r in response.json()["results"]), 1
+    return send
+
+
+async def drive(target: Target, send, concurrency: int, duration: float, warmup: float, seed: int) -> dict:
+    latencies, errors, rows = [], 0, 0
+    recording = False
+
+    async def worker(index: int, client, stop_at: float):
+        nonlocal errors, rows
+        rng = np.random.default_rng(seed + index)
+        loop = asyncio.get_running_loop()
+        while loop.time() < stop_at:
+            start = time.perf_counter()
+            try:
+                ok, n = await send(client, rng)
+            except Exception:
+                ok, n = False, 0
+            if recording:
+                latencies.append(time.perf_counter() - start)
+                errors += not ok
+                rows += n
+
+    async with target.client(concurrency) as client:
+        loop = asyncio.get_running_loop()
+        if warmup > 0:
+            await asyncio.gather(*[worker(i, client, loop.time() + warmup) for i in range(concurrency)])
+        recording = True
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(i, client, loop.time() + duration) for i in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rows": rows,
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed,
+        "rows_per_second": rows / elapsed,
+        "latency_ms": {
+            "mean": float(latencies_ms.mean()) if len(latencies_ms) else None,
+            "p50": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else None,
+            "p95": float(np.percentile(latencies_ms, 95)) if len(latencies_ms) else None,
+            "p99": float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else None,
+            "max": float(latencies_ms.max()) if len(latencies_ms) else None,
+        },
+    }
+
+
+async def health(target: Target) -> dict:
+    async with target.client(1) as client:
+        return (await client.get("/health")).json()
+
+
+def run_scenario(target: Target, scenario: str, payloads: list, frame: bytes, model_dir: str, args) -> dict:
+    send = request_factory(scenario, payloads, args, frame)
+    stop, published, publisher = threading.Event(), [], None
+    if scenario == "swap":
+        swaps_before = asyncio.run(health(target))["registry"]["swaps"]
+        publisher = threading.Thread(target=publish_copies, args=(model_dir, args.swap_interval, stop, published),
+                                     daemon=True)
+        publisher.start()
+    try:
+        result = asyncio.run(drive(target, send, args.concurrency, args.duration, args.warmup, args.seed))
+    finally:
+        stop.set()
+        if publisher is not None:
+            publisher.join()
+    if scenario == "swap":
+        time.sleep(args.poll_interval * 2)
+        result["versions_published"] = len(published)
+        result["swaps_observed"] = asyncio.run(health(target))["registry"]["swaps"] - swaps_before
+    if scenario == "batch":
+        result["batch_size"] = args.batch_size
+    return result
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Scenarios whose throughput fell, or p99 rose, by more than tolerance percent."""
+    for key in ("target", "concurrency", "settings"):
+        if report.get(key) != baseline.get(key):
+            print(f"  warning: {key} differs from the baseline ({baseline.get(key)} -> {report.get(key)})")
+    regressions = []
+    for name, new in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        throughput = (new["throughput_rps"] / old["throughput_rps"] - 1.0) * 100.0
+        p99 = (new["latency_ms"]["p99"] / old["latency_ms"]["p99"] - 1.0) * 100.0
+        flagged = throughput < -tolerance or p99 > tolerance
+        print(f"  {name:<8} throughput {throughput:+6.1f}%  p99 {p99:+6.1f}%  {'REGRESSION' if flagged else 'ok'}")
+        if flagged:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the stress prediction API")
+    parser.add_argument("--target", choices=["inprocess", "port"], default="inprocess")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds measured per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--swap-interval", type=float, default=1.0)
+    parser.add_argument("--poll-interval", type=float, default=0.25, help="MODEL_POLL_INTERVAL for the run")
+    parser.add_argument("--data", default=os.path.join(TRAINING_DIR, "stress_data.csv"))
+    parser.add_argument("--frame", default=os.path.join(BASE_DIR, "frame.jpg"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--compare", help="Baseline JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="Percent change allowed by --compare")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.data)
+    with open(args.frame, "rb") as f:
+        frame = f.read()
+
+    model_dir = tempfile.mkdtemp(prefix="stress-bench-")
+    target = None
+    try:
+        prepare_model_dir(model_dir)
+        env = {"MODEL_DIR": model_dir, "MODEL_POLL_INTERVAL": str(args.poll_interval)}
+        target = Target(args.target, env)
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "target": args.target,
+            "startup_seconds": target.startup_seconds,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "host": {"python": platform.python_version(), "cpus": os.cpu_count(), "platform": platform.platform()},
+            "settings": {key: os.environ.get(key) for key in APP_SETTINGS},
+            "scenarios": {},
+        }
+        for scenario in args.scenarios:
+            result = run_scenario(target, scenario, payloads, frame, model_dir, args)
+            report["scenarios"][scenario] = result
+            latency = result["latency_ms"]
+            extra = f", {result['swaps_observed']} swaps" if scenario == "swap" else ""
+            print(f"{scenario:<8} {result['throughput_rps']:8.1f} req/s {result['rows_per_second']:9.1f} rows/s | "
+                  f"p50 {latency['p50']:7.2f} ms  p95 {latency['p95']:7.2f} ms  p99 {latency['p99']:7.2f} ms | "
+                  f"{result['errors']} errors{extra}")
+    finally:
+        if target is not None:
+            target.close()
+        shutil.rmtree(model_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nAgainst {args.compare} (tolerance {args.tolerance:.0f}%):")
+        if compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Throughput and accuracy check for the streaming blink estimator.
+
+Without --video, a clip is recorded from frame.jpg with blinks injected
+every --blink-every seconds: the eye band is smoothed out for a few frames.
+The clip is then decoded and pushed through EyeOpennessTracker and
+BlinkRateEstimator with OpenCV pinned to one thread. The script reports the
+tracker frame rate, excluding decoding, and detected blinks against injected ones.
+
+    python benchmark_blink.py --seconds 30
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, ".."))
+from utils.cv_utils import BlinkRateEstimator, EyeOpennessTracker, detect_fatigue
+
+
+def record_blinking_clip(path: str, seconds: float, fps: float, blink_every: float, blink_frames: int) -> int:
+    frame = cv2.imread(os.path.join(BASE_DIR, "frame.jpg"))
+    x, y, w, h = EyeOpennessTracker()._locate_face(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    y0, y1 = y + h // 5, y + h // 2
+    x0, x1 = x + w // 8, x + w - w // 8
+    closed = frame.copy()
+    # A closed lid: the eye band loses its edges
+    closed[y0:y1, x0:x1] = cv2.blur(frame[y0:y1, x0:x1], (41, 41))
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (frame.shape[1], frame.shape[0]))
+    rng = np.random.default_rng(0)
+    period = int(blink_every * fps)
+    injected = 0
+    for i in range(int(seconds * fps)):
+        phase = i % period
+        is_closed = period // 2 <= phase < period // 2 + blink_frames
+        injected += phase == period // 2
+        base = closed if is_closed else frame
+        noise = rng.integers(-4, 5, frame.shape, dtype=np.int16)
+        writer.write(np.clip(base.astype(np.int16) + noise, 0, 255).astype(np.uint8))
+    writer.release()
+    return injected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming blink estimator")
+    parser.add_argument("--video", help="Recorded clip (default: synthesised from frame.jpg)")
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--blink-every", type=float, default=3.0)
+    parser.add_argument("--blink-frames", type=int, default=5)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        video, injected = args.video, None
+        if video is None:
+            video = os.path.join(tmp, "blinks.avi")
+            injected = record_blinking_clip(video, args.seconds, args.fps, args.blink_every, args.blink_frames)
+
+        cap = cv2.VideoCapture(video)
+        fps = cap.get(cv2.CAP_PROP_FPS) or args.fps
+        frames = []
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+
+    tracker = EyeOpennessTracker()
+    estimator = BlinkRateEstimator()
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        estimator.update(tracker.update(frame), i / fps)
+    elapsed = time.perf_counter() - start
+
+    snapshot = estimator.snapshot()
+    print(json.dumps({
+        "frames": len(frames),
+        "tracker_fps": len(frames) / elapsed,
+        "ms_per_frame": elapsed * 1000.0 / len(frames),
+        "injected_blinks": injected,
+        "detected_blinks": estimator.total_blinks,
+        "fatigue": detect_fatigue(snapshot),
+        **snapshot,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Import-to-first-response time of the API.
+
+Each run starts a fresh `uvicorn main:app` process on a free port and polls
+it, reporting the time from spawn to:
+
+    first response    GET /metrics answers (the app is imported and listening)
+    first prediction  POST /predict returns 200 (the model is loaded)
+    first legacy      POST /legacy/predict returns 200 (--legacy)
+
+plus the resident set size after those requests. The model is published into
+a scratch MODEL_DIR as in benchmark_api.py. App settings (MODEL_FORMAT,
+WARMUP, ...) come from the environment; --app-dir points at another checkout
+to measure it with the same harness.
+
+    python benchmark_cold_start.py --runs 5
+    MODEL_FORMAT=mmap python benchmark_cold_start.py --runs 5 --legacy
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmark_api import BASE_DIR, free_port, prepare_model_dir
+
+PAYLOAD = {
+    "mood": "sad", "sleep_hours": 5, "workload": 7, "face_emotion": "fear",
+    "blink_rate": 25, "caffeine_intake": 3, "exercise_hours": 0, "screen_time": 9,
+}
+LEGACY_PAYLOAD = {"mood": "sad", "sleep": 5.0, "workload": 7}
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def wait_listening(port: int, deadline: float, process) -> None:
+    """Poll with bare connects: a client per attempt would steal CPU from the starting server."""
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1.0).close()
+            return
+        except OSError:
+            time.sleep(0.01)
+    raise RuntimeError("API did not start listening in time")
+
+
+def cold_start(app_dir: str, env: dict, legacy: bool, timeout: float = 120.0) -> dict:
+    import httpx
+
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=app_dir, env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_listening(port, time.monotonic() + timeout, process)
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            client.get("/metrics")
+            result = {"first_response_s": time.perf_counter() - started}
+            response = client.post("/predict", json=PAYLOAD)
+            if response.status_code != 200 or "stress_level" not in response.json():
+                raise RuntimeError(f"/predict failed: {response.text}")
+            result["first_prediction_s"] = time.perf_counter() - started
+            if legacy:
+                response = client.post("/legacy/predict", json=LEGACY_PAYLOAD)
+                result["first_legacy_s"] = time.perf_counter() - started if response.status_code == 200 else None
+        result["rss_mb"] = rss_mb(process.pid)
+        return result
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API import-to-first-response time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--app-dir", default=BASE_DIR, help="Directory holding the main.py to start")
+    parser.add_argument("--legacy", action="store_true", help="Also time the first /legacy/predict")
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="stress-coldstart-") as model_dir:
+        prepare_model_dir(model_dir)
+        env = {"MODEL_DIR": model_dir, "MODEL_POLL_INTERVAL": "0", "PYTHONWARNINGS": "ignore"}
+        runs = [cold_start(os.path.abspath(args.app_dir), env, args.legacy) for _ in range(args.runs)]
+
+    settings = {key: os.environ.get(key) for key in ("MODEL_FORMAT", "WARMUP")}
+    print(f"Settings: {settings}, {args.runs} runs, median:")
+    report = {"settings": settings, "runs": runs, "median": {}}
+    for key in runs[0]:
+        values = [run[key] for run in runs if run[key] is not None]
+        if values:
+            report["median"][key] = float(np.median(values))
+            unit = "MB" if key == "rss_mb" else "s"
+            print(f"  {key:<20} {report['median'][key]:8.3f} {unit}")
+        else:
+            print(f"  {key:<20} unavailable")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
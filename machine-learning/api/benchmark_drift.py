@@ -0,0 +1,205 @@
+"""
+Cost and sensitivity of the drift monitor on the prediction path.
+
+    cost       DriftMonitor.observe() in a tight loop, for one row and per row
+               of 100-row batches, and from --threads threads at once (every
+               count must arrive: the threads share no counter)
+    latency    POST /predict through the full ASGI app in-process (httpx
+               ASGITransport) with --concurrency clients, in interleaved rounds
+               with the monitor off and on; p50 and p99 of each
+    detection  rows resampled from stress_data.csv, then the same rows
+               drifted (two hours less sleep, two points more workload, a
+               fifth of the face emotions unknown to the model) through a
+               fresh monitor against the model's training profile
+
+Run from the api/ directory after `python train_model.py profile` (or a
+training run) has written the model's drift profile:
+
+    python benchmark_drift.py --requests 2000 --rounds 5
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, ".."))
+from utils.drift_monitor import DriftMonitor, load_profile
+from utils.feature_spec import FEATURE_COLUMNS, LABEL_COLUMNS
+
+DATA_PATH = os.path.join(BASE_DIR, "..", "training", "stress_data.csv")
+
+
+def load_payloads(path: str) -> list:
+    with open(path, newline="") as f:
+        return [
+            {k: row[k] if k in LABEL_COLUMNS else int(float(row[k])) for k in FEATURE_COLUMNS}
+            for row in csv.DictReader(f)
+        ]
+
+
+def drifted(payload: dict, rng: np.random.Generator) -> dict:
+    payload = dict(payload, sleep_hours=payload["sleep_hours"] - 2, workload=payload["workload"] + 2)
+    if rng.random() < 0.2:
+        payload["face_emotion"] = "contempt"
+    return payload
+
+
+def observe_cost_us(monitor: DriftMonitor, X: np.ndarray, preds: np.ndarray, batch: int, iterations: int) -> float:
+    """Microseconds per row."""
+    remapped = np.zeros((batch, 2), dtype=bool)
+    rows = X[:batch]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        monitor.observe(rows, preds[:batch], remapped)
+    return (time.perf_counter() - start) / (iterations * batch) * 1e6
+
+
+def predict_cost_us(bundle, X: np.ndarray, iterations: int) -> float:
+    """The forest's own cost for one row, for scale."""
+    start = time.perf_counter()
+    for i in range(iterations):
+        bundle.forest.predict(X[i % len(X):i % len(X) + 1])
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def threaded_observe(monitor: DriftMonitor, X: np.ndarray, preds: np.ndarray, threads: int, per_thread: int) -> dict:
+    before = monitor.report()["rows"]
+    remapped = [(False, False)]
+
+    def work(offset):
+        for i in range(per_thread):
+            j = (offset + i) % len(X)
+            monitor.observe(X[j:j + 1], preds[j:j + 1], remapped)
+
+    workers = [threading.Thread(target=work, args=(n * 7,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    counted = monitor.report()["rows"] - before
+    return {"threads": threads, "rows_per_second": threads * per_thread / elapsed,
+            "expected_rows": threads * per_thread, "counted_rows": counted}
+
+
+async def time_requests(app, payloads: list, count: int, concurrency: int) -> np.ndarray:
+    import httpx
+
+    timings = np.empty(count)
+    queue = iter(range(count))
+
+    async def client_loop(client):
+        for i in queue:
+            start = time.perf_counter()
+            response = await client.post("/predict", json=payloads[i % len(payloads)])
+            timings[i] = time.perf_counter() - start
+            assert response.status_code == 200
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await asyncio.gather(*[client_loop(client) for _ in range(concurrency)])
+    return timings
+
+
+def detection(bundle, profile, payloads: list) -> dict:
+    results = {}
+    for name, rows in (("resampled", payloads), ("drifted", [drifted(p, np.random.default_rng(i)) for i, p in enumerate(payloads)])):
+        monitor = DriftMonitor(min_rows=1)
+        monitor.set_reference(bundle.spec, profile, bundle.version)
+        X, labels = bundle.spec.encode_records(rows)
+        remapped = [(row["mood"] != mapped["mood"], row["face_emotion"] != mapped["face_emotion"])
+                    for row, mapped in zip(rows, labels)]
+        monitor.observe(X, bundle.forest.predict(X), remapped)
+        report = monitor.report()
+        results[name] = {
+            "status": report["status"],
+            "psi": {col: round(entry["psi"], 4) for col, entry in report["features"].items()},
+            "prediction_psi": round(report["prediction"]["psi"], 4),
+            "face_emotion_remapped_share": report["features"]["face_emotion"]["remapped_share"],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the drift monitor's cost and sensitivity")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per configuration per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--rows", type=int, default=5000, help="Rows resampled from stress_data.csv")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    os.environ.setdefault("MODEL_POLL_INTERVAL", "0")
+    import main as api
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(open(os.devnull, "w"))
+
+    bundle = api.model_service.bundle()
+    profile = load_profile(api.MODEL_DIR, bundle.version)
+    if profile is None:
+        print(f"❌ No drift profile for version {bundle.version} in {api.MODEL_DIR}; run train_model.py profile")
+        return
+    rng = np.random.default_rng(args.seed)
+    source = load_payloads(DATA_PATH)
+    payloads = [source[i] for i in rng.integers(0, len(source), args.rows)]
+    X, _ = bundle.spec.encode_records(payloads)
+    preds = bundle.forest.predict(X)
+
+    monitor = DriftMonitor()
+    monitor.set_reference(bundle.spec, profile, bundle.version)
+    cost = {
+        "observe_one_us": observe_cost_us(monitor, X, preds, 1, 100_000),
+        "observe_batch_100_us_per_row": observe_cost_us(monitor, X, preds, 100, 2_000),
+        "predict_one_us": predict_cost_us(bundle, X, 5_000),
+        "counters_per_thread": 2 * monitor._state[0].size,
+        "threads": [threaded_observe(monitor, X, preds, n, 20_000) for n in args.threads],
+    }
+
+    enabled = api.drift_monitor
+    configs = {"off": None, "on": enabled}
+    samples = {name: [] for name in configs}
+    for name, value in configs.items():
+        api.drift_monitor = value
+        asyncio.run(time_requests(api.app, payloads, 200, args.concurrency))
+    for _ in range(args.rounds):
+        for name, value in configs.items():
+            api.drift_monitor = value
+            samples[name].append(asyncio.run(time_requests(api.app, payloads, args.requests, args.concurrency)))
+    api.drift_monitor = enabled
+    latency = {}
+    for name in configs:
+        timings = np.concatenate(samples[name]) * 1e3
+        latency[name] = {"p50_ms": float(np.percentile(timings, 50)), "p99_ms": float(np.percentile(timings, 99))}
+
+    report = {"cost": cost, "latency": latency, "detection": detection(bundle, profile, payloads)}
+    print(f"⏱️ observe(): {cost['observe_one_us']:.2f} us per single row, "
+          f"{cost['observe_batch_100_us_per_row']:.2f} us per row in batches of 100 "
+          f"(forest.predict of one row: {cost['predict_one_us']:.1f} us); "
+          f"{cost['counters_per_thread']} counters per thread")
+    for result in cost["threads"]:
+        print(f"  {result['threads']:>3} threads: {result['rows_per_second']:>10,.0f} rows/s, "
+              f"{result['counted_rows']:,} of {result['expected_rows']:,} rows counted")
+    for name, values in latency.items():
+        print(f"📊 monitor {name:>3}: p50 {values['p50_ms']:.3f} ms  p99 {values['p99_ms']:.3f} ms "
+              f"({args.concurrency} clients, {args.rounds} x {args.requests:,} requests)")
+    for name, result in report["detection"].items():
+        psi = " ".join(f"{col}={value:.3f}" for col, value in result["psi"].items())
+        print(f"🔍 {name:>9}: {result['status']:<12} prediction={result['prediction_psi']:.3f} {psi}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
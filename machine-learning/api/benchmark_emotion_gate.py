@@ -0,0 +1,193 @@
+"""
+CPU cost and label agreement of EmotionGate against per-frame inference.
+
+Without --video, a clip is recorded from frame.jpg: the head sways in the
+second half of every --phase-seconds period, and the expression cycles
+through neutral, happy (brighter lower face), neutral and sad (darker eye
+band) from one period to the next. The clip is decoded once. Then, with
+OpenCV pinned to one thread, every --stride-th frame is analysed twice:
+
+    per-frame  the model on the full frame, as mood.py did
+    gated      the same frames through EmotionGate
+
+The script reports process CPU time of each pass, the saving, and the share
+of frames where the gated (smoothed) label equals the per-frame label, raw
+and after the same majority vote the gate applies. On the synthesised clip
+both passes are also scored against the injected expressions.
+
+By default the model is a stand-in that does what DeepFace does on CPU in
+miniature: a full-resolution Haar detection (DeepFace's default opencv
+backend) and a dense network over a 48x48 face. Its label comes from the
+brightness of the lower face and eye band, so the injected expressions
+change it. Pass --deepface to measure the real model.
+
+    python benchmark_emotion_gate.py --seconds 20
+    python benchmark_emotion_gate.py --video recording.avi --deepface --stride 6
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, ".."))
+from utils.cv_utils import EmotionGate, EyeOpennessTracker, detector_pool
+from utils.frame_pipeline import deepface_emotion, deepface_face_emotion
+
+EXPRESSIONS = ("neutral", "happy", "neutral", "sad")
+
+
+def record_expression_clip(path: str, seconds: float, fps: float, phase_seconds: float) -> list:
+    """Write the clip; returns the injected expression of every frame."""
+    frame = cv2.imread(os.path.join(BASE_DIR, "frame.jpg"))
+    height, width = frame.shape[:2]
+    x, y, w, h = EyeOpennessTracker()._locate_face(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    faces = {"neutral": frame.astype(np.int16)}
+    # Changes the frontal-face cascade still detects: a brighter lower face, a darker eye band
+    for label, (top, bottom, inset, delta) in {"happy": (0.55, 0.95, 0.15, 20), "sad": (0.15, 0.45, 0.1, -8)}.items():
+        mask = np.zeros((height, width), dtype=np.float32)
+        mask[y + int(h * top):y + int(h * bottom), x + int(w * inset):x + w - int(w * inset)] = 1.0
+        mask = cv2.GaussianBlur(mask, (0, 0), w / 20)[..., None]
+        faces[label] = (frame + delta * mask).astype(np.int16)
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    rng = np.random.default_rng(0)
+    truth = []
+    for i in range(int(seconds * fps)):
+        t = i / fps
+        period, offset = divmod(t, phase_seconds)
+        truth.append(EXPRESSIONS[int(period) % len(EXPRESSIONS)])
+        base = faces[truth[-1]]
+        if offset >= phase_seconds / 2:
+            sway = np.sin(2 * np.pi * (offset - phase_seconds / 2) / phase_seconds)
+            shift = np.float32([[1, 0, 24 * sway], [0, 1, 6 * sway]])
+            base = cv2.warpAffine(base, shift, (width, height), borderMode=cv2.BORDER_REPLICATE)
+        noise = rng.integers(-4, 5, frame.shape, dtype=np.int16)
+        writer.write(np.clip(base + noise, 0, 255).astype(np.uint8))
+    writer.release()
+    return truth
+
+
+class StandInModel:
+    """Haar detection on the full frame plus a 48x48 dense network, labelled by region brightness."""
+
+    def __init__(self, margin: float = 0.2, hidden: int = 2048, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.margin = margin
+        self.w1 = rng.standard_normal((hidden, 48 * 48)).astype(np.float32) / 48
+        self.w2 = rng.standard_normal((len(EXPRESSIONS), hidden)).astype(np.float32)
+
+    def classify(self, image) -> str:
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        face = cv2.resize(gray, (48, 48), interpolation=cv2.INTER_AREA).astype(np.float32)
+        # The network only stands in for the cost of the real one
+        self.w2 @ np.maximum(self.w1 @ (face.ravel() / 255.0), 0.0)
+        eyes, lower = face[12:24, 10:38].mean(), face[30:44, 10:38].mean()
+        if lower - eyes < -6:
+            return "neutral"
+        return "happy" if eyes - face[12:44, 10:38].mean() < -0.8 else "sad"
+
+    def full(self, frame) -> str:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        with detector_pool.acquire() as face_cascade:
+            faces = face_cascade.detectMultiScale(gray, 1.1, 2, minSize=(30, 30))
+        if len(faces) == 0:
+            return self.classify(gray)
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        mx, my = int(w * self.margin), int(h * self.margin)
+        return self.classify(gray[max(0, y - my):y + h + my, max(0, x - mx):x + w + mx])
+
+    def face(self, crop) -> str:
+        return self.classify(crop)
+
+
+def smooth(labels, window: int) -> list:
+    """The gate's majority vote over every label: ties go to the most recent."""
+    recent, smoothed = deque(maxlen=window), []
+    for label in labels:
+        recent.append(label)
+        counts = Counter(recent)
+        best = max(counts.values())
+        smoothed.append(next(label for label in reversed(recent) if counts[label] == best))
+    return smoothed
+
+
+def agreement(a, b) -> float:
+    return float(np.mean([x == y for x, y in zip(a, b)]))
+
+
+def label_changes(labels) -> int:
+    return sum(a != b for a, b in zip(labels, labels[1:]))
+
+
+def timed(fn, frames) -> tuple:
+    started = time.process_time()
+    labels = [fn(frame) for frame in frames]
+    return labels, time.process_time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the EmotionGate against per-frame emotion inference")
+    parser.add_argument("--video", help="Recorded clip (default: synthesised from frame.jpg)")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--phase-seconds", type=float, default=4.0)
+    parser.add_argument("--stride", type=int, default=1, help="Analyse every Nth frame (6 = mood.py's 5 fps at 30 fps)")
+    parser.add_argument("--change-threshold", type=float, default=6.0)
+    parser.add_argument("--window", type=int, default=5)
+    parser.add_argument("--deepface", action="store_true")
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        video, truth = args.video, None
+        if video is None:
+            video = os.path.join(tmp, "expressions.avi")
+            truth = record_expression_clip(video, args.seconds, args.fps, args.phase_seconds)
+        cap = cv2.VideoCapture(video)
+        frames = []
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    frames = frames[::args.stride]
+    truth = truth[::args.stride] if truth else None
+
+    if args.deepface:
+        full_fn, face_fn = deepface_emotion, deepface_face_emotion
+    else:
+        model = StandInModel()
+        full_fn, face_fn = model.full, model.face
+    full_fn(frames[0])  # Load the model outside the timing
+
+    baseline, baseline_cpu = timed(full_fn, frames)
+    gate = EmotionGate(full_fn, face_fn, change_threshold=args.change_threshold, window=args.window)
+    gated, gated_cpu = timed(gate, frames)
+
+    print(json.dumps({
+        "frames": len(frames),
+        "model": "deepface" if args.deepface else "stand-in",
+        "per_frame_cpu_s": baseline_cpu,
+        "gated_cpu_s": gated_cpu,
+        "cpu_saving": 1.0 - gated_cpu / baseline_cpu if baseline_cpu else 0.0,
+        "per_frame_ms": baseline_cpu * 1000.0 / len(frames),
+        "gated_ms": gated_cpu * 1000.0 / len(frames),
+        "label_agreement": agreement(baseline, gated),
+        "smoothed_label_agreement": agreement(smooth(baseline, args.window), gated),
+        "truth_accuracy": {"per_frame": agreement(truth, baseline), "gated": agreement(truth, gated)} if truth else None,
+        "label_counts": {label: baseline.count(label) for label in sorted(set(baseline))},
+        "label_changes": {"per_frame": label_changes(baseline), "gated": label_changes(gated)},
+        "gate": gate.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Latency of explained predictions against plain ones.
+
+    forest  CompiledForest.predict() against explain() on rows sampled from
+            stress_data.csv, per row for each --batch-sizes, plus the one-off
+            build_contributions() time and table size. Explained predictions
+            must equal plain ones, and base_value + contributions must give
+            back predict_proba.
+    api     POST /predict and /predict/batch (--api-batch rows) through the
+            full ASGI app in-process (httpx ASGITransport), with and without
+            explain=true, in interleaved rounds; p50 and p99 of each.
+
+    python benchmark_explain.py --requests 1000 --rounds 5
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, ".."))
+from utils.feature_spec import FEATURE_COLUMNS, LABEL_COLUMNS
+
+DATA_PATH = os.path.join(BASE_DIR, "..", "training", "stress_data.csv")
+
+
+def load_payloads(path: str) -> list:
+    with open(path, newline="") as f:
+        return [
+            {k: row[k] if k in LABEL_COLUMNS else int(float(row[k])) for k in FEATURE_COLUMNS}
+            for row in csv.DictReader(f)
+        ]
+
+
+def per_row_us(fn, X: np.ndarray, batch: int, min_rows: int) -> float:
+    rows = X[:batch]
+    iterations = max(1, min_rows // batch)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(rows)
+    return (time.perf_counter() - start) / (iterations * batch) * 1e6
+
+
+async def time_requests(app, path: str, body, count: int) -> np.ndarray:
+    import httpx
+
+    timings = np.empty(count)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for i in range(count):
+            start = time.perf_counter()
+            response = await client.post(path, json=body(i))
+            timings[i] = time.perf_counter() - start
+            assert response.status_code == 200
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark explain=true against plain predictions")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per configuration per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--api-batch", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    os.environ.setdefault("MODEL_POLL_INTERVAL", "0")
+    import main as api
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(open(os.devnull, "w"))
+
+    bundle = api.model_service.bundle()
+    forest = bundle.forest
+    rng = np.random.default_rng(args.seed)
+    source = load_payloads(DATA_PATH)
+    payloads = [source[i] for i in rng.integers(0, len(source), max(args.batch_sizes + [args.api_batch, 2000]))]
+    X, _ = bundle.spec.encode_records(payloads)
+
+    start = time.perf_counter()
+    forest.build_contributions(len(FEATURE_COLUMNS))
+    build_ms = (time.perf_counter() - start) * 1e3
+    proba, contributions = forest.explain(X)
+    checks = {
+        "same_predictions": bool(np.array_equal(forest.classes[np.argmax(proba, axis=1)], forest.predict(X))),
+        "max_additivity_error": float(np.abs(forest.bias + contributions.sum(axis=1) - forest.predict_proba(X)).max()),
+    }
+
+    engine = {}
+    for batch in args.batch_sizes:
+        plain = per_row_us(forest.predict, X, batch, 2000)
+        explained = per_row_us(forest.explain, X, batch, 2000)
+        engine[batch] = {"predict_us_per_row": plain, "explain_us_per_row": explained, "ratio": explained / plain}
+
+    configs = {
+        "predict": ("/predict", lambda i: payloads[i % len(payloads)]),
+        "predict?explain=true": ("/predict?explain=true", lambda i: payloads[i % len(payloads)]),
+        "batch": ("/predict/batch", lambda i: payloads[:args.api_batch]),
+        "batch?explain=true": ("/predict/batch?explain=true", lambda i: payloads[:args.api_batch]),
+    }
+    samples = {name: [] for name in configs}
+    for path, body in configs.values():
+        asyncio.run(time_requests(api.app, path, body, 100))
+    for _ in range(args.rounds):
+        for name, (path, body) in configs.items():
+            count = args.requests if not name.startswith("batch") else max(1, args.requests // 10)
+            samples[name].append(asyncio.run(time_requests(api.app, path, body, count)))
+    latency = {}
+    for name in configs:
+        timings = np.concatenate(samples[name]) * 1e3
+        latency[name] = {"p50_ms": float(np.percentile(timings, 50)), "p99_ms": float(np.percentile(timings, 99))}
+
+    report = {
+        "trees": forest.n_trees,
+        "build_contributions_ms": build_ms,
+        "contribution_table_mb": forest.contributions_nbytes / 1e6,
+        "forest_mb": forest.nbytes / 1e6,
+        "checks": checks,
+        "engine": engine,
+        "api": latency,
+    }
+    print(f"🌳 {forest.n_trees} trees: contribution tables built in {build_ms:.1f} ms, "
+          f"{report['contribution_table_mb']:.2f} MB next to a {report['forest_mb']:.2f} MB forest")
+    print(f"{'✅' if checks['same_predictions'] else '❌'} explained predictions equal plain ones; "
+          f"base_value + contributions within {checks['max_additivity_error']:.1e} of predict_proba")
+    for batch, values in engine.items():
+        print(f"  batch {batch:>5}: predict {values['predict_us_per_row']:8.1f} us/row  "
+              f"explain {values['explain_us_per_row']:8.1f} us/row  ({values['ratio']:.2f}x)")
+    for name, values in latency.items():
+        print(f"📊 {name:<22} p50 {values['p50_ms']:7.3f} ms  p99 {values['p99_ms']:7.3f} ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Overhead of the /metrics instrumentation and sampled logging on /predict.
+
+Requests go through the full ASGI app in-process (httpx ASGITransport), one at
+a time, in interleaved rounds so drift hits every configuration equally:
+
+    off      METRICS_ENABLED off, no request logging
+    on       timers, middleware and 1% sampled JSON logs (the defaults)
+    log-all  timers plus a JSON log line for every request, roughly the cost
+             of the three unconditional INFO lines this replaced
+
+App logs are written to /dev/null so terminal speed does not count. The cost
+of the timers alone (one StageTimer with every /predict stage plus the
+middleware observation) is also measured in a tight loop, which is far less
+noisy than the difference of two request medians.
+
+    python benchmark_metrics.py --requests 2000 --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, ".."))
+
+PAYLOAD = {
+    "mood": "sad", "sleep_hours": 5, "workload": 7, "face_emotion": "fear",
+    "blink_rate": 25, "caffeine_intake": 3, "exercise_hours": 0, "screen_time": 9,
+}
+PREDICT_STAGES = ("validate_ranges", "map_labels", "encode", "predict", "decode", "response")
+
+
+def configure(main, name: str) -> None:
+    main.METRICS_ENABLED = name != "off"
+    main.request_log.rate = {"off": 0.0, "on": 0.01, "log-all": 1.0}[name]
+    main.request_log.slow_ms = float("inf") if name == "off" else 250.0
+
+
+async def time_requests(app, count: int) -> np.ndarray:
+    import httpx
+
+    timings = np.empty(count)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for i in range(count):
+            start = time.perf_counter()
+            response = await client.post("/predict", json=PAYLOAD)
+            timings[i] = time.perf_counter() - start
+            assert response.status_code == 200
+    return timings
+
+
+def timer_cost_us(main, iterations: int) -> float:
+    from utils.metrics import StageTimer
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        stages = StageTimer(main.stage_latency, "bench")
+        for stage in PREDICT_STAGES:
+            stages.mark(stage)
+        main.request_latency.observe(stages.total(), "/bench")
+        main.request_count.inc("/bench", "200")
+        main.prediction_count.inc("bench")
+        main.request_log.sample(stages.total())
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure metrics and logging overhead on /predict")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per configuration per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    os.environ.setdefault("MODEL_POLL_INTERVAL", "0")
+    import main as api
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(open(os.devnull, "w"))
+
+    configs = ("off", "on", "log-all")
+    samples = {name: [] for name in configs}
+    for name in configs:
+        configure(api, name)
+        asyncio.run(time_requests(api.app, 200))
+    for _ in range(args.rounds):
+        for name in configs:
+            configure(api, name)
+            samples[name].append(asyncio.run(time_requests(api.app, args.requests)))
+
+    medians = {name: float(np.median(np.concatenate(samples[name]))) * 1e3 for name in configs}
+    timers_us = timer_cost_us(api, 100_000)
+    report = {
+        "median_ms": medians,
+        "overhead_pct": {name: (medians[name] / medians["off"] - 1.0) * 100.0 for name in configs if name != "off"},
+        "timer_cost_us": timers_us,
+        "timer_cost_pct_of_request": timers_us / (medians["off"] * 1e3) * 100.0,
+    }
+    for name in configs:
+        print(f"{name:>8}: median {medians[name]:.3f} ms per request")
+    for name, pct in report["overhead_pct"].items():
+        print(f"{name:>8}: {pct:+.2f}% vs off")
+    print(f"timers alone: {timers_us:.2f} us per request = {report['timer_cost_pct_of_request']:.2f}% of the median request")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Run the mood.py pipeline against a recorded video and a local stub API,
+without a webcam or the real model.
+
+If no --video is given, a short clip is recorded from frame.jpg. The stub
+server answers /predict/batch and counts TCP connections, which should stay
+at one because the sender keeps a pooled keep-alive connection. By default
+emotion analysis is a stand-in that sleeps --analysis-ms per frame; pass
+--deepface to run the real model, and --gate to put it behind an
+EmotionGate as mood.py does. tests/test_frame_pipeline.py asserts on the
+same clip and stub.
+
+    python benchmark_mood_pipeline.py --seconds 5 --analysis-fps 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, ".."))
+from utils.cv_utils import EmotionGate
+from utils.frame_pipeline import MoodPipeline, deepface_emotion, deepface_face_emotion
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+    requests = 0
+
+    def do_POST(self):
+        StubHandler.connections.add(self.client_address)
+        StubHandler.requests += 1
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        payload = json.dumps({"results": [{"stress_level": "medium"} for _ in body]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def record_clip(path: str, seconds: float, fps: float) -> None:
+    frame = cv2.imread(os.path.join(BASE_DIR, "frame.jpg"))
+    height, width = frame.shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    rng = np.random.default_rng(0)
+    for _ in range(int(seconds * fps)):
+        noise = rng.integers(-8, 9, frame.shape, dtype=np.int16)
+        writer.write(np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8))
+    writer.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the mood.py capture/analysis/send pipeline")
+    parser.add_argument("--video", help="Recorded clip to replay (default: synthesised from frame.jpg)")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--capture-fps", type=float, default=30.0)
+    parser.add_argument("--analysis-fps", type=float, default=5.0)
+    parser.add_argument("--analysis-ms", type=float, default=60.0)
+    parser.add_argument("--deepface", action="store_true")
+    parser.add_argument("--gate", action="store_true", help="Analyse through an EmotionGate")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = args.video
+        if video is None:
+            video = os.path.join(tmp, "clip.avi")
+            record_clip(video, args.seconds, args.capture_fps)
+
+        def stand_in(frame):
+            time.sleep(args.analysis_ms / 1000.0)
+            return "neutral"
+
+        analyze_fn = deepface_emotion if args.deepface else stand_in
+        if args.gate:
+            analyze_fn = EmotionGate(analyze_fn, deepface_face_emotion if args.deepface else stand_in)
+        pipeline = MoodPipeline(
+            source=video,
+            api_url=f"http://127.0.0.1:{server.server_address[1]}",
+            analyze_fn=analyze_fn,
+            capture_fps=args.capture_fps,
+            analysis_fps=args.analysis_fps,
+        )
+        pipeline.start()
+        pipeline.join()
+
+    server.shutdown()
+    report = pipeline.stats()
+    report["stub_requests"] = StubHandler.requests
+    report["stub_connections"] = len(StubHandler.connections)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
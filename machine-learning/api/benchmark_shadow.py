@@ -0,0 +1,206 @@
+"""
+What shadow evaluation costs the primary, and what it reports.
+
+A scratch model directory gets the shipped training/ model as the primary
+and two shadow candidates fitted on stress_data.csv: "unweighted" (data.py's
+200 trees without class weights) and "small" (train_model.py's parameters
+with --small-trees trees). Requests are fresh sample_dataset() rows none of
+the models was fitted on, so the forests don't just recite their training
+labels. The API is imported against it, then:
+
+    offer      ShadowEvaluator.offer() in a tight loop, for a request that is
+               not sampled and for one that is
+    latency    POST /predict through the full ASGI app in-process (httpx
+               ASGITransport) with --concurrency clients, in interleaved
+               rounds with shadows off and at each --sample-rates; p50 and
+               p99 of each, and how many admission control shed
+    report     once the workers have drained the queue, each shadow's
+               agreement with the primary (overall and per class) and the
+               per-row scoring time of both
+
+    python benchmark_shadow.py --requests 2000 --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRAINING_DIR = os.path.join(BASE_DIR, "..", "training")
+sys.path.append(os.path.join(BASE_DIR, ".."))
+sys.path.append(TRAINING_DIR)
+from synthetic_data import sample_dataset
+from utils.feature_spec import FEATURE_COLUMNS
+
+DATA_PATH = os.path.join(TRAINING_DIR, "stress_data.csv")
+
+
+def make_payloads(n: int, rng: np.random.Generator) -> list:
+    df = sample_dataset(n, rng)[list(FEATURE_COLUMNS)]
+    for col in ("sleep_hours", "exercise_hours"):
+        # The API takes whole numbers
+        df[col] = df[col].round().astype(int)
+    return df.to_dict("records")
+
+
+def publish_candidates(model_dir: str, small_trees: int) -> None:
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from train_model import MODEL_PARAMS, encode_categoricals
+    from utils.model_registry import publish_artifacts
+
+    df, encoders = encode_categoricals(pd.read_csv(DATA_PATH))
+    X, y = df[list(FEATURE_COLUMNS)], df["stress_level"]
+    candidates = {
+        "unweighted": dict(n_estimators=200, max_depth=None, min_samples_split=3, max_features="sqrt", random_state=42),
+        "small": dict(MODEL_PARAMS, n_estimators=small_trees),
+    }
+    for name, params in candidates.items():
+        directory = os.path.join(model_dir, "shadow", name)
+        os.makedirs(directory)
+        publish_artifacts(RandomForestClassifier(**params).fit(X, y), encoders, directory)
+
+
+def offer_cost_us(evaluator, bundle, payload, X, preds, sample_rate: float, iterations: int) -> float:
+    evaluator.sample_rate = sample_rate
+    items = [payload]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        evaluator.offer(bundle, items, X, preds)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def drain(evaluator, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while evaluator._queue.qsize() and time.time() < deadline:
+        time.sleep(0.05)
+    # The batch a worker took last, which may still be waiting to fill
+    time.sleep(evaluator.batch_wait + 0.2)
+
+
+async def time_requests(app, payloads: list, count: int, concurrency: int) -> tuple:
+    """(seconds of every 200 answer, number of 429/503 answers)."""
+    import httpx
+
+    timings = np.full(count, np.nan)
+    shed = 0
+    queue = iter(range(count))
+
+    async def client_loop(client):
+        nonlocal shed
+        for i in queue:
+            start = time.perf_counter()
+            response = await client.post("/predict", json=payloads[i % len(payloads)])
+            if response.status_code in (429, 503):
+                # Admission control shedding through a pause (a full garbage collection) of the
+                # loop. A shed answer never yields, so give the loop's lag sampler a turn
+                shed += 1
+                await asyncio.sleep(0)
+                continue
+            assert response.status_code == 200, (response.status_code, response.text)
+            timings[i] = time.perf_counter() - start
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await asyncio.gather(*[client_loop(client) for _ in range(concurrency)])
+    return timings[~np.isnan(timings)], shed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure shadow evaluation's cost to the primary")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per configuration per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--sample-rates", type=float, nargs="+", default=[0.1, 1.0])
+    parser.add_argument("--small-trees", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=5000, help="Distinct request payloads")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    model_dir = tempfile.mkdtemp(prefix="stress-shadow-")
+    try:
+        for name in ("stress_model.pkl", "encoders.pkl"):
+            shutil.copy(os.path.join(TRAINING_DIR, name), model_dir)
+        publish_candidates(model_dir, args.small_trees)
+        os.environ.update(MODEL_DIR=model_dir, MODEL_POLL_INTERVAL="0", SHADOW_SAMPLE_RATE="1")
+        import main as api
+        for handler in logging.getLogger().handlers:
+            if isinstance(handler, logging.StreamHandler):
+                handler.setStream(open(os.devnull, "w"))
+        report = run(api, args)
+    finally:
+        shutil.rmtree(model_dir, ignore_errors=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def run(api, args) -> dict:
+    evaluator = api.shadow_evaluator
+    bundle = api.model_service.bundle()
+    rng = np.random.default_rng(args.seed)
+    payloads = make_payloads(args.rows, rng)
+
+    # Loads the shadows in the first worker
+    evaluator.start()
+    item = api.InputData(**payloads[0])
+    X = api.build_feature_matrix([api.prepare_input(item, bundle)], bundle)
+    preds = bundle.forest.predict(X)
+    cost = {
+        "offer_not_sampled_us": offer_cost_us(evaluator, bundle, item, X, preds, 0.0, 200_000),
+        "offer_sampled_us": offer_cost_us(evaluator, bundle, item, X, preds, 1.0, 500),
+    }
+    drain(evaluator)
+
+    configs = {"off": None, **{f"rate {rate:g}": rate for rate in args.sample_rates}}
+    samples = {name: [] for name in configs}
+    shed = {name: 0 for name in configs}
+
+    def configure(rate):
+        api.shadow_evaluator = None if rate is None else evaluator
+        evaluator.sample_rate = rate or 0.0
+
+    for rate in configs.values():
+        configure(rate)
+        asyncio.run(time_requests(api.app, payloads, 200, args.concurrency))
+    for _ in range(args.rounds):
+        for name, rate in configs.items():
+            configure(rate)
+            timings, count = asyncio.run(time_requests(api.app, payloads, args.requests, args.concurrency))
+            samples[name].append(timings)
+            shed[name] += count
+    latency = {}
+    for name in configs:
+        timings = np.concatenate(samples[name]) * 1e3
+        latency[name] = {"p50_ms": float(np.percentile(timings, 50)), "p99_ms": float(np.percentile(timings, 99)),
+                         "shed": shed[name]}
+    drain(evaluator)
+    shadows = evaluator.report()
+
+    print(f"⏱️ offer(): {cost['offer_not_sampled_us']:.2f} us when not sampled, "
+          f"{cost['offer_sampled_us']:.2f} us when sampled")
+    base = latency["off"]
+    for name, values in latency.items():
+        print(f"📊 shadows {name:<9}: p50 {values['p50_ms']:.3f} ms ({values['p50_ms'] - base['p50_ms']:+.3f})  "
+              f"p99 {values['p99_ms']:.3f} ms ({values['p99_ms'] - base['p99_ms']:+.3f})  "
+              f"shed {values['shed']}  ({args.concurrency} clients, {args.rounds} x {args.requests:,} requests)")
+    print(f"🔍 {shadows['scored_rows']:,} rows scored off the request path, "
+          f"{shadows['dropped_requests']:,} samples dropped on a full queue")
+    for name, entry in shadows["shadows"].items():
+        latency_us = entry["latency_us_per_row"]
+        print(f"🌳 {name} ({entry['trees']} trees): agreement {entry['agreement']:.2%} over {entry['rows']:,} rows; "
+              f"{latency_us['shadow']['p50']:.1f} us/row vs primary {latency_us['primary']['p50']:.1f} us/row")
+        for level, values in entry["per_class"].items():
+            print(f"    primary {level:<7} {values['rows']:>7,} rows  agreement {values['agreement']:.2%}  "
+                  f"shadow said {values['shadow_predicted']}")
+    return {"cost": cost, "latency": latency, "shadows": shadows}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compare per-worker memory and model start-up time for the joblib pickle and
+the memory-mapped stress_model.forest artifact.
+
+Each format starts N worker processes that load the active model exactly the
+way api/main.py does, score the training CSV once so every forest page is
+touched, and wait until all workers are up before reading /proc/self/smaps_rollup.
+PSS (proportional set size) splits shared pages between the processes using
+them, so it shows what each extra worker really costs. Linux only.
+
+    python benchmark_workers.py --workers 4
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRAINING_DIR = os.path.join(BASE_DIR, "..", "training")
+sys.path.append(os.path.join(BASE_DIR, ".."))
+
+
+def read_memory_kb() -> dict:
+    memory = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                memory[parts[0][:-1].lower()] = int(parts[1])
+    return memory
+
+
+def worker(artifact_format, ready, release, results):
+    started = time.perf_counter()
+    import numpy as np
+    from utils.model_registry import ModelRegistry
+
+    registry = ModelRegistry(TRAINING_DIR, poll_interval=0, artifact_format=artifact_format)
+    registry.check()
+    bundle = registry.active
+    load_seconds = time.perf_counter() - started
+
+    # Touch every forest page the way real traffic eventually would
+    X = np.loadtxt(os.path.join(TRAINING_DIR, "stress_data.csv"), delimiter=",", skiprows=1,
+                   usecols=(1, 2, 4, 5, 6, 7), dtype=float)
+    rows = np.zeros((len(X), 8))
+    rows[:, [1, 2, 4, 5, 6, 7]] = X
+    for code in range(len(bundle.encoders["mood"].classes_)):
+        rows[:, 0] = rows[:, 3] = code
+        bundle.forest.predict(rows)
+
+    ready.put(True)
+    release.wait()
+    results.put({"load_seconds": load_seconds, "sklearn_imported": "sklearn" in sys.modules, **read_memory_kb()})
+
+
+def run(artifact_format: str, workers: int) -> dict:
+    ctx = mp.get_context("spawn")
+    ready, results, release = ctx.Queue(), ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=worker, args=(artifact_format, ready, release, results)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    for _ in procs:
+        ready.get()
+    release.set()
+    samples = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    return {
+        "format": artifact_format,
+        "workers": workers,
+        "load_seconds_mean": sum(s["load_seconds"] for s in samples) / workers,
+        "rss_mb_per_worker": sum(s["rss"] for s in samples) / workers / 1024,
+        "pss_mb_per_worker": sum(s["pss"] for s in samples) / workers / 1024,
+        "pss_mb_total": sum(s["pss"] for s in samples) / 1024,
+        "sklearn_imported": any(s["sklearn_imported"] for s in samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    from serve import ensure_mmap_artifact
+    ensure_mmap_artifact()
+
+    report = [run(artifact_format, args.workers) for artifact_format in ("pickle", "mmap")]
+    for row in report:
+        print(f"{row['format']:>7}: load {row['load_seconds_mean'] * 1000:7.1f} ms | "
+              f"RSS {row['rss_mb_per_worker']:6.1f} MB | PSS {row['pss_mb_per_worker']:6.1f} MB per worker | "
+              f"PSS total {row['pss_mb_total']:6.1f} MB | sklearn imported: {row['sklearn_imported']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,130 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import joblib
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, List, Optional, Union
 import numpy as np
 from fastapi.middleware.cors import CORSMiddleware
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import csv
 import logging
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.admission import AdmissionController, AdmissionMiddleware, Overloaded
+from utils.advice import get_eye_strain_analysis, tips_key, tips_mapping
+from utils.drift_monitor import DriftMonitor, load_profile
+from utils.feature_spec import FEATURE_COLUMNS, NUMERIC_RANGES, TARGET_COLUMN, clamp
+from utils.feedback_store import FeedbackStore
+from utils.model_registry import ModelBundle, ModelRegistry
+from utils.model_service import WARMUP_TARGETS, ModelService
+from utils.prediction_cache import PredictionCache
+from utils.shadow import ShadowEvaluator, discover_shadows
+from utils.micro_batcher import MicroBatcher
+from utils.metrics import (
+    Counter, Gauge, Histogram, MetricsRegistry, NullStageTimer,
+    RequestMetricsMiddleware, SampledLogger, StageTimer,
+)
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Relative paths to your models
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_PATH = os.path.join(BASE_DIR, "..", "training", "stress_model.pkl")
-ENCODERS_PATH = os.path.join(BASE_DIR, "..", "training", "encoders.pkl")
-
-try:
-    # Load trained model + encoders
-    model = joblib.load(MODEL_PATH)
-    encoders = joblib.load(ENCODERS_PATH)
-    logger.info("Model and encoders loaded successfully")
-    
-    # Get the classes that the encoders were trained on
-    mood_classes = set(encoders["mood"].classes_)
-    face_emotion_classes = set(encoders["face_emotion"].classes_)
-    
-    logger.info(f"Available mood classes: {mood_classes}")
-    logger.info(f"Available face emotion classes: {face_emotion_classes}")
-    
-except Exception as e:
-    logger.error(f"Error loading model or encoders: {e}")
-    model = None
-    encoders = None
-    mood_classes = set()
-    face_emotion_classes = set()
-
-app = FastAPI(title="Stress Level Prediction API")
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # or ["http://localhost:3000"]
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+TRAINING_DIR = os.path.join(BASE_DIR, "..", "training")
+
+# Directory the registry loads model versions from (training/ by default)
+MODEL_DIR = os.environ.get("MODEL_DIR", TRAINING_DIR)
+# Seconds between checks of MODEL_DIR for new model versions; 0 disables the watcher
+MODEL_POLL_INTERVAL = float(os.environ.get("MODEL_POLL_INTERVAL", "5"))
+# "pickle" loads the joblib files; "mmap" shares stress_model.forest pages across workers
+MODEL_FORMAT = os.environ.get("MODEL_FORMAT", "pickle")
+
+# Models load on the first request that needs them; WARMUP=model (or all: model,
+# the legacy pipeline and the face detector) starts loading them at startup instead
+WARMUP = os.environ.get("WARMUP", "")
+LEGACY_MODEL_PATH = os.path.join(BASE_DIR, "..", "models", "stress_model.pkl")
+
+registry = ModelRegistry(MODEL_DIR, poll_interval=MODEL_POLL_INTERVAL, artifact_format=MODEL_FORMAT)
+model_service = ModelService(registry, legacy_path=LEGACY_MODEL_PATH)
+
+# Optional memo of predictions keyed on the encoded input row.
+# PREDICTION_CACHE_SIZE=0 (the default) disables it.
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "0"))
+PREDICTION_CACHE_WARM = os.environ.get("PREDICTION_CACHE_WARM", "0") == "1"
+WARM_DATA_PATH = os.path.join(TRAINING_DIR, "stress_data.csv")
+
+# The cache follows the model version from the first load on (see on_model_swap)
+prediction_cache = PredictionCache(maxsize=PREDICTION_CACHE_SIZE) if PREDICTION_CACHE_SIZE > 0 else None
+
+router = APIRouter()
+
+# Request and per-stage latency histograms served on /metrics; METRICS_ENABLED=0 turns the timers off
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+# Share of predictions logged as one JSON line; slower ones than LOG_SLOW_MS are always logged
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "0.01"))
+LOG_SLOW_MS = float(os.environ.get("LOG_SLOW_MS", "250"))
+
+metrics = MetricsRegistry()
+request_latency = metrics.register(Histogram(
+    "stress_api_request_duration_seconds", "End-to-end request latency, routing and validation included", ["path"]))
+request_count = metrics.register(Counter(
+    "stress_api_requests_total", "Requests by path and status code", ["path", "status"]))
+stage_latency = metrics.register(Histogram(
+    "stress_api_stage_duration_seconds", "Time spent in each prediction stage", ["endpoint", "stage"]))
+prediction_count = metrics.register(Counter(
+    "stress_api_predictions_total", "Predictions by stress level", ["stress_level"]))
+metrics.register(Gauge(
+    "stress_api_model_info", "Active model version", ["version", "format"],
+    collect=lambda: [((registry.active.version, MODEL_FORMAT), 1)] if registry.active else []))
+metrics.register(Gauge(
+    "stress_api_model_swaps", "Model versions activated since start", collect=lambda: [((), registry.swaps)]))
+request_log = SampledLogger(logger, rate=LOG_SAMPLE_RATE, slow_ms=LOG_SLOW_MS)
+
+# Live input and prediction histograms compared with the model's training
+# profile on /drift. DRIFT_MONITOR=0 turns it off.
+DRIFT_MONITOR = os.environ.get("DRIFT_MONITOR", "1") == "1"
+DRIFT_WINDOW_SECONDS = float(os.environ.get("DRIFT_WINDOW_SECONDS", "3600"))
+DRIFT_MIN_ROWS = int(os.environ.get("DRIFT_MIN_ROWS", "200"))
+
+drift_monitor = DriftMonitor(window_seconds=DRIFT_WINDOW_SECONDS, min_rows=DRIFT_MIN_ROWS) if DRIFT_MONITOR else None
+if drift_monitor is not None:
+    metrics.register(Gauge(
+        "stress_api_drift_psi", "PSI of live inputs and predictions against the training profile", ["feature"],
+        collect=drift_monitor.gauges))
+
+# Candidate models scored on a sample of live requests by background threads,
+# never on the response path; compared with the primary on /shadow. Every
+# directory under SHADOW_DIR found at startup is one candidate (new versions
+# inside it hot-reload like the primary's). SHADOW_SAMPLE_RATE=0 turns it off.
+SHADOW_DIR = os.environ.get("SHADOW_DIR", os.path.join(MODEL_DIR, "shadow"))
+SHADOW_SAMPLE_RATE = float(os.environ.get("SHADOW_SAMPLE_RATE", "0.1"))
+SHADOW_WORKERS = int(os.environ.get("SHADOW_WORKERS", "1"))
+SHADOW_MAX_PENDING = int(os.environ.get("SHADOW_MAX_PENDING", "1000"))
+
+shadows = discover_shadows(SHADOW_DIR) if SHADOW_SAMPLE_RATE > 0 else []
+shadow_evaluator = ShadowEvaluator(
+    shadows,
+    sample_rate=SHADOW_SAMPLE_RATE,
+    workers=SHADOW_WORKERS,
+    max_pending=SHADOW_MAX_PENDING,
+    poll_interval=MODEL_POLL_INTERVAL,
+    artifact_format=MODEL_FORMAT,
+) if shadows else None
+if shadow_evaluator is not None:
+    metrics.register(Gauge(
+        "stress_api_shadow_agreement", "Share of sampled predictions a shadow model agrees with", ["shadow"],
+        collect=lambda: [((name,), entry["agreement"]) for name, entry in shadow_evaluator.report()["shadows"].items()
+                         if entry["agreement"] is not None]))
+
+_NULL_STAGES = NullStageTimer()
+
+def start_stages(endpoint: str):
+    return StageTimer(stage_latency, endpoint) if METRICS_ENABLED else _NULL_STAGES
 
 # Input data model
 class InputData(BaseModel):
@@ -53,165 +136,573 @@ class InputData(BaseModel):
     caffeine_intake: int
     exercise_hours: int
     screen_time: int
-
-# Stress tips mapping
-tips_mapping = {
-    "low": [
-        "Keep up the good routine!",
-        "Maintain a balanced lifestyle.",
-        "Stay hydrated and active.",
-        "Continue your healthy habits."
-    ],
-    "medium": [
-        "Take short walks or stretch breaks.",
-        "Try breathing or meditation exercises.",
-        "Reduce screen time when possible.",
-        "Consider taking short breaks throughout the day."
-    ],
-    "high": [
-        "Consider journaling your feelings.",
-        "Talk to a friend, family member, or counselor.",
-        "Limit caffeine intake and get enough sleep.",
-        "Try relaxation techniques like deep breathing or yoga."
-    ]
-}
-
-# Mapping for unseen labels to known labels
-mood_mapping = {
-    "fear": "sad",
-    "disgust": "angry",
-}
-face_emotion_mapping = {
-    "fear": "sad",
-    "disgust": "angry",
-}
-
-def map_to_known_label(value: str, known_classes: set, mapping: dict) -> str:
-    if value in known_classes:
-        return value
-    if value in mapping:
-        mapped_value = mapping[value]
-        if mapped_value in known_classes:
-            logger.info(f"Mapped unknown label '{value}' to '{mapped_value}'")
-            return mapped_value
-    if known_classes:
-        default_value = list(known_classes)[0]
-        logger.warning(f"No mapping found for '{value}', using default '{default_value}'")
-        return default_value
-    return value
+    # Set by clients that track blinks over time (see utils/cv_utils.detect_fatigue)
+    fatigue: Optional[bool] = None
 
 def validate_numeric_ranges(data: InputData) -> InputData:
-    data.sleep_hours = max(0, min(24, data.sleep_hours))
-    data.workload = max(1, min(10, data.workload))
-    data.blink_rate = max(5, min(60, data.blink_rate))
-    data.caffeine_intake = max(0, min(20, data.caffeine_intake))
-    data.exercise_hours = max(0, min(12, data.exercise_hours))
-    data.screen_time = max(0, min(24, data.screen_time))
+    for field in NUMERIC_RANGES:
+        setattr(data, field, clamp(field, getattr(data, field)))
     return data
 
-# <<< NEW CODE START
-# This is the helper function for eye strain analysis.
-def get_eye_strain_analysis(blink_rate: int, screen_time: int) -> dict:
-    analysis = {
-        "level": "low",
-        "message": "Your blink rate appears normal. Keep up the good routine!",
-        "exercises": []
-    }
-    
-    # A normal blink rate is 15-20 per minute. It often drops to 5-7 during computer use.
-    if blink_rate < 10 and screen_time > 4:
-        analysis["level"] = "high"
-        analysis["message"] = "Your blink rate is lower than average, which can lead to dry eyes and strain, especially with high screen time."
-        analysis["exercises"] = [
-            "The 20-20-20 Rule: Every 20 minutes, look at something 20 feet away for 20 seconds.",
-            "Palming: Gently close your eyes and cover them with your cupped palms for 60 seconds to relax them.",
-            "Focus Change: Hold a finger a few inches from your eye and focus on it. Slowly move it away, holding your focus."
-        ]
-    elif blink_rate < 15 and screen_time > 2:
-        analysis["level"] = "medium"
-        analysis["message"] = "Your blink rate is slightly low. Remember to take regular screen breaks."
-        analysis["exercises"] = [
-            "The 20-20-20 Rule: Every 20 minutes, look at something 20 feet away for 20 seconds."
-        ]
-        
-    return analysis
-# <<< NEW CODE END
-
-@app.get("/")
+@router.get("/")
 def read_root():
+    bundle = model_service.bundle()
     return {
         "message": "Stress Level Prediction API", "status": "online",
-        "model_loaded": model is not None,
-        "available_moods": list(mood_classes) if mood_classes else [],
-        "available_emotions": list(face_emotion_classes) if face_emotion_classes else []
+        "model_loaded": bundle is not None,
+        "available_moods": list(bundle.mood_classes) if bundle else [],
+        "available_emotions": list(bundle.face_emotion_classes) if bundle else []
     }
 
-@app.get("/health")
+@router.get("/health")
 def health_check():
+    bundle = model_service.bundle()
     return {
-        "status": "healthy" if model is not None else "unhealthy",
-        "model_loaded": model is not None,
-        "encoders_loaded": encoders is not None
+        "status": "healthy" if bundle is not None else "unhealthy",
+        "model_loaded": bundle is not None,
+        "encoders_loaded": bundle is not None,
+        "model_version": bundle.version if bundle else None,
+        "registry": registry.status(),
+        "service": model_service.status()
     }
 
-@app.post("/predict")
-def predict(data: InputData):
+def prepare_input(data: InputData, bundle: ModelBundle, stages=_NULL_STAGES):
+    data = validate_numeric_ranges(data)
+    stages.mark("validate_ranges")
+    mapped_mood = bundle.spec.map_label("mood", data.mood)
+    mapped_face_emotion = bundle.spec.map_label("face_emotion", data.face_emotion)
+    stages.mark("map_labels")
+    return data, mapped_mood, mapped_face_emotion
+
+def build_feature_matrix(prepared: list, bundle: ModelBundle) -> np.ndarray:
+    X, _ = bundle.spec.encode_records([data for data, _, _ in prepared])
+    return X
+
+def warm_prediction_cache(bundle: ModelBundle):
+    """Precompute the rows seen in the training data, the hot part of the input space."""
+    if prediction_cache is None or not PREDICTION_CACHE_WARM:
+        return
     try:
-        if model is None or encoders is None:
-            raise HTTPException(status_code=503, detail="Model or encoders not loaded.")
-        
-        data = validate_numeric_ranges(data)
-        
-        mapped_mood = map_to_known_label(data.mood, mood_classes, mood_mapping)
-        mapped_face_emotion = map_to_known_label(data.face_emotion, face_emotion_classes, face_emotion_mapping)
-        
-        logger.info(f"Processing prediction for mood: {data.mood} -> {mapped_mood}, emotion: {data.face_emotion} -> {mapped_face_emotion}")
-        
+        with open(WARM_DATA_PATH, newline="") as f:
+            prepared = [prepare_input(InputData(**row), bundle) for row in csv.DictReader(f)]
+        X = build_feature_matrix(prepared, bundle)
+        warmed = prediction_cache.warm(X, bundle.forest.predict, bundle.version)
+        logger.info(f"Prediction cache warmed with {warmed} rows")
+    except Exception as e:
+        logger.error(f"Could not warm prediction cache: {e}")
+
+def on_model_swap(bundle: ModelBundle):
+    if drift_monitor is not None:
         try:
-            mood_enc = encoders["mood"].transform([mapped_mood])[0]
-        except Exception:
-            mood_enc = 0
-            
+            profile = load_profile(MODEL_DIR, bundle.version)
+        except Exception as e:
+            logger.error(f"Could not load the drift profile of {bundle.version}: {e}")
+            profile = None
+        drift_monitor.set_reference(bundle.spec, profile, bundle.version)
+    if prediction_cache is not None:
+        prediction_cache.reset(bundle.version)
+        warm_prediction_cache(bundle)
+
+def predict_encoded(X: np.ndarray, bundle: ModelBundle) -> np.ndarray:
+    if prediction_cache is None:
+        return bundle.forest.predict(X)
+    return prediction_cache.predict(X, bundle.forest.predict, bundle.version)
+
+def explain_encoded(X: np.ndarray, bundle: ModelBundle) -> tuple:
+    """
+    Predictions plus one explanation per row from the forest's per-leaf path
+    attributions (tabulated by the first call for a model version). Skips the
+    prediction cache, which holds no leaves.
+    """
+    forest = bundle.forest
+    proba, contributions = forest.explain(X)
+    best = np.argmax(proba, axis=1)
+    # The predicted class's column, features ordered by the size of their push
+    values = np.take_along_axis(contributions, best[:, None, None], axis=2)[:, :, 0]
+    order = np.argsort(-np.abs(values), axis=1, kind="stable")
+    values = np.take_along_axis(values, order, axis=1)
+    levels = bundle.spec.decode(forest.classes).tolist()
+    bias = forest.bias.tolist()
+    explanations = [
+        {
+            "probability": row_proba[k],
+            "probabilities": dict(zip(levels, row_proba)),
+            # probability == base_value + sum(contributions)
+            "base_value": bias[k],
+            "contributions": {FEATURE_COLUMNS[j]: value for j, value in zip(row_order, row_values)},
+        }
+        for k, row_proba, row_order, row_values in zip(best.tolist(), proba.tolist(), order.tolist(), values.tolist())
+    ]
+    return forest.classes[best], explanations
+
+def build_response(data: InputData, mapped_mood: str, mapped_face_emotion: str, stress_level: str,
+                   explanation: dict = None) -> dict:
+    tips = tips_mapping[tips_key(stress_level)]
+    eye_strain_data = get_eye_strain_analysis(data.blink_rate, data.screen_time, bool(data.fatigue))
+    response = {
+        "stress_level": stress_level,
+        "tips": tips,
+        "eye_strain": eye_strain_data,
+        "input_mappings": {
+            "original_mood": data.mood, "mapped_mood": mapped_mood,
+            "original_face_emotion": data.face_emotion, "mapped_face_emotion": mapped_face_emotion
+        } if (data.mood != mapped_mood or data.face_emotion != mapped_face_emotion) else None
+    }
+    if explanation is not None:
+        response["explanation"] = explanation
+    return response
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def observe_drift(prepared: list, X: np.ndarray, preds, stages=_NULL_STAGES):
+    if drift_monitor is None:
+        return
+    # Whether map_label replaced the mood / face_emotion the client sent
+    remapped = [(data.mood != mood, data.face_emotion != face_emotion) for data, mood, face_emotion in prepared]
+    drift_monitor.observe(X, preds, remapped)
+    stages.mark("drift")
+
+def offer_shadow(bundle: ModelBundle, prepared: list, X: np.ndarray, preds, stages=_NULL_STAGES):
+    if shadow_evaluator is None:
+        return
+    shadow_evaluator.offer(bundle, [data for data, _, _ in prepared], X, preds)
+    stages.mark("shadow")
+
+@router.get("/shadow")
+def shadow_report():
+    """
+    Agreement of each shadow candidate with the primary model on sampled live
+    requests, per primary class, with per-row scoring time of both. This is
+    the evidence `train_model.py promote <name>` reads.
+    """
+    if shadow_evaluator is None:
+        return {"enabled": False, "directory": SHADOW_DIR}
+    return {"enabled": True, "directory": SHADOW_DIR, **shadow_evaluator.report()}
+
+@router.get("/drift")
+def drift_report():
+    """
+    PSI per feature and for the predicted stress level (KS as well for the
+    numeric features) of the last one to two DRIFT_WINDOW_SECONDS of
+    predictions against the profile captured when the model was trained.
+    """
+    if drift_monitor is None:
+        return {"enabled": False}
+    return {"enabled": True, **drift_monitor.report()}
+
+@router.get("/cache/stats")
+def cache_stats():
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_cache.stats()}
+
+def score_prepared(prepared: list, bundle: ModelBundle, stages=_NULL_STAGES, explain: bool = False) -> List[dict]:
+    """Run one vectorized prediction over already prepared inputs."""
+    try:
+        X = build_feature_matrix(prepared, bundle)
+        stages.mark("encode")
+        if explain:
+            preds, explanations = explain_encoded(X, bundle)
+            stages.mark("explain")
+        else:
+            preds, explanations = predict_encoded(X, bundle), [None] * len(prepared)
+            stages.mark("predict")
+        observe_drift(prepared, X, preds, stages)
+        offer_shadow(bundle, prepared, X, preds, stages)
+        stress_levels = bundle.spec.decode(preds)
+        stages.mark("decode")
+        responses = [build_response(*item, str(stress_level), explanation)
+                     for item, stress_level, explanation in zip(prepared, stress_levels, explanations)]
+        stages.mark("response")
+        if METRICS_ENABLED:
+            for stress_level in stress_levels:
+                prediction_count.inc(str(stress_level))
+        return responses
+    except Exception as e:
+        logger.error(f"Batch prediction error: {str(e)}", exc_info=True)
+        return [{"error": f"Prediction failed: {str(e)}"} for _ in prepared]
+
+def score_inputs(items: List[InputData], endpoint: str = "micro_batch") -> List[dict]:
+    bundle = model_service.bundle()
+    if bundle is None:
+        return [HTTPException(status_code=503, detail="Model or encoders not loaded.")] * len(items)
+    stages = start_stages(endpoint)
+    results: List[Any] = [None] * len(items)
+    prepared = []
+    positions = []
+    for i, data in enumerate(items):
         try:
-            face_enc = encoders["face_emotion"].transform([mapped_face_emotion])[0]
-        except Exception:
-            face_enc = 0
+            prepared.append(prepare_input(data, bundle))
+            positions.append(i)
+        except Exception as e:
+            results[i] = {"error": f"Prediction failed: {str(e)}"}
+    stages.mark("prepare")
+    for i, result in zip(positions, score_prepared(prepared, bundle, stages) if prepared else []):
+        results[i] = result
+    if request_log.sample(stages.total()):
+        request_log.emit(endpoint, stages.total(), records=len(items), stages_ms=stages.summary_ms())
+    return results
+
+# Optional coalescing of concurrent /predict calls into one vectorized call.
+# MICRO_BATCH_MAX_SIZE=0 (the default) keeps one prediction per request.
+MICRO_BATCH_MAX_SIZE = int(os.environ.get("MICRO_BATCH_MAX_SIZE", "0"))
+MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get("MICRO_BATCH_MAX_WAIT_MS", "5"))
+
+micro_batcher = MicroBatcher(
+    score_inputs,
+    max_batch_size=MICRO_BATCH_MAX_SIZE,
+    max_wait_ms=MICRO_BATCH_MAX_WAIT_MS,
+) if MICRO_BATCH_MAX_SIZE > 0 else None
+
+@router.get("/batching/stats")
+def batching_stats():
+    if micro_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **micro_batcher.stats()}
+
+# Admission control for /predict and /predict/batch: ADMISSION_MAX_CONCURRENCY
+# requests run at once and ADMISSION_MAX_QUEUE wait for a slot (0: none wait);
+# the rest get 429 with Retry-After. A /predict that can't finish within its deadline (the
+# X-Deadline-Ms header, else ADMISSION_DEADLINE_MS; 0 for none) is answered from
+# the prediction cache or the first ADMISSION_DEGRADED_TREES trees instead, a
+# batch or explain=true request gets 503. While the queue is full or the event
+# loop runs more than ADMISSION_MAX_LAG_MS behind, requests are refused before
+# their body is even parsed. ADMISSION_MAX_CONCURRENCY=0 turns it all off.
+ADMISSION_MAX_CONCURRENCY = int(os.environ.get(
+    "ADMISSION_MAX_CONCURRENCY", str(max(2 * (os.cpu_count() or 1), MICRO_BATCH_MAX_SIZE))))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_DEADLINE_MS = float(os.environ.get("ADMISSION_DEADLINE_MS", "250"))
+ADMISSION_DEGRADED_TREES = int(os.environ.get("ADMISSION_DEGRADED_TREES", "15"))
+ADMISSION_MAX_LAG_MS = float(os.environ.get("ADMISSION_MAX_LAG_MS", "50"))
 
-        X = np.array([[
-            mood_enc, data.sleep_hours, data.workload, face_enc,
-            data.blink_rate, data.caffeine_intake, data.exercise_hours, data.screen_time
-        ]], dtype=float)
+admission = AdmissionController(
+    max_concurrency=ADMISSION_MAX_CONCURRENCY,
+    max_queue=ADMISSION_MAX_QUEUE,
+    deadline_ms=ADMISSION_DEADLINE_MS,
+    max_lag_ms=ADMISSION_MAX_LAG_MS,
+) if ADMISSION_MAX_CONCURRENCY > 0 else None
+if admission is not None:
+    metrics.register(Gauge(
+        "stress_api_admission_slots", "Requests holding and waiting for a prediction slot", ["state"],
+        collect=lambda: [(("active",), admission.active), (("queued",), admission.queued)]))
+    metrics.register(Gauge(
+        "stress_api_admission_outcomes", "Admission decisions since start", ["outcome"],
+        collect=lambda: [((outcome,), count) for outcome, count in admission.outcomes.items()]))
 
-        logger.info(f"Input array values: {X[0]}")
+@router.get("/admission/stats")
+def admission_stats():
+    if admission is None:
+        return {"enabled": False}
+    return {"enabled": True, "degraded_trees": ADMISSION_DEGRADED_TREES, **admission.stats()}
 
-        pred = model.predict(X)[0]
-        stress_level = encoders["stress_level"].inverse_transform([pred])[0]
-        tips = tips_mapping.get(stress_level, tips_mapping["medium"])
+async def admit(call, x_deadline_ms: Optional[float], degraded=None):
+    if admission is None:
+        return await call()
+    if not model_service.started:
+        # The lazy first load takes seconds; timed inside a slot it would inflate
+        # the service-time average and push queued requests to the degraded path
+        await run_in_threadpool(model_service.bundle)
+    deadline = None if x_deadline_ms is None else x_deadline_ms / 1000.0
+    try:
+        return await admission.run(call, degraded=degraded, deadline=deadline)
+    except Overloaded as e:
+        raise HTTPException(status_code=e.status_code, detail=f"Server overloaded: {e.reason}",
+                            headers={"Retry-After": str(e.retry_after)})
+
+def predict_degraded(data: InputData) -> JSONResponse:
+    """
+    The answer for a /predict that would miss its deadline in the queue: the
+    full forest's prediction if the cache holds the row, else the first
+    ADMISSION_DEGRADED_TREES trees' vote. Runs on the event loop, so it skips
+    the drift monitor and never loads a model.
+    """
+    bundle = registry.active if model_service.started else None
+    if bundle is None:
+        raise HTTPException(status_code=503, detail="Model or encoders not loaded.")
+    stages = start_stages("degraded")
+    data, mapped_mood, mapped_face_emotion = prepare_input(data, bundle, stages)
+    X = build_feature_matrix([(data, mapped_mood, mapped_face_emotion)], bundle)
+    stages.mark("encode")
+    cached = prediction_cache.lookup(X, bundle.version)[0] if prediction_cache is not None else None
+    if cached is None:
+        forest = bundle.forest.head(ADMISSION_DEGRADED_TREES)
+        preds, source = forest.predict(X), "reduced_forest"
+    else:
+        forest, preds, source = bundle.forest, np.array([cached]), "cache"
+    stages.mark("predict")
+    stress_level = str(bundle.spec.decode(preds)[0])
+    response = build_response(data, mapped_mood, mapped_face_emotion, stress_level)
+    response["degraded"] = {"reason": "deadline", "source": source, "trees": forest.n_trees}
+    stages.mark("response")
+    if METRICS_ENABLED:
+        prediction_count.inc(stress_level)
+    return JSONResponse(response, headers={"X-Degraded": source})
+
+@router.post("/predict")
+async def predict(data: InputData, explain: bool = False, x_deadline_ms: Optional[float] = Header(None)):
+    """
+    explain=true adds per-feature contributions to the predicted stress level's
+    probability. Answers carrying a "degraded" entry came from the fast path.
+    """
+    return await admit(lambda: score_one(data, explain), x_deadline_ms,
+                       degraded=None if explain else lambda: predict_degraded(data))
+
+async def score_one(data: InputData, explain: bool):
+    if micro_batcher is None or explain:
+        return await run_in_threadpool(predict_one, data, explain)
+    if await run_in_threadpool(model_service.bundle) is None:
+        raise HTTPException(status_code=503, detail="Model or encoders not loaded.")
+    result = await micro_batcher.submit(data)
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result
+
+def predict_one(data: InputData, explain: bool = False):
+    try:
+        bundle = model_service.bundle()
+        if bundle is None:
+            raise HTTPException(status_code=503, detail="Model or encoders not loaded.")
         
-        logger.info(f"Prediction successful: {stress_level}")
-
-        # <<< NEW CODE START
-        # Call the eye strain analysis function and add its result to the response
-        eye_strain_data = get_eye_strain_analysis(data.blink_rate, data.screen_time)
-        # <<< NEW CODE END
-
-        # Return the combined result
-        return {
-            "stress_level": stress_level,
-            "tips": tips,
-            "eye_strain": eye_strain_data, # <<< ADDED THIS LINE
-            "input_mappings": {
-                "original_mood": data.mood, "mapped_mood": mapped_mood,
-                "original_face_emotion": data.face_emotion, "mapped_face_emotion": mapped_face_emotion
-            } if (data.mood != mapped_mood or data.face_emotion != mapped_face_emotion) else None
-        }
+        stages = start_stages("predict")
+        data, mapped_mood, mapped_face_emotion = prepare_input(data, bundle, stages)
+        
+        X = build_feature_matrix([(data, mapped_mood, mapped_face_emotion)], bundle)
+        stages.mark("encode")
+
+        explanation = None
+        if explain:
+            preds, explanations = explain_encoded(X, bundle)
+            explanation = explanations[0]
+            stages.mark("explain")
+        else:
+            preds = predict_encoded(X, bundle)
+            stages.mark("predict")
+        pred = preds[0]
+        observe_drift([(data, mapped_mood, mapped_face_emotion)], X, preds, stages)
+        offer_shadow(bundle, [(data, mapped_mood, mapped_face_emotion)], X, preds, stages)
+        stress_level = bundle.spec.decode([pred])[0]
+        stages.mark("decode")
+
+        response = build_response(data, mapped_mood, mapped_face_emotion, stress_level, explanation)
+        stages.mark("response")
+        if METRICS_ENABLED:
+            prediction_count.inc(str(stress_level))
+
+        # Replaces the three unconditional INFO lines per request
+        if request_log.sample(stages.total()):
+            request_log.emit(
+                "prediction", stages.total(),
+                mood=data.mood, mapped_mood=mapped_mood,
+                face_emotion=data.face_emotion, mapped_face_emotion=mapped_face_emotion,
+                features=X[0].tolist(), stress_level=stress_level, stages_ms=stages.summary_ms(),
+            )
+        return JSONResponse(response) if explain else response
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}", exc_info=True)
-        return { "error": f"Prediction failed: {str(e)}" }
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+@router.post("/predict/batch")
+async def predict_batch(records: List[Dict[str, Any]], explain: bool = False,
+                        x_deadline_ms: Optional[float] = Header(None)):
+    """
+    Score many InputData records with a single vectorized forest.predict call.
+    Records that fail validation get an "error" entry in their slot instead of
+    failing the whole batch. explain=true adds an explanation to every result.
+    """
+    return await admit(lambda: run_in_threadpool(score_batch, records, explain), x_deadline_ms)
+
+def score_batch(records: List[Dict[str, Any]], explain: bool = False):
+    bundle = model_service.bundle()
+    if bundle is None:
+        raise HTTPException(status_code=503, detail="Model or encoders not loaded.")
+
+    stages = start_stages("batch")
+    results: List[Any] = [None] * len(records)
+    prepared = []
+    positions = []
+    for i, record in enumerate(records):
+        try:
+            prepared.append(prepare_input(InputData(**record), bundle))
+            positions.append(i)
+        except ValidationError as e:
+            results[i] = {"error": f"Invalid input: {e.errors()}"}
+        except Exception as e:
+            results[i] = {"error": f"Prediction failed: {str(e)}"}
+    # Pydantic validation of every record plus range checks and label mapping
+    stages.mark("validate")
+
+    for i, result in zip(positions, score_prepared(prepared, bundle, stages, explain) if prepared else []):
+        results[i] = result
+
+    errors = sum(1 for r in results if "error" in r)
+    if request_log.sample(stages.total()):
+        request_log.emit("batch_prediction", stages.total(), records=len(records), errors=errors,
+                         stages_ms=stages.summary_ms())
+    response = {"results": results, "count": len(records), "errors": errors}
+    # Explanations are plain floats and dicts; jsonable_encoder would walk all of them again
+    return JSONResponse(response) if explain else response
         
+# Labelled feedback for training/incremental.py, appended next to the models by default
+FEEDBACK_PATH = os.environ.get("FEEDBACK_PATH", os.path.join(MODEL_DIR, "feedback.csv"))
+feedback_store = FeedbackStore(FEEDBACK_PATH)
+
+class FeedbackData(InputData):
+    # The stress level the user reports for these inputs
+    stress_level: str
+
+@router.post("/feedback")
+def submit_feedback(records: Union[List[FeedbackData], FeedbackData]):
+    """
+    Store one labelled record, or a list of them, for the next incremental
+    update (python train_model.py update). Labels the model does not know
+    are rejected as a whole.
+    """
+    records = records if isinstance(records, list) else [records]
+    bundle = model_service.bundle()
+    if bundle is None:
+        raise HTTPException(status_code=503, detail="Model or encoders not loaded.")
+    known = bundle.spec.codes[TARGET_COLUMN]
+    unknown = sorted({record.stress_level for record in records} - set(known))
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown stress_level {unknown}, expected one of {sorted(known)}")
+    accepted = feedback_store.append([record.model_dump() for record in records], bundle.version)
+    return {"accepted": accepted, "model_version": bundle.version}
+
+@router.get("/feedback/stats")
+def feedback_stats():
+    return feedback_store.stats()
+
+# Face detection runs here instead of on the event loop; cv2 releases the GIL
+CV_WORKERS = int(os.environ.get("CV_WORKERS", str(os.cpu_count() or 1)))
+cv_executor = ThreadPoolExecutor(max_workers=CV_WORKERS, thread_name_prefix="cv")
+
+def analyze_frames(frames: List[bytes]) -> List[Any]:
+    from utils.cv_utils import analyze_frame_bytes
+
+    results = []
+    for frame in frames:
+        try:
+            results.append(analyze_frame_bytes(frame))
+        except Exception as e:
+            results.append(e)
+    return results
+
+@router.post("/analyze/frame")
+async def analyze_frame(
+    request: Request,
+    mood: Optional[str] = None,
+    sleep_hours: int = 6,
+    workload: int = 5,
+    blink_rate: int = 20,
+    caffeine_intake: int = 1,
+    exercise_hours: int = 1,
+    screen_time: int = 5,
+):
+    """
+    Detect the face emotion in one or more JPEG frames and predict stress from it.
+    Send a single frame as the raw request body (Content-Type: image/jpeg) or
+    several as multipart "frames" files. The other features come from query
+    parameters; mood defaults to the detected emotion, as in mood.py.
+    """
+    bundle = await run_in_threadpool(model_service.bundle)
+    if bundle is None:
+        raise HTTPException(status_code=503, detail="Model or encoders not loaded.")
+
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        frames = [await upload.read() for upload in form.getlist("frames")]
+    else:
+        frames = [await request.body()]
+    if not any(frames):
+        raise HTTPException(status_code=400, detail="No frame data received.")
+
+    loop = asyncio.get_running_loop()
+    chunk = max(1, -(-len(frames) // CV_WORKERS))
+    chunks = await asyncio.gather(*[
+        loop.run_in_executor(cv_executor, analyze_frames, frames[i:i + chunk])
+        for i in range(0, len(frames), chunk)
+    ])
+    detections = [detection for part in chunks for detection in part]
+
+    inputs = []
+    for detection in detections:
+        if isinstance(detection, Exception):
+            continue
+        inputs.append(InputData(
+            mood=mood or detection["face_emotion"], face_emotion=detection["face_emotion"],
+            sleep_hours=sleep_hours, workload=workload, blink_rate=blink_rate,
+            caffeine_intake=caffeine_intake, exercise_hours=exercise_hours, screen_time=screen_time
+        ))
+    predictions = iter(await run_in_threadpool(score_inputs, inputs, "frame") if inputs else [])
+
+    results = []
+    for detection in detections:
+        if isinstance(detection, Exception):
+            results.append({"error": f"Frame analysis failed: {str(detection)}"})
+        else:
+            results.append({**detection, "prediction": next(predictions)})
+    return {"results": results, "count": len(results)}
+
+registry.add_listener(on_model_swap)
+
+def create_app(warmup: str = None) -> FastAPI:
+    """
+    The API with both route sets sharing model_service: the endpoints above
+    and routes.py's 3-feature pipeline under /legacy. Importing or creating
+    the app loads no model; warmup ("model" or "all", WARMUP by default)
+    starts loading in the background once the server is up.
+    """
+    from routes import router as legacy_router
+
+    warmup = WARMUP if warmup is None else warmup
+    if warmup and warmup not in WARMUP_TARGETS:
+        raise ValueError(f"unknown WARMUP '{warmup}', expected one of {sorted(WARMUP_TARGETS)}")
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if warmup:
+            model_service.warmup_in_background(WARMUP_TARGETS[warmup])
+        yield
+        registry.stop()
+        if shadow_evaluator is not None:
+            shadow_evaluator.stop()
+        feedback_store.close()
+
+    app = FastAPI(title="Stress Level Prediction API", lifespan=lifespan)
+    app.state.model_service = model_service
+    app.include_router(router)
+    app.include_router(legacy_router, prefix="/legacy")
+
+    app.add_middleware(AdmissionMiddleware, controller=lambda: admission, paths=("/predict", "/predict/batch"))
+
+    paths = {route.path for route in router.routes}
+    paths.update(f"/legacy{route.path}" for route in legacy_router.routes)
+
+    app.add_middleware(
+        RequestMetricsMiddleware,
+        latency=request_latency,
+        requests=request_count,
+        paths=lambda: paths,
+        enabled=lambda: METRICS_ENABLED,
+    )
+    # Added last, so it is outermost: admission's 429/503 get CORS headers too
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # or ["http://localhost:3000"]
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["Retry-After", "X-Degraded"],
+    )
+    return app
+
+app = create_app()
+
 if __name__ == "__main__":
     import uvicorn
     import os
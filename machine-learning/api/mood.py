@@ -1,59 +1,64 @@
-import cv2
-from deepface import DeepFace
-import requests
+import argparse
+import json
+import os
+import sys
 
-API_URL = "http://127.0.0.1:8000/predict"  # FastAPI backend URL
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.cv_utils import EmotionGate
+from utils.frame_pipeline import MoodPipeline, deepface_emotion, deepface_face_emotion
 
-# Example fixed values for other features
-DEFAULT_DATA = {
-    "sleep_hours": 6,
-    "workload": 5,
-    "blink_rate": 20,
-    "caffeine_intake": 1,
-    "exercise_hours": 1,
-    "screen_time": 5
-}
+API_URL = "http://127.0.0.1:8000"  # FastAPI backend URL
 
-# Open webcam
-cap = cv2.VideoCapture(0)
 
-print("🎥 Press 'q' to quit.")
+def print_result(payload, result):
+    print("Detected mood:", payload["mood"])
+    if "error" in result:
+        print("API Error:", result["error"])
+    else:
+        print("Stress Prediction:", result)
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
 
+def main():
+    parser = argparse.ArgumentParser(description="Stream webcam (or video file) emotions to the stress API")
+    parser.add_argument("--source", default="0", help="Camera index or path to a recorded video")
+    parser.add_argument("--api-url", default=API_URL)
+    parser.add_argument("--capture-fps", type=float, default=30.0)
+    parser.add_argument("--analysis-fps", type=float, default=5.0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--batch-wait-ms", type=float, default=200.0)
+    parser.add_argument("--no-gate", action="store_true",
+                        help="Run DeepFace on every analysed full frame instead of the tracked, change-gated face")
+    parser.add_argument("--change-threshold", type=float, default=6.0,
+                        help="Grey-level change of any face block below which inference is skipped")
+    parser.add_argument("--smooth-window", type=int, default=5, help="Inferences in the emotion majority vote")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    if args.no_gate:
+        analyze_fn = deepface_emotion
+    else:
+        analyze_fn = EmotionGate(deepface_emotion, deepface_face_emotion,
+                                 change_threshold=args.change_threshold, window=args.smooth_window)
+    pipeline = MoodPipeline(
+        source=source,
+        api_url=args.api_url,
+        analyze_fn=analyze_fn,
+        capture_fps=args.capture_fps,
+        analysis_fps=args.analysis_fps,
+        batch_size=args.batch_size,
+        batch_wait_ms=args.batch_wait_ms,
+        on_result=print_result,
+    )
+
+    print("🎥 Press Ctrl+C to quit.")
+    pipeline.start()
     try:
-        # Detect emotions
-        result = DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
-        mood = result[0]['dominant_emotion']
-        print("Detected mood:", mood)
-
-        # Send to FastAPI
-        payload = {
-            "mood": mood,
-            "sleep_hours": DEFAULT_DATA["sleep_hours"],
-            "workload": DEFAULT_DATA["workload"],
-            "face_emotion": mood,
-            "blink_rate": DEFAULT_DATA["blink_rate"],
-            "caffeine_intake": DEFAULT_DATA["caffeine_intake"],
-            "exercise_hours": DEFAULT_DATA["exercise_hours"],
-            "screen_time": DEFAULT_DATA["screen_time"]
-        }
-
-        response = requests.post(API_URL, json=payload)
-        if response.status_code == 200:
-            print("Stress Prediction:", response.json())
-        else:
-            print("API Error:", response.text)
-
-    except Exception as e:
-        print("Error:", str(e))
-
-    # Quit with q
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
+        pipeline.join()
+    except KeyboardInterrupt:
+        pipeline.stop()
+        pipeline.join()
+    print(json.dumps(pipeline.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
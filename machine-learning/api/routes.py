@@ -1,17 +1,19 @@
-from fastapi import APIRouter
-from .schemas import StressInput, StressOutput
-import joblib
-import os
-import pandas as pd
+from fastapi import APIRouter, HTTPException, Request
+from schemas import StressInput, StressOutput
 
+# Served under /legacy by main.create_app(). The 3-feature pipeline
+# (models/stress_model.pkl) and pandas are loaded on the first request.
 router = APIRouter()
 
-# Load model
-model_path = os.path.join(os.path.dirname(__file__), "../models/stress_model.pkl")
-model = joblib.load(model_path)
-
 @router.post("/predict", response_model=StressOutput)
-def predict_stress(data: StressInput):
+def predict_stress(data: StressInput, request: Request):
+    import pandas as pd
+
+    try:
+        model = request.app.state.model_service.legacy_model()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
     # Convert input to DataFrame
     X = pd.DataFrame([{
         "mood": data.mood,
@@ -0,0 +1,67 @@
+"""
+Multi-worker launcher for the stress API.
+
+In the default mmap mode every worker opens training/stress_model.forest with
+numpy memory maps instead of unpickling the RandomForest, so the forest pages
+are shared between workers. The artifact is (re)exported from the pickle
+first if it is missing or older than it.
+
+    python serve.py --workers 4
+    python serve.py --workers 4 --format pickle
+    python serve.py --workers 4 --warmup all
+"""
+import argparse
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRAINING_DIR = os.path.join(BASE_DIR, "..", "training")
+sys.path.append(os.path.join(BASE_DIR, ".."))
+
+
+def ensure_mmap_artifact():
+    from utils.artifact_format import HEADER_NAME, save_mmap_artifact
+    from utils.forest_engine import CompiledForest
+    from utils.model_registry import ModelRegistry
+
+    artifact = os.path.join(TRAINING_DIR, "stress_model.forest")
+    model_path = os.path.join(TRAINING_DIR, "stress_model.pkl")
+    header_path = os.path.join(artifact, HEADER_NAME)
+
+    candidate = ModelRegistry(TRAINING_DIR, artifact_format="mmap").latest_candidate()
+    if candidate is not None and candidate[1] != artifact:
+        return  # versioned artifacts are published together with their pickles
+    if os.path.exists(header_path) and os.path.getmtime(header_path) >= os.path.getmtime(model_path):
+        return
+
+    import joblib
+
+    print("📦 Exporting stress_model.pkl to stress_model.forest ...")
+    model = joblib.load(model_path)
+    encoders = joblib.load(os.path.join(TRAINING_DIR, "encoders.pkl"))
+    save_mmap_artifact(CompiledForest.from_sklearn(model), encoders, artifact)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the stress API with several uvicorn workers")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--format", choices=["mmap", "pickle"], default="mmap")
+    parser.add_argument("--warmup", choices=["model", "all"],
+                        help="Load the model (all: also the legacy pipeline and face detector) at startup")
+    args = parser.parse_args()
+
+    if args.format == "mmap":
+        ensure_mmap_artifact()
+    os.environ["MODEL_FORMAT"] = args.format
+    if args.warmup:
+        os.environ["WARMUP"] = args.warmup
+
+    import uvicorn
+
+    uvicorn.run("main:app", app_dir=BASE_DIR, host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
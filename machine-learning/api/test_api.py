@@ -14,3 +14,7 @@ data = {
 
 res = requests.post("http://127.0.0.1:8000/predict", json=data)
 print(res.json())
+
+batch = [data, {**data, "mood": "happy", "sleep_hours": 8, "workload": 2}]
+res = requests.post("http://127.0.0.1:8000/predict/batch", json=batch)
+print(res.json())
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Modules import each other the way the scripts run them: utils.* from the
+# machine-learning/ root, api/ and training/ modules by bare name
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+for path in (ROOT, os.path.join(ROOT, "api"), os.path.join(ROOT, "training")):
+    if path not in sys.path:
+        sys.path.append(path)
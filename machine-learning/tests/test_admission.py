@@ -0,0 +1,115 @@
+"""AdmissionController slots and queue, and how the API's middleware answers a shed request."""
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from utils.admission import AdmissionController, Overloaded
+
+PAYLOAD = {"mood": "sad", "sleep_hours": 4, "workload": 8, "face_emotion": "sad",
+           "blink_rate": 18, "caffeine_intake": 3, "exercise_hours": 1, "screen_time": 9}
+
+
+async def hold(controller, release: asyncio.Event, result):
+    async def call():
+        await release.wait()
+        return result
+    return await controller.run(call, deadline=0)
+
+
+def test_no_queue_admits_while_slots_are_free():
+    controller = AdmissionController(max_concurrency=1, max_queue=0)
+
+    async def scenario():
+        controller.check()
+        assert await controller.run(lambda: asyncio.sleep(0, "done")) == "done"
+        release = asyncio.Event()
+        running = asyncio.ensure_future(hold(controller, release, "first"))
+        await asyncio.sleep(0)
+        # The only slot is taken and nobody may wait for it
+        with pytest.raises(Overloaded) as shed:
+            controller.check()
+        assert shed.value.status_code == 429
+        with pytest.raises(Overloaded):
+            await controller.run(lambda: asyncio.sleep(0, "second"))
+        release.set()
+        assert await running == "first"
+        controller.check()
+
+    asyncio.run(scenario())
+    assert controller.active == 0
+    assert controller.outcomes["admitted"] == 2
+
+
+def test_full_queue_sheds_and_waiters_run_in_order():
+    controller = AdmissionController(max_concurrency=1, max_queue=2, deadline_ms=0)
+
+    async def scenario():
+        release = asyncio.Event()
+        tasks = []
+        for n in range(3):
+            tasks.append(asyncio.ensure_future(hold(controller, release, n)))
+            await asyncio.sleep(0)
+        assert (controller.active, controller.queued) == (1, 2)
+        with pytest.raises(Overloaded) as shed:
+            controller.check()
+        assert shed.value.status_code == 429 and shed.value.retry_after >= 1
+        with pytest.raises(Overloaded):
+            await controller.run(lambda: asyncio.sleep(0, "late"))
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(scenario()) == [0, 1, 2]
+    assert (controller.active, controller.queued) == (0, 0)
+    assert controller.outcomes["shed_queue_full"] == 2
+
+
+@pytest.fixture(scope="module")
+def api():
+    os.environ.setdefault("MODEL_POLL_INTERVAL", "0")
+    import main
+    return main
+
+
+def test_shed_responses_carry_cors_headers_and_preflights_pass(api, monkeypatch):
+    full = AdmissionController(max_concurrency=1, max_queue=0)
+    full.active = 1
+    monkeypatch.setattr(api, "admission", full)
+    origin = {"Origin": "http://localhost:3000"}
+    with TestClient(api.create_app()) as client:
+        response = client.post("/predict", json=PAYLOAD, headers=origin)
+        assert response.status_code == 429
+        assert response.headers["access-control-allow-origin"] == "http://localhost:3000"
+        assert "retry-after" in response.headers["access-control-expose-headers"].lower()
+        assert "retry-after" in response.headers
+
+        preflight = client.options("/predict", headers={**origin, "Access-Control-Request-Method": "POST"})
+        assert preflight.status_code == 200
+        assert preflight.headers["access-control-allow-origin"] == "http://localhost:3000"
+
+        monkeypatch.setattr(api, "admission", AdmissionController(max_concurrency=1, max_queue=0))
+        response = client.post("/predict", json=PAYLOAD, headers=origin)
+        assert response.status_code == 200
+        assert response.headers["access-control-allow-origin"] == "http://localhost:3000"
+
+
+def test_first_model_load_is_not_timed_as_service(api, monkeypatch):
+    from utils.model_registry import ModelRegistry
+    from utils.model_service import ModelService
+
+    service = ModelService(ModelRegistry(api.MODEL_DIR, poll_interval=0, artifact_format=api.MODEL_FORMAT))
+    start = service.start
+
+    def slow_start():
+        time.sleep(1.0)
+        start()
+    monkeypatch.setattr(service, "start", slow_start)
+    monkeypatch.setattr(api, "model_service", service)
+    controller = AdmissionController(max_concurrency=2)
+    monkeypatch.setattr(api, "admission", controller)
+    with TestClient(api.create_app()) as client:
+        assert client.post("/predict", json=PAYLOAD).status_code == 200
+    assert service.started
+    assert controller.stats()["service_ms"] < 50
@@ -0,0 +1,60 @@
+"""DriftMonitor's per-thread counters as threads come and go."""
+import os
+import threading
+
+import joblib
+import numpy as np
+import pytest
+
+from utils.drift_monitor import DriftMonitor, _Shard
+from utils.feature_spec import FeatureSpec
+
+TRAINING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "training")
+
+
+@pytest.fixture(scope="module")
+def spec():
+    return FeatureSpec(joblib.load(os.path.join(TRAINING_DIR, "encoders.pkl")))
+
+
+def observe_in_threads(monitor, X, preds, threads: int) -> None:
+    for _ in range(threads):
+        thread = threading.Thread(target=monitor.observe, args=(X, preds))
+        thread.start()
+        thread.join()
+
+
+def test_exited_threads_leave_their_counts_but_not_their_shards(spec):
+    clock = [0.0]
+    monitor = DriftMonitor(window_seconds=60, clock=lambda: clock[0])
+    monitor.set_reference(spec, None)
+    X = np.array([[1, 6, 5, 2, 20, 1, 1, 5], [3, 8, 2, 0, 15, 0, 2, 3]], dtype=np.float32)
+    preds = np.array([0, 2])
+
+    observe_in_threads(monitor, X, preds, 500)
+
+    shards = monitor._state[2]
+    assert len(shards) == 1
+    assert monitor.report()["rows"] == 1000
+    # A new window keeps the retired counts as the previous one, then drops them
+    clock[0] = 61.0
+    observe_in_threads(monitor, X[:1], preds[:1], 10)
+    assert len(shards) == 1
+    assert monitor.report()["rows"] == 1010
+    clock[0] = 121.0
+    assert monitor.report()["rows"] == 10
+
+
+def test_shard_merge_lines_up_windows():
+    retired, shard = _Shard(3, 4), _Shard(3, 5)
+    retired.current = [1, 0, 0]
+    shard.current, shard.previous = [0, 2, 0], [0, 0, 3]
+    retired.merge(shard)
+    assert (retired.window, retired.current, retired.previous) == (5, [0, 2, 0], [1, 0, 3])
+
+    older = _Shard(3, 4)
+    older.current = [5, 0, 0]
+    retired.merge(older)
+    assert retired.previous == [6, 0, 3]
+    retired.merge(_Shard(3, 1))
+    assert (retired.current, retired.previous) == ([0, 2, 0], [6, 0, 3])
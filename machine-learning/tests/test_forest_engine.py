@@ -0,0 +1,67 @@
+"""CompiledForest against the sklearn forest it was compiled from."""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from utils.forest_engine import CompiledForest
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(0)
+    # Integer-valued columns like the API's, plus a continuous one
+    X = np.column_stack([rng.integers(0, 10, 600), rng.integers(0, 24, 600), rng.normal(5.0, 2.0, 600)])
+    y = np.where(X[:, 0] + rng.normal(0, 2, 600) > 5, "high", np.where(X[:, 2] > 5, "medium", "low"))
+    model = RandomForestClassifier(n_estimators=25, min_samples_split=3, random_state=0).fit(X, y)
+    return model, CompiledForest.from_sklearn(model), X
+
+
+def threshold_rows(model, X) -> np.ndarray:
+    """Rows whose split feature sits exactly on, and one float32 step either side of, every threshold."""
+    rows = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        for node in np.flatnonzero(tree.children_left != -1):
+            at = np.float32(tree.threshold[node])
+            for value in (at, np.nextafter(at, np.float32(-np.inf)), np.nextafter(at, np.float32(np.inf))):
+                row = X[node % len(X)].astype(np.float32)
+                row[tree.feature[node]] = value
+                rows.append(row)
+    return np.array(rows, dtype=np.float32)
+
+
+def test_predictions_match_sklearn(fitted):
+    model, forest, X = fitted
+    assert np.array_equal(forest.predict(X), model.predict(X))
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+
+
+def test_float32_inputs_at_split_thresholds(fitted):
+    model, forest, X = fitted
+    rows = threshold_rows(model, X)
+    assert np.array_equal(forest.apply(rows), np.column_stack([e.apply(rows) for e in model.estimators_])
+                          + forest.roots)
+    assert np.array_equal(forest.predict(rows), model.predict(rows))
+    np.testing.assert_allclose(forest.predict_proba(rows), model.predict_proba(rows), rtol=0, atol=1e-12)
+
+
+def test_save_load_and_head(fitted, tmp_path):
+    model, forest, X = fitted
+    path = str(tmp_path / "forest.npz")
+    forest.save(path)
+    assert np.array_equal(CompiledForest.load(path).predict_proba(X), forest.predict_proba(X))
+    head = forest.head(5)
+    expected = np.mean([e.predict_proba(X) for e in model.estimators_[:5]], axis=0)
+    np.testing.assert_allclose(head.predict_proba(X), expected, rtol=0, atol=1e-12)
+
+
+def test_explain_builds_tables_on_first_use_and_adds_up(fitted):
+    model, _, X = fitted
+    forest = CompiledForest.from_sklearn(model)
+    forest.n_features = 4
+    assert forest.contributions_nbytes == 0
+    proba, contributions = forest.explain(X)
+    assert contributions.shape == (len(X), 4, len(forest.classes))
+    assert not contributions[:, 3].any()
+    np.testing.assert_allclose(proba, forest.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(forest.bias + contributions.sum(axis=1), proba, rtol=0, atol=1e-9)
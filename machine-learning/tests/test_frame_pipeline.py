@@ -0,0 +1,56 @@
+"""MoodPipeline end to end: a recorded clip into a local stub of the API."""
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from benchmark_mood_pipeline import StubHandler, record_clip
+from utils.frame_pipeline import MoodPipeline
+
+
+@pytest.fixture
+def stub():
+    StubHandler.connections, StubHandler.requests = set(), 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def stand_in(frame):
+    time.sleep(0.02)
+    return "neutral"
+
+
+def test_clip_is_analyzed_and_sent_over_one_connection(stub, tmp_path):
+    video = str(tmp_path / "clip.avi")
+    record_clip(video, seconds=1.5, fps=30.0)
+    pipeline = MoodPipeline(source=video, api_url=stub, analyze_fn=stand_in, capture_fps=30.0,
+                            analysis_fps=10.0, batch_wait_ms=50.0)
+    pipeline.start()
+    pipeline.join(timeout=30)
+    stats = pipeline.stats()
+
+    assert stats["captured"] == 45
+    assert stats["analyzed"] > 0
+    assert stats["analysis_errors"] == 0
+    assert stats["send_errors"] == 0
+    assert stats["sent"] == stats["analyzed"]
+    assert StubHandler.requests == stats["batches"]
+    # The pooled keep-alive client reuses a single connection
+    assert len(StubHandler.connections) == 1
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_capture_failure_still_ends_the_pipeline(stub, monkeypatch):
+    # Importing cv2 raises ImportError, as on a machine without OpenCV
+    monkeypatch.setitem(sys.modules, "cv2", None)
+    pipeline = MoodPipeline(source="missing.avi", api_url=stub, analyze_fn=stand_in)
+    pipeline.start()
+    pipeline.join(timeout=10)
+
+    assert not any(thread.is_alive() for thread in pipeline._threads)
+    assert pipeline.stats()["sent"] == 0
@@ -0,0 +1,26 @@
+"""ShadowStats scoring-error counts across threads and version changes."""
+import threading
+
+from utils.shadow import ShadowStats
+
+
+def test_errors_count_under_the_lock_and_reset_with_the_version_pair():
+    stats = ShadowStats()
+
+    def fail():
+        for _ in range(1000):
+            stats.record_error("v1", "s1", "ValueError: bad")
+
+    threads = [threading.Thread(target=fail) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report = stats.report()
+    assert report["errors"] == 4000
+    assert report["last_error"] == "ValueError: bad"
+
+    stats.record("v1", "s2", ["low"], ["low"], 10.0, 12.0)
+    report = stats.report()
+    assert (report["errors"], report["last_error"]) == (0, None)
+    assert report["rows"] == 1
@@ -0,0 +1,66 @@
+"""
+Parity check and microbenchmark for the compiled forest engine, on the
+shipped model. tests/test_forest_engine.py holds the parity guarantee itself.
+
+Run from the training/ directory:
+    python benchmark_forest.py
+"""
+import os
+import sys
+import time
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.feature_spec import FEATURE_COLUMNS, FeatureSpec
+from utils.forest_engine import CompiledForest
+
+
+def load_encoded_dataset(path, encoders):
+    df = pd.read_csv(path)
+    X, _ = FeatureSpec(encoders).encode_columns({col: df[col].to_numpy() for col in FEATURE_COLUMNS})
+    return X
+
+
+def time_call(fn, repeats):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    model = joblib.load("stress_model.pkl")
+    encoders = joblib.load("encoders.pkl")
+    forest = CompiledForest.from_sklearn(model)
+    X = load_encoded_dataset("stress_data.csv", encoders)
+
+    print(f"🌳 Compiled {forest.n_trees} trees, {forest.n_nodes} nodes, max depth {forest.max_depth}")
+    print(f"   Array footprint: {forest.nbytes / 1024:.1f} KiB")
+
+    # Parity: identical labels and probabilities on the full training CSV
+    sk_pred = model.predict(X)
+    fast_pred = forest.predict(X)
+    mismatches = int(np.sum(sk_pred != fast_pred))
+    max_proba_diff = float(np.max(np.abs(model.predict_proba(X) - forest.predict_proba(X))))
+    print(f"\n🔍 Parity on {len(X)} rows: {mismatches} label mismatches, max |Δproba| = {max_proba_diff:.2e}")
+    if mismatches:
+        sys.exit("❌ Compiled forest disagrees with sklearn")
+    print("✅ Predictions identical")
+
+    # Latency
+    single = X[:1]
+    print("\n⏱️ Latency (mean per call):")
+    for name, fn_sk, fn_fast, repeats in [
+        ("single row", lambda: model.predict(single), lambda: forest.predict(single), 200),
+        (f"batch of {len(X)}", lambda: model.predict(X), lambda: forest.predict(X), 20),
+    ]:
+        t_sk = time_call(fn_sk, repeats)
+        t_fast = time_call(fn_fast, repeats)
+        print(f"  {name:>14}: sklearn {t_sk * 1e3:8.3f} ms | compiled {t_fast * 1e3:8.3f} ms | {t_sk / t_fast:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Incremental updates against full retraining as feedback accumulates.
+
+Run from the training/ directory:
+    python benchmark_incremental.py --steps 8 --batch-rows 2000
+
+A base model is trained on --base-rows rows of sample_dataset() and
+published into two scratch model directories. Then, --steps times,
+--batch-rows feedback rows are appended to a FeedbackStore and the model is
+brought up to date twice:
+
+    incremental  train_model.py update (incremental.update) on the new rows
+    full         train_model.py end to end on base + all feedback: coverage
+                 rows, LabelEncoders, 150 trees, 5-fold CV (--no-cv skips
+                 it) and publish_artifacts
+
+Both are timed from start to published artifact and scored on --test-rows
+fresh rows of the feedback distribution. By default that distribution has
+drifted from the base data (short sleep or heavy workload means high stress,
+rested and active means low), so the base model starts out wrong on it;
+--no-drift draws feedback like the base data.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from argparse import Namespace
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import incremental
+from synthetic_data import sample_dataset
+from train_model import FEATURE_COLUMNS, MODEL_PARAMS, create_synthetic_data_if_needed, encode_categoricals
+from utils.feature_spec import FeatureSpec
+from utils.feedback_store import FeedbackStore
+from utils.model_registry import ModelRegistry, publish_artifacts
+from score import load_bundle
+
+BASE_VERSION = "00000000000000"
+
+
+def feedback_rows(n: int, rng: np.random.Generator, drift: bool) -> pd.DataFrame:
+    df = sample_dataset(n, rng)
+    for col in ("sleep_hours", "exercise_hours"):
+        # The API takes whole numbers
+        df[col] = df[col].round().astype(int)
+    if drift:
+        df.loc[(df["sleep_hours"] >= 7) & (df["exercise_hours"] >= 2), "stress_level"] = "low"
+        df.loc[(df["sleep_hours"] <= 5) | (df["workload"] >= 8), "stress_level"] = "high"
+    return df
+
+
+def full_retrain(frames: list, model_dir: str, cv: bool, seed: int) -> tuple:
+    """What train_model.main() does, from the raw rows to a published version."""
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = create_synthetic_data_if_needed(pd.concat(frames, ignore_index=True), np.random.default_rng(seed))
+    df, encoders = encode_categoricals(df)
+    X, y = df[FEATURE_COLUMNS], df["stress_level"]
+    model = RandomForestClassifier(**MODEL_PARAMS).fit(X, y)
+    if cv:
+        cross_val_score(model, X, y, cv=StratifiedKFold(n_splits=5, shuffle=True, random_state=42), scoring="accuracy")
+    publish_artifacts(model, encoders, model_dir, incremental.next_version(model_dir))
+    return model, encoders, time.perf_counter() - started
+
+
+def accuracy(forest, spec, test: pd.DataFrame) -> float:
+    X, y = incremental.encode_feedback(test, spec)
+    return float((forest.predict(X) == y).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare incremental updates with full retraining")
+    parser.add_argument("--base-rows", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=8)
+    parser.add_argument("--batch-rows", type=int, default=2000)
+    parser.add_argument("--test-rows", type=int, default=5000)
+    parser.add_argument("--new-trees", type=int, default=15)
+    parser.add_argument("--max-trees", type=int, default=150)
+    parser.add_argument("--retire", choices=["oldest", "worst"], default="worst")
+    parser.add_argument("--window-rows", type=int, default=5000)
+    parser.add_argument("--no-drift", action="store_true")
+    parser.add_argument("--no-cv", action="store_true", help="Leave the 5-fold CV out of the full retrain")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    drift = not args.no_drift
+    test = feedback_rows(args.test_rows, rng, drift)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="stress-incremental-") as tmp:
+        inc_dir, full_dir = os.path.join(tmp, "incremental"), os.path.join(tmp, "full")
+        os.makedirs(inc_dir)
+        os.makedirs(full_dir)
+        base = sample_dataset(args.base_rows, rng)
+        base_path = os.path.join(tmp, "stress_data.csv")
+        base.to_csv(base_path, index=False)
+        model, encoders, _ = full_retrain([base], full_dir, False, args.seed)
+        publish_artifacts(model, encoders, inc_dir, BASE_VERSION)
+        base_accuracy = accuracy(load_bundle(ModelRegistry(inc_dir, 0).latest_candidate()).forest,
+                                 FeatureSpec(encoders), test)
+        print(f"📊 Base model on {args.base_rows:,} rows: accuracy {base_accuracy:.4f} on the "
+              f"{'drifted' if drift else 'base'} feedback distribution")
+
+        store = FeedbackStore(os.path.join(inc_dir, "feedback.csv"))
+        update_args = Namespace(
+            model_dir=inc_dir, feedback=store.path, data=base_path, cache_dir=os.path.join(tmp, "cache"),
+            min_new_rows=1, window_rows=args.window_rows, replay_rows=1000, new_trees=args.new_trees,
+            max_trees=args.max_trees, retire=args.retire, holdout_fraction=0.2, max_accuracy_drop=1.0,
+            seed=None, report=None,
+        )
+        # Build the replay cache outside the timings, as a previous run would have
+        with contextlib.redirect_stdout(io.StringIO()):
+            incremental.load_dataset(base_path, cache_dir=update_args.cache_dir)
+
+        feedback = []
+        print(f"\n{'rows':>8} {'update s':>9} {'update acc':>11} {'full s':>8} {'full acc':>9} {'speedup':>8}")
+        for step in range(1, args.steps + 1):
+            batch = feedback_rows(args.batch_rows, rng, drift)
+            feedback.append(batch)
+            store.append(batch.to_dict("records"))
+
+            update_args.seed = int(rng.integers(2**31))
+            report = incremental.update(update_args)
+            bundle = load_bundle(ModelRegistry(inc_dir, 0).latest_candidate())
+            inc_accuracy = accuracy(bundle.forest, bundle.spec, test)
+
+            model, encoders, full_seconds = full_retrain([base] + feedback, full_dir, not args.no_cv, args.seed)
+            bundle = load_bundle(ModelRegistry(full_dir, 0).latest_candidate())
+            full_accuracy = accuracy(bundle.forest, bundle.spec, test)
+
+            rows = args.base_rows + step * args.batch_rows
+            results.append({
+                "rows": rows, "update_seconds": report["wall_seconds"], "update_accuracy": inc_accuracy,
+                "full_seconds": full_seconds, "full_accuracy": full_accuracy, "trees": report["trees"],
+            })
+            print(f"{rows:>8,} {report['wall_seconds']:>9.2f} {inc_accuracy:>11.4f} {full_seconds:>8.2f} "
+                  f"{full_accuracy:>9.4f} {full_seconds / report['wall_seconds']:>7.1f}x")
+        store.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"base_accuracy": base_accuracy, "drift": drift, "steps": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
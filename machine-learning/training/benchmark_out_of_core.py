@@ -0,0 +1,76 @@
+"""
+Peak memory and wall time of out-of-core training at 1M and 10M rows.
+
+For each size a dataset is streamed with synthetic_data.py, then in separate
+processes (so each peak RSS is its own):
+  - "in-memory load": what train_model.py does before fitting, pd.read_csv
+    with default dtypes plus in-place label encoding;
+  - "out-of-core": the full `train_model.py large` run, fit included.
+
+Run from the training/ directory:
+    python benchmark_out_of_core.py --rows 1000000 10000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IN_MEMORY_LOAD = """
+import json, resource, sys, time
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+started = time.perf_counter()
+df = pd.read_csv(sys.argv[1])
+for col in ["mood", "face_emotion", "stress_level"]:
+    df[col] = LabelEncoder().fit_transform(df[col])
+print(json.dumps({"wall_seconds": time.perf_counter() - started,
+                  "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  "frame_mb": df.memory_usage(deep=True).sum() / 1e6}))
+"""
+
+
+def run_json(cmd: list) -> dict:
+    return json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True, cwd=BASE_DIR).stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark out-of-core training")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--trees-per-chunk", type=int, default=15)
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    sys.path.append(BASE_DIR)
+    from synthetic_data import stream_dataset
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            data = os.path.join(tmp, f"stress_{rows}.csv")
+            stream_dataset(data, rows)
+            report_path = os.path.join(tmp, "report.json")
+            subprocess.run([sys.executable, "-W", "ignore", "train_model.py", "large", "--data", data,
+                            "--chunk-size", str(args.chunk_size), "--trees-per-chunk", str(args.trees_per_chunk),
+                            "--report", report_path], check=True, capture_output=True, cwd=BASE_DIR)
+            with open(report_path) as f:
+                out_of_core = json.load(f)
+            in_memory = run_json([sys.executable, "-c", IN_MEMORY_LOAD, data])
+            os.remove(data)
+            results.append({"rows": rows, "in_memory_load": in_memory, "out_of_core": out_of_core})
+            print(f"{rows:>11,} rows | in-memory load: {in_memory['wall_seconds']:6.1f}s, "
+                  f"peak {in_memory['peak_rss_mb']:6.0f} MB | out-of-core train: "
+                  f"{out_of_core['wall_seconds']:6.1f}s, peak {out_of_core['peak_rss_mb']:6.0f} MB, "
+                  f"{out_of_core['trees']} trees, holdout acc {out_of_core['holdout_accuracy']:.4f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
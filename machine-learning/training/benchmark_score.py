@@ -0,0 +1,111 @@
+"""
+Parity and scaling check for score.py.
+
+Run from the training/ directory:
+    python benchmark_score.py --rows 2000000 --workers 1 2 4 8
+
+Parity: --parity-rows rows, including out-of-range values and unknown labels,
+are scored by score.py and posted to the API's /predict/batch in-process.
+Stress level, tips and eye-strain level must agree on every row.
+
+Scaling: a sample_dataset() CSV of --rows rows is scored with each worker
+count. Output must be byte-identical to the single-worker run, and rows/s and
+speedup are reported. Model loading in the workers is part of the timing.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, "..", "api"))
+from score import score_file
+from synthetic_data import EMOTIONS, MOODS, stream_dataset
+from utils.advice import tips_mapping
+from utils.feature_spec import FEATURE_COLUMNS
+
+
+def parity_frame(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    labels = MOODS + ["calm", "bored"]
+    return pd.DataFrame({
+        "mood": rng.choice(labels, n),
+        "sleep_hours": rng.integers(-2, 30, n),
+        "workload": rng.integers(-1, 14, n),
+        "face_emotion": rng.choice(EMOTIONS + ["contempt"], n),
+        "blink_rate": rng.integers(0, 70, n),
+        "caffeine_intake": rng.integers(0, 25, n),
+        "exercise_hours": rng.integers(0, 15, n),
+        "screen_time": rng.integers(0, 30, n),
+        "fatigue": rng.random(n) < 0.2,
+    })
+
+
+def check_parity(n: int, tmp: str, seed: int) -> int:
+    """Rows where score.py and /predict/batch disagree."""
+    os.environ.setdefault("MODEL_POLL_INTERVAL", "0")
+    from fastapi.testclient import TestClient
+    import main
+
+    df = parity_frame(n, np.random.default_rng(seed))
+    path = os.path.join(tmp, "parity.csv")
+    df.to_csv(path, index=False)
+    score_file(path, os.path.join(tmp, "parity_scored.csv"), workers=1, model_dir=main.MODEL_DIR,
+               artifact_format=main.MODEL_FORMAT)
+    scored = pd.read_csv(os.path.join(tmp, "parity_scored.csv"))
+
+    records = json.loads(df[list(FEATURE_COLUMNS) + ["fatigue"]].to_json(orient="records"))
+    with TestClient(main.app) as client:
+        results = client.post("/predict/batch", json=records).json()["results"]
+    mismatches = 0
+    for row, api in zip(scored.itertuples(), results):
+        if (row.stress_level != api["stress_level"] or tips_mapping[row.tips_key] != api["tips"]
+                or row.eye_strain_level != api["eye_strain"]["level"]):
+            mismatches += 1
+    return mismatches
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check score.py against the API and measure its scaling")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--parity-rows", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="stress-score-") as tmp:
+        print(f"🔍 Parity with /predict/batch on {args.parity_rows:,} rows...")
+        mismatches = check_parity(args.parity_rows, tmp, args.seed)
+        print(f"{'✅' if mismatches == 0 else '❌'} {mismatches} mismatching rows")
+
+        data = os.path.join(tmp, "history.csv")
+        stream_dataset(data, args.rows, seed=args.seed)
+        print(f"\n⏱️ Scoring {args.rows:,} rows ({os.cpu_count()} CPUs available)")
+        baseline = reference = None
+        for workers in args.workers:
+            output = os.path.join(tmp, f"scored_{workers}.csv")
+            stats = score_file(data, output, workers=workers, chunk_size=args.chunk_size)
+            digest = file_digest(output)
+            reference = reference or digest
+            baseline = baseline or stats["rows_per_second"]
+            print(f"  {workers:>3} workers: {stats['rows_per_second']:>10,.0f} rows/s  "
+                  f"{stats['rows_per_second'] / baseline:5.2f}x  "
+                  f"{'identical' if digest == reference else 'OUTPUT DIFFERS'}")
+            os.remove(output)
+
+
+if __name__ == "__main__":
+    main()
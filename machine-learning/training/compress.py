@@ -0,0 +1,182 @@
+"""
+Compress the stress model under an accuracy budget.
+
+Run through train_model.py from the training/ directory:
+    python train_model.py compress --max-accuracy-drop 0.01 --save
+
+The teacher is the forest train_model.py fits (MODEL_PARAMS on the same
+cached split). Candidates come from four families:
+
+- depth:    the same forest refit with max_depth capped;
+- ccp:      the same forest refit with cost-complexity pruning (ccp_alpha);
+- trees:    the teacher's first k trees (its trees are i.i.d., so any k are
+            a fair sample), no refit needed;
+- distill:  a single tree or a small forest fit on the teacher's predictions
+            for the training rows plus --distill-rows synthetic rows drawn
+            column by column from the training marginals, so the student
+            sees the teacher's decision surface beyond the few hundred real rows.
+
+Every candidate is a RandomForestClassifier (a single tree is wrapped as a
+one-tree forest) so the API, CompiledForest and publish_artifacts take it
+unchanged. For each one the pickle size, load time, single-row latency
+(sklearn and compiled) and test accuracy are measured; the selected model
+is the smallest, then fastest, whose accuracy is within --max-accuracy-drop
+of the teacher's.
+"""
+import copy
+import os
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.forest_engine import CompiledForest
+from dataset_cache import load_training_split
+from train_model import MODEL_PARAMS, drift_profile, save_primary
+
+RESULT_COLUMNS = [
+    "name", "family", "trees", "nodes", "size_kb", "load_ms", "latency_ms",
+    "compiled_latency_ms", "test_accuracy", "accuracy_drop", "within_budget", "selected",
+]
+
+
+def add_arguments(parser):
+    parser.add_argument("--data", default="stress_data.csv")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01,
+                        help="Allowed test accuracy drop below the full forest")
+    parser.add_argument("--depths", type=int, nargs="+", default=[4, 6, 8, 10, 12])
+    parser.add_argument("--ccp-alphas", type=float, nargs="+", default=[0.001, 0.002, 0.005, 0.01])
+    parser.add_argument("--tree-counts", type=int, nargs="+", default=[10, 25, 50, 75, 100])
+    parser.add_argument("--student-depths", type=int, nargs="+", default=[4, 6, 8, 10, 12])
+    parser.add_argument("--student-trees", type=int, nargs="+", default=[10, 25])
+    parser.add_argument("--distill-rows", type=int, default=20000)
+    parser.add_argument("--latency-repeats", type=int, default=50)
+    parser.add_argument("--results", default="compression_results.csv")
+    parser.add_argument("--save", action="store_true", help="Publish the selected model like train_model.py does")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def as_forest(trees: list, template: RandomForestClassifier) -> RandomForestClassifier:
+    """A fitted RandomForestClassifier made of the given fitted trees."""
+    forest = copy.copy(template)
+    forest.estimators_ = list(trees)
+    forest.n_estimators = len(forest.estimators_)
+    return forest
+
+
+def refit(X, y, seed: int, **overrides) -> RandomForestClassifier:
+    return RandomForestClassifier(**{**MODEL_PARAMS, "random_state": seed, **overrides}).fit(X, y)
+
+
+def marginal_samples(X, n: int, rng: np.random.Generator) -> np.ndarray:
+    """Rows whose columns are drawn independently from the columns of X."""
+    return np.column_stack([rng.choice(X[:, j], n) for j in range(X.shape[1])])
+
+
+def build_candidates(teacher, X_train, y_train, args):
+    rng = np.random.default_rng(args.seed)
+    yield "full", "baseline", teacher
+    for depth in args.depths:
+        yield f"depth={depth}", "depth", refit(X_train, y_train, args.seed, max_depth=depth)
+    for alpha in args.ccp_alphas:
+        yield f"ccp_alpha={alpha}", "ccp", refit(X_train, y_train, args.seed, ccp_alpha=alpha)
+    for k in args.tree_counts:
+        if k < teacher.n_estimators:
+            yield f"first {k} trees", "trees", as_forest(teacher.estimators_[:k], teacher)
+
+    X_distill = np.vstack([X_train, marginal_samples(X_train, args.distill_rows, rng)]).astype(np.float32)
+    y_distill = teacher.predict(X_distill)
+    for depth in args.student_depths:
+        tree = DecisionTreeClassifier(max_depth=depth, random_state=args.seed).fit(X_distill, y_distill)
+        yield f"distilled tree depth={depth}", "distill", as_forest([tree], teacher)
+        for n_trees in args.student_trees:
+            student = RandomForestClassifier(n_estimators=n_trees, max_depth=depth, max_features="sqrt",
+                                             random_state=args.seed).fit(X_distill, y_distill)
+            yield f"distilled {n_trees} trees depth={depth}", "distill", student
+
+
+def _median_ms(fn, repeats: int) -> float:
+    fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000.0)
+
+
+def measure(name: str, family: str, model, X_test, y_test, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.pkl")
+        joblib.dump(model, path)
+        size = os.path.getsize(path)
+        load_ms = _median_ms(lambda: joblib.load(path), 5)
+    forest = CompiledForest.from_sklearn(model)
+    row = X_test[:1]
+    return {
+        "name": name,
+        "family": family,
+        "model": model,
+        "trees": model.n_estimators,
+        "nodes": forest.n_nodes,
+        "size_kb": size / 1024,
+        "load_ms": load_ms,
+        "latency_ms": _median_ms(lambda: model.predict(row), args.latency_repeats),
+        "compiled_latency_ms": _median_ms(lambda: forest.predict(row), args.latency_repeats * 4),
+        "test_accuracy": float(model.score(X_test, y_test)),
+    }
+
+
+def select(results: list, baseline_accuracy: float, max_drop: float):
+    """Smallest, then fastest, candidate within max_drop of the baseline accuracy."""
+    for result in results:
+        result["accuracy_drop"] = baseline_accuracy - result["test_accuracy"]
+        result["within_budget"] = result["accuracy_drop"] <= max_drop + 1e-9
+    eligible = [r for r in results if r["within_budget"]]
+    chosen = min(eligible, key=lambda r: (r["size_kb"], r["latency_ms"]))
+    for result in results:
+        result["selected"] = result is chosen
+    return chosen
+
+
+def run(args):
+    if not os.path.exists(args.data):
+        print(f"❌ {args.data} not found! Run train_model.py once to create it.")
+        return None
+
+    print("📊 Loading dataset...")
+    X_train, X_test, y_train, y_test, encoders = load_training_split(args.data, args.seed)
+
+    print("\n🌳 Training the full forest and compressed candidates...")
+    teacher = refit(X_train, y_train, args.seed)
+    results = []
+    for name, family, model in build_candidates(teacher, X_train, y_train, args):
+        results.append(measure(name, family, model, X_test, y_test, args))
+        r = results[-1]
+        print(f"  {name:<32} {r['size_kb']:8.1f} KB  {r['latency_ms']:6.2f} ms  acc {r['test_accuracy']:.4f}")
+
+    chosen = select(results, results[0]["test_accuracy"], args.max_accuracy_drop)
+    table = pd.DataFrame(results).reindex(columns=RESULT_COLUMNS).sort_values("size_kb")
+    table.to_csv(args.results, index=False)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print("\n" + table.to_string(index=False, float_format="%.4f"))
+
+    full = results[0]
+    print(f"\n🏆 Selected {chosen['name']}: {chosen['size_kb']:.1f} KB ({full['size_kb'] / chosen['size_kb']:.0f}x smaller), "
+          f"{chosen['latency_ms']:.2f} ms vs {full['latency_ms']:.2f} ms per row, "
+          f"accuracy {chosen['test_accuracy']:.4f} vs {full['test_accuracy']:.4f}")
+    print(f"✅ Candidate table written to {args.results}")
+
+    if args.save:
+        print("\n💾 Saving compressed model and encoders...")
+        model = chosen["model"]
+        forest = CompiledForest.from_sklearn(model)
+        version = save_primary(model, encoders, drift_profile(forest, encoders, args.data), forest)
+        print(f"✅ Model + encoders saved successfully! (version {version})")
+    return chosen
@@ -2,22 +2,35 @@ import pandas as pd
 from sklearn.model_selection import train_test_split, StratifiedKFold, cross_val_score
 from sklearn.preprocessing import LabelEncoder
 from sklearn.ensemble import RandomForestClassifier
-import joblib
 import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.forest_engine import CompiledForest
+from utils.model_registry import publish_artifacts
+from utils.feature_spec import CATEGORICAL_COLUMNS, FEATURE_COLUMNS
+from train_model import drift_profile
+
+# This variant (200 trees, no class weights) used to overwrite the model
+# train_model.py publishes. It is a shadow candidate instead: the API scores
+# it on sampled traffic next to the primary, and
+# `python train_model.py promote unweighted` replaces the primary with it
+# only if the comparison and the labelled feedback back that up.
+SHADOW_DIR = os.path.join("shadow", "unweighted")
 
 # Load extended dataset
 df = pd.read_csv("stress_data.csv")
 
 # Encode categorical columns
 encoders = {}
-for col in ["mood", "face_emotion", "stress_level"]:
+for col in CATEGORICAL_COLUMNS:
     le = LabelEncoder()
     df[col] = le.fit_transform(df[col])
     encoders[col] = le
 
 # Features and target
-X = df[["mood", "sleep_hours", "workload", "face_emotion", 
-        "blink_rate", "caffeine_intake", "exercise_hours", "screen_time"]]
+X = df[list(FEATURE_COLUMNS)]
 y = df["stress_level"]
 
 # Split dataset
@@ -46,7 +59,8 @@ print("✅ Accuracy on test set:", model.score(X_test, y_test))
 importances = dict(zip(X.columns, model.feature_importances_))
 print("📊 Feature importances:", importances)
 
-# Save model + encoders
-joblib.dump(model, "stress_model.pkl")
-joblib.dump(encoders, "encoders.pkl")
-print("✅ Updated model + encoders saved")
+# Publish model + encoders as a shadow candidate
+os.makedirs(SHADOW_DIR, exist_ok=True)
+profile = drift_profile(CompiledForest.from_sklearn(model), encoders, "stress_data.csv")
+version = publish_artifacts(model, encoders, SHADOW_DIR, profile=profile)
+print(f"✅ Shadow candidate saved to {SHADOW_DIR} (version {version})")
@@ -0,0 +1,182 @@
+"""
+Pre-encoded dataset cache for training runs.
+
+Parsing stress_data.csv, adding the coverage rows and refitting the
+LabelEncoders happens once per distinct input. The result is written as
+
+    .dataset_cache/<key>/X.npy      float32 feature matrix (FEATURE_COLUMNS order)
+    .dataset_cache/<key>/y.npy      int64 encoded stress levels
+    .dataset_cache/<key>/meta.json  encoder classes, row count, source, config
+
+and later runs np.load() it memory-mapped. The key is a sha256 of the CSV
+bytes, the generator config (coverage seed and rows per combination) and
+CACHE_FORMAT. Hashing a large CSV is the expensive part, so each file's
+digest is remembered next to its size and mtime in sources.json and only
+recomputed when either changes. A changed CSV or config therefore maps to
+a new key and the stale entry is never read; only the newest MAX_ENTRIES
+entries are kept. Entries are written to a temporary directory and renamed
+into place, so a crashed build is never mistaken for a cache hit.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from train_model import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, create_synthetic_data_if_needed, encode_categoricals
+
+CACHE_FORMAT = 1
+MAX_ENTRIES = 4
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".dataset_cache")
+DEFAULT_CONFIG = {"coverage_seed": 42, "per_combination": 3}
+
+
+class EncodedDataset:
+    def __init__(self, X, y, encoders: dict, key: str, hit: bool, seconds: float):
+        self.X = X
+        self.y = y
+        self.encoders = encoders
+        self.key = key
+        self.hit = hit
+        self.seconds = seconds
+
+
+def _write_json_atomic(path: str, payload) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+
+
+def file_digest(path: str, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    """sha256 of the file, reused while its size and mtime are unchanged."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    index_path = os.path.join(cache_dir, "sources.json")
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    known = index.get(path)
+    if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+        return known["sha256"]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    index[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_json_atomic(index_path, index)
+    return digest.hexdigest()
+
+
+def dataset_key(path: str, config: dict, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    payload = json.dumps({"csv": file_digest(path, cache_dir), "config": config, "format": CACHE_FORMAT},
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def build_encoded(path: str, config: dict):
+    """Exactly what train_model.py did before fitting: read, add coverage rows, encode."""
+    rng = np.random.default_rng(config["coverage_seed"])
+    df = create_synthetic_data_if_needed(pd.read_csv(path), rng, config["per_combination"])
+    df, encoders = encode_categoricals(df)
+    X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+    y = df["stress_level"].to_numpy(dtype=np.int64)
+    return X, y, encoders
+
+
+def _encoders_from_meta(meta: dict) -> dict:
+    encoders = {}
+    for col in CATEGORICAL_COLUMNS:
+        encoder = LabelEncoder()
+        encoder.classes_ = np.array(meta["classes"][col], dtype=object)
+        encoders[col] = encoder
+    return encoders
+
+
+def _read_entry(entry: str):
+    with open(os.path.join(entry, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format") != CACHE_FORMAT:
+        raise ValueError(f"cache format {meta.get('format')} != {CACHE_FORMAT}")
+    X = np.load(os.path.join(entry, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(entry, "y.npy"), mmap_mode="r")
+    if X.shape != (meta["rows"], len(FEATURE_COLUMNS)) or y.shape != (meta["rows"],):
+        raise ValueError("cached arrays do not match meta.json")
+    return X, y, _encoders_from_meta(meta)
+
+
+def _write_entry(entry: str, X, y, encoders: dict, path: str, config: dict) -> None:
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(entry), prefix=".building-")
+    try:
+        np.save(os.path.join(tmp, "X.npy"), X)
+        np.save(os.path.join(tmp, "y.npy"), y)
+        meta = {
+            "format": CACHE_FORMAT,
+            "rows": int(len(y)),
+            "feature_columns": FEATURE_COLUMNS,
+            "classes": {col: [str(c) for c in encoders[col].classes_] for col in CATEGORICAL_COLUMNS},
+            "source": os.path.abspath(path),
+            "config": config,
+            "created_at": time.time(),
+        }
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def _prune(cache_dir: str, keep: int) -> None:
+    entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+               if os.path.isdir(os.path.join(cache_dir, name)) and not name.startswith(".")]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for stale in entries[keep:]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+def load_dataset(path: str = "stress_data.csv", config: dict = None, cache_dir: str = DEFAULT_CACHE_DIR,
+                 use_cache: bool = True) -> EncodedDataset:
+    """Encoded features, targets and encoders for path, from the cache when it is current."""
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    started = time.perf_counter()
+    if not use_cache:
+        X, y, encoders = build_encoded(path, config)
+        return EncodedDataset(X, y, encoders, None, False, time.perf_counter() - started)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    key = dataset_key(path, config, cache_dir)
+    entry = os.path.join(cache_dir, key)
+    if os.path.isdir(entry):
+        try:
+            X, y, encoders = _read_entry(entry)
+            os.utime(entry)
+            return EncodedDataset(X, y, encoders, key, True, time.perf_counter() - started)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ Dataset cache entry {key} unreadable ({e}), rebuilding")
+
+    X, y, encoders = build_encoded(path, config)
+    _write_entry(entry, X, y, encoders, path, config)
+    _prune(cache_dir, MAX_ENTRIES)
+    X, y, encoders = _read_entry(entry)
+    return EncodedDataset(X, y, encoders, key, False, time.perf_counter() - started)
+
+
+def load_training_split(path: str, seed: int = 42, use_cache: bool = True):
+    """The same cached preparation and 80/20 split as train_model.main(), as numpy arrays."""
+    dataset = load_dataset(path, {"coverage_seed": seed}, use_cache=use_cache)
+    print(f"✅ {'Loaded cached' if dataset.hit else 'Built'} encoded dataset in {dataset.seconds * 1000:.1f} ms")
+    X, y, encoders = np.asarray(dataset.X), np.asarray(dataset.y), dataset.encoders
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    return X_train, X_test, y_train, y_test, encoders
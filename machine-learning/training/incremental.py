@@ -0,0 +1,255 @@
+"""
+Incremental retraining of the served forest from user feedback.
+
+Run through train_model.py from the training/ directory, e.g. from cron:
+    python train_model.py update --new-trees 15 --max-trees 150 --retire worst
+
+POST /feedback appends labelled rows to feedback.csv (utils/feedback_store.py).
+An update loads the newest published model, and if at least --min-new-rows
+rows arrived since the last update, grows --new-trees trees with warm_start
+on recent data: the newest --window-rows feedback rows plus --replay-rows
+drawn from the original training data, so every stress level stays covered
+and the new trees do not forget it. Only the new trees are fitted; the
+existing ones are kept as they are. Rows are encoded with the model's own
+FeatureSpec, exactly as the API encodes requests.
+
+When the forest then has more than --max-trees trees, the surplus is
+retired from the trees that existed before this update: the oldest ones, or
+(--retire worst) the ones with the lowest accuracy on a holdout of the
+recent feedback. The result is published with publish_artifacts, so a
+running API hot-swaps to it, unless its holdout accuracy fell more than
+--max-accuracy-drop below the current model's. The feedback offset the
+update consumed is kept in .incremental_state.json next to the model.
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from sklearn.utils.class_weight import compute_sample_weight
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.drift_monitor import load_profile
+from utils.feature_spec import FEATURE_COLUMNS, LABEL_COLUMNS, TARGET_COLUMN
+from utils.feedback_store import read_since, read_tail
+from utils.model_registry import ModelRegistry, publish_artifacts
+from dataset_cache import DEFAULT_CACHE_DIR, load_dataset
+from score import load_bundle
+
+STATE_NAME = ".incremental_state.json"
+
+
+def add_arguments(parser):
+    parser.add_argument("--model-dir", default=".", help="Directory the API loads model versions from")
+    parser.add_argument("--feedback", help="Feedback store (default: <model-dir>/feedback.csv)")
+    parser.add_argument("--data", default="stress_data.csv", help="Original training data, for replay rows")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Encoded dataset cache for --data")
+    parser.add_argument("--min-new-rows", type=int, default=50, help="Skip the update below this many new rows")
+    parser.add_argument("--window-rows", type=int, default=5000, help="Newest feedback rows to train on")
+    parser.add_argument("--replay-rows", type=int, default=1000, help="Rows of --data mixed into the update")
+    parser.add_argument("--new-trees", type=int, default=15)
+    parser.add_argument("--max-trees", type=int, default=150)
+    parser.add_argument("--retire", choices=["oldest", "worst"], default="worst")
+    parser.add_argument("--holdout-fraction", type=float, default=0.2,
+                        help="Share of the feedback window held out to score trees and the update")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.02,
+                        help="Do not publish when holdout accuracy falls more than this")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--report", help="Optional path to write the update report as JSON")
+
+
+def load_state(model_dir: str) -> dict:
+    try:
+        with open(os.path.join(model_dir, STATE_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(model_dir: str, state: dict) -> None:
+    path = os.path.join(model_dir, STATE_NAME)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def encode_feedback(df: pd.DataFrame, spec) -> tuple:
+    """(X float32, y) for the rows with a known stress level and numeric features."""
+    columns = {
+        col: df[col].astype(str).to_numpy() if col in LABEL_COLUMNS
+        else pd.to_numeric(df[col], errors="coerce").to_numpy(float)
+        for col in FEATURE_COLUMNS
+    }
+    X, _ = spec.encode_columns(columns, dtype=np.float32)
+    codes = spec.codes[TARGET_COLUMN]
+    y = np.array([codes.get(label, -1) for label in df[TARGET_COLUMN].astype(str)], dtype=np.int64)
+    known = (y >= 0) & ~np.isnan(X).any(axis=1)
+    return X[known], y[known]
+
+
+def replay_rows(path: str, encoders: dict, n: int, rng: np.random.Generator, cache_dir: str = DEFAULT_CACHE_DIR):
+    """(X, y) of n rows of the cached training data, if it was encoded with the same classes as the model."""
+    if n <= 0 or not os.path.exists(path):
+        return None
+    dataset = load_dataset(path, cache_dir=cache_dir)
+    for col, encoder in dataset.encoders.items():
+        if list(encoder.classes_) != list(encoders[col].classes_):
+            print(f"❌ {path} encodes {col} differently from the model, no replay rows")
+            return None
+    take = np.sort(rng.choice(len(dataset.y), min(n, len(dataset.y)), replace=False))
+    return np.asarray(dataset.X)[take], np.asarray(dataset.y)[take]
+
+
+def as_model_input(model, X):
+    """X as the model was fitted on: a DataFrame if it knows feature names."""
+    if hasattr(model, "feature_names_in_"):
+        return pd.DataFrame(X, columns=model.feature_names_in_)
+    return X
+
+
+def grow(model, X, y, n_new: int, seed: int) -> None:
+    """Fit n_new more trees on (X, y) with warm_start; existing trees are untouched."""
+    class_weight = model.class_weight
+    # Balanced weights of the update rows, as sample weights: the class_weight
+    # presets are recomputed per fit and sklearn warns about them with warm_start
+    weight = compute_sample_weight(class_weight, y) if class_weight is not None else None
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + n_new,
+                     class_weight=None, random_state=seed)
+    try:
+        model.fit(as_model_input(model, X), y, sample_weight=weight)
+    finally:
+        model.set_params(warm_start=False, class_weight=class_weight)
+
+
+def tree_accuracies(model, X, y) -> np.ndarray:
+    X = np.asarray(X, dtype=np.float32)
+    return np.array([float((tree.predict(X) == y).mean()) for tree in model.estimators_])
+
+
+def retire(model, keep: int, protected: int, policy: str, X_val=None, y_val=None) -> list:
+    """
+    Drop trees until `keep` remain, never one of the last `protected` (the
+    new ones). Returns the indices retired, in the pre-retirement order.
+    """
+    surplus = len(model.estimators_) - keep
+    candidates = len(model.estimators_) - protected
+    if surplus <= 0 or candidates <= 0:
+        return []
+    surplus = min(surplus, candidates)
+    if policy == "worst" and X_val is not None and len(y_val):
+        accuracy = tree_accuracies(model, X_val, y_val)[:candidates]
+        # Stable sort: among equally bad trees the older one goes first
+        retired = sorted(np.argsort(accuracy, kind="stable")[:surplus].tolist())
+    else:
+        retired = list(range(surplus))
+    drop = set(retired)
+    model.estimators_ = [tree for i, tree in enumerate(model.estimators_) if i not in drop]
+    model.n_estimators = len(model.estimators_)
+    return retired
+
+
+def next_version(model_dir: str) -> str:
+    """A timestamp version that does not collide with a model published in the same second."""
+    base = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    version, n = base, 0
+    while os.path.exists(os.path.join(model_dir, f"stress_model-{version}.pkl")):
+        n += 1
+        version = f"{base}.{n}"
+    return version
+
+
+def update(args) -> dict:
+    started = time.perf_counter()
+    feedback = args.feedback or os.path.join(args.model_dir, "feedback.csv")
+    report = {"feedback": feedback, "published": None}
+    candidate = ModelRegistry(args.model_dir, poll_interval=0).latest_candidate()
+    if candidate is None:
+        raise FileNotFoundError(f"no published model in {args.model_dir}")
+    state = load_state(args.model_dir)
+
+    offset = state.get("offset", 0)
+    if offset > os.path.getsize(feedback):
+        # The store was replaced since the last update; start over
+        offset = 0
+    new, end = read_since(feedback, offset)
+    report.update(base_version=candidate[0], new_rows=len(new))
+    if len(new) < args.min_new_rows:
+        report["skipped"] = f"{len(new)} new rows, fewer than {args.min_new_rows}"
+        report["wall_seconds"] = time.perf_counter() - started
+        return report
+
+    bundle = load_bundle(candidate)
+    model, spec = bundle.model, bundle.spec
+    rng = np.random.default_rng(args.seed)
+    recent, _ = read_tail(feedback, args.window_rows)
+    X_recent, y_recent = encode_feedback(recent, spec)
+    holdout = rng.random(len(y_recent)) < args.holdout_fraction
+    X_val, y_val = X_recent[holdout], y_recent[holdout]
+    X_fit, y_fit = X_recent[~holdout], y_recent[~holdout]
+    replay = replay_rows(args.data, bundle.encoders, args.replay_rows, rng, args.cache_dir)
+    if replay is not None:
+        X_fit, y_fit = np.vstack([X_fit, replay[0]]), np.concatenate([y_fit, replay[1]])
+    report.update(window_rows=len(recent), fit_rows=len(y_fit), holdout_rows=len(y_val))
+    read_seconds = time.perf_counter() - started
+
+    n_classes = len(spec.targets)
+    if len(np.unique(y_fit)) < n_classes:
+        # warm_start refits classes_ from y, which would no longer line up with the old trees
+        raise ValueError(f"the update rows do not cover all {n_classes} stress levels; raise --replay-rows")
+    before = float((bundle.forest.predict(X_val) == y_val).mean()) if len(y_val) else None
+
+    tick = time.perf_counter()
+    trees_before = len(model.estimators_)
+    grow(model, X_fit, y_fit, args.new_trees, int(rng.integers(2**31)))
+    fit_seconds = time.perf_counter() - tick
+    retired = retire(model, args.max_trees, args.new_trees, args.retire, X_val, y_val)
+
+    from utils.forest_engine import CompiledForest
+
+    after = float((CompiledForest.from_sklearn(model).predict(X_val) == y_val).mean()) if len(y_val) else None
+    report.update(trees_before=trees_before, trees_grown=args.new_trees, trees_retired=len(retired),
+                  trees=len(model.estimators_), holdout_accuracy_before=before, holdout_accuracy_after=after)
+
+    tick = time.perf_counter()
+    if before is not None and after < before - args.max_accuracy_drop:
+        report["skipped"] = f"holdout accuracy {after:.4f} is more than {args.max_accuracy_drop} below {before:.4f}"
+    else:
+        # The drift reference stays the training data's; feedback is what gets compared with it
+        profile = load_profile(args.model_dir, bundle.version)
+        report["published"] = publish_artifacts(model, bundle.encoders, args.model_dir, next_version(args.model_dir),
+                                                profile=profile)
+        save_state(args.model_dir, {"offset": end, "version": report["published"],
+                                    "updated_at": datetime.now(timezone.utc).isoformat()})
+    report.update(read_seconds=read_seconds, fit_seconds=fit_seconds,
+                  publish_seconds=time.perf_counter() - tick, wall_seconds=time.perf_counter() - started)
+    return report
+
+
+def run(args):
+    feedback = args.feedback or os.path.join(args.model_dir, "feedback.csv")
+    if not os.path.exists(feedback):
+        print(f"❌ {feedback} not found! POST /feedback creates it.")
+        return None
+
+    print(f"📊 Updating the model in {args.model_dir} from {feedback}...")
+    report = update(args)
+    if report.get("skipped") and report["published"] is None and "trees" not in report:
+        print(f"⏭️ Nothing to do: {report['skipped']}")
+    else:
+        print(f"🌳 {report['new_rows']:,} new rows; grew {report['trees_grown']} trees on {report['fit_rows']:,} rows, "
+              f"retired {report['trees_retired']} ({args.retire}) -> {report['trees']} trees")
+        if report["holdout_accuracy_before"] is not None:
+            print(f"✅ Holdout accuracy on {report['holdout_rows']:,} feedback rows: "
+                  f"{report['holdout_accuracy_before']:.4f} -> {report['holdout_accuracy_after']:.4f}")
+        if report["published"]:
+            print(f"💾 Published version {report['published']} (from {report['base_version']})")
+        else:
+            print(f"❌ Not published: {report['skipped']}")
+    print(f"⏱️ {report['wall_seconds']:.2f}s")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
@@ -0,0 +1,205 @@
+"""
+Out-of-core training for stress datasets that do not fit in memory.
+
+Run through train_model.py from the training/ directory:
+    python train_model.py large --data stress_10m.csv --chunk-size 1000000 --trees-per-chunk 15 --save
+
+The CSV is read in chunks with categorical dtypes for the label columns and
+float32 for the numeric ones, which is the dtype sklearn's trees train on, so
+no chunk is ever copied to float64. Each chunk becomes a float32 column
+matrix plus int8 targets, a small share of it is set aside as a holdout, and
+a few trees are grown on a bootstrap subsample of the rest (bagging over
+chunks). Only the trees and the holdout outlive a chunk, so memory is bounded
+by --chunk-size and the tree sizes, not by the file.
+
+The trees are joined into one RandomForestClassifier, so the result is served,
+compiled and published exactly like the model train_model.py fits. The run
+reports wall time and peak RSS.
+"""
+import json
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.drift_monitor import DriftProfile
+from utils.forest_engine import CompiledForest, row_slices
+from train_model import FEATURE_COLUMNS, save_primary
+from synthetic_data import EMOTIONS, MOODS, STRESS_LEVELS
+
+# Sorted like LabelEncoder.classes_, so codes match encoders.pkl
+CATEGORIES = {
+    "mood": sorted(MOODS),
+    "face_emotion": sorted(EMOTIONS),
+    "stress_level": sorted(STRESS_LEVELS),
+}
+CSV_DTYPES = {
+    col: CategoricalDtype(CATEGORIES[col]) if col in CATEGORIES else np.float32
+    for col in FEATURE_COLUMNS + ["stress_level"]
+}
+
+
+def add_arguments(parser):
+    parser.add_argument("--data", default="stress_data.csv")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--trees-per-chunk", type=int, default=15)
+    parser.add_argument("--max-trees", type=int, default=150,
+                        help="Keep a uniform sample of this many trees when more were grown")
+    parser.add_argument("--max-samples", type=int, default=100_000,
+                        help="Bootstrap rows per tree, drawn from the current chunk")
+    parser.add_argument("--max-depth", type=int)
+    parser.add_argument("--min-samples-leaf", type=int, default=20)
+    parser.add_argument("--class-weight", default="balanced")
+    parser.add_argument("--holdout-fraction", type=float, default=0.02)
+    parser.add_argument("--holdout-max", type=int, default=200_000)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", action="store_true", help="Publish the model like train_model.py does")
+    parser.add_argument("--report", help="Optional path to write the run report as JSON")
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def build_encoders() -> dict:
+    encoders = {}
+    for col, classes in CATEGORIES.items():
+        encoder = LabelEncoder()
+        encoder.classes_ = np.array(classes, dtype=object)
+        encoders[col] = encoder
+    return encoders
+
+
+def iter_encoded_chunks(path: str, chunk_size: int):
+    """Yield (X float32, y int8, dropped) per CSV chunk; rows with unknown labels are dropped."""
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=CSV_DTYPES, usecols=list(CSV_DTYPES)):
+        X = np.empty((len(chunk), len(FEATURE_COLUMNS)), dtype=np.float32)
+        for i, col in enumerate(FEATURE_COLUMNS):
+            X[:, i] = chunk[col].cat.codes if col in CATEGORIES else chunk[col].to_numpy()
+        y = chunk["stress_level"].cat.codes.to_numpy(dtype=np.int8)
+        known = (y >= 0) & (X[:, [0, 3]] >= 0).all(axis=1) & ~np.isnan(X).any(axis=1)
+        yield X[known], y[known], int((~known).sum())
+
+
+def join_forests(forests: list, n_classes: int) -> RandomForestClassifier:
+    """One RandomForestClassifier whose estimators_ are the trees of all chunk forests."""
+    model = forests[0]
+    model.estimators_ = [tree for forest in forests for tree in forest.estimators_]
+    model.n_estimators = len(model.estimators_)
+    model.classes_ = np.arange(n_classes)
+    model.n_classes_ = n_classes
+    return model
+
+
+def train(args) -> tuple:
+    rng = np.random.default_rng(args.seed)
+    n_classes = len(CATEGORIES["stress_level"])
+    forests, holdout_X, holdout_y = [], [], []
+    rows = dropped = held_out = chunks = skipped = 0
+    read_seconds = fit_seconds = 0.0
+
+    started = time.perf_counter()
+    tick = time.perf_counter()
+    for X, y, chunk_dropped in iter_encoded_chunks(args.data, args.chunk_size):
+        read_seconds += time.perf_counter() - tick
+        chunks += 1
+        rows += len(y)
+        dropped += chunk_dropped
+
+        hold = rng.random(len(y)) < args.holdout_fraction
+        take = min(int(hold.sum()), args.holdout_max - held_out)
+        if take > 0:
+            idx = np.flatnonzero(hold)[:take]
+            holdout_X.append(X[idx])
+            holdout_y.append(y[idx])
+            held_out += take
+        X, y = X[~hold], y[~hold]
+
+        if len(np.unique(y)) < n_classes:
+            # Every tree must know every class for the joined forest to line up
+            skipped += 1
+            tick = time.perf_counter()
+            continue
+        tick = time.perf_counter()
+        forest = RandomForestClassifier(
+            n_estimators=args.trees_per_chunk,
+            max_depth=args.max_depth,
+            min_samples_leaf=args.min_samples_leaf,
+            max_features="sqrt",
+            max_samples=min(args.max_samples, len(y)),
+            class_weight=args.class_weight if args.class_weight != "none" else None,
+            random_state=int(rng.integers(2**31)),
+            n_jobs=args.n_jobs,
+        ).fit(X, y)
+        forests.append(forest)
+        fit_seconds += time.perf_counter() - tick
+        print(f"  chunk {chunks}: {len(y):,} rows -> {sum(len(f.estimators_) for f in forests)} trees, "
+              f"peak RSS {peak_rss_mb():.0f} MB")
+        del X, y
+        tick = time.perf_counter()
+
+    if not forests:
+        raise ValueError(f"No chunk of {args.data} contained all {n_classes} stress levels")
+    model = join_forests(forests, n_classes)
+    if model.n_estimators > args.max_trees:
+        keep = np.sort(rng.choice(model.n_estimators, args.max_trees, replace=False))
+        model.estimators_ = [model.estimators_[i] for i in keep]
+        model.n_estimators = args.max_trees
+
+    holdout_accuracy = profile = None
+    if held_out:
+        forest = CompiledForest.from_sklearn(model)
+        X, y = np.concatenate(holdout_X), np.concatenate(holdout_y)
+        correct = sum(int((forest.predict(X[part]) == y[part]).sum()) for part in row_slices(len(y)))
+        holdout_accuracy = correct / len(y)
+        # The holdout is a uniform sample of the file, so it doubles as the drift reference
+        profile = DriftProfile.from_forest(forest, build_encoders(), X, source=args.data)
+
+    report = {
+        "data": args.data,
+        "rows": rows,
+        "dropped_rows": dropped,
+        "chunks": chunks,
+        "skipped_chunks": skipped,
+        "trees": model.n_estimators,
+        "holdout_rows": held_out,
+        "holdout_accuracy": holdout_accuracy,
+        "read_seconds": read_seconds,
+        "fit_seconds": fit_seconds,
+        "wall_seconds": time.perf_counter() - started,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    return model, report, profile
+
+
+def run(args):
+    if not os.path.exists(args.data):
+        print(f"❌ {args.data} not found!")
+        return None
+
+    print(f"📊 Training out of core on {args.data} in chunks of {args.chunk_size:,} rows...")
+    model, report, profile = train(args)
+    print(f"\n✅ {report['rows']:,} rows in {report['chunks']} chunks -> {report['trees']} trees "
+          f"({report['dropped_rows']:,} rows with unknown labels dropped)")
+    if report["holdout_accuracy"] is not None:
+        print(f"✅ Accuracy on {report['holdout_rows']:,} holdout rows: {report['holdout_accuracy']:.4f}")
+    print(f"⏱️ Wall {report['wall_seconds']:.1f}s (read {report['read_seconds']:.1f}s, "
+          f"fit {report['fit_seconds']:.1f}s), peak RSS {report['peak_rss_mb']:.0f} MB")
+
+    if args.save:
+        print("\n💾 Saving model and encoders...")
+        encoders = build_encoders()
+        version = save_primary(model, encoders, profile)
+        print(f"✅ Model + encoders saved successfully! (version {version})")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
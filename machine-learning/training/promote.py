@@ -0,0 +1,196 @@
+"""
+Promotion of a shadow candidate to primary model, on evidence only.
+
+Run through train_model.py from the training/ directory:
+    python train_model.py promote unweighted --live http://127.0.0.1:8000/shadow
+
+A candidate lives in <model-dir>/shadow/<name> (data.py, train_model.py train
+--shadow NAME), where the API scores it on sampled live traffic without
+serving it. Promotion looks at two kinds of evidence and needs both:
+
+    live      the API's GET /shadow report (a URL, or a file it was saved
+              to): at least --min-rows sampled rows compared for exactly the
+              current primary and candidate versions, no scoring errors,
+              and per-row scoring time within --max-latency-ratio of the
+              primary's. Agreement is printed but not judged: a better
+              model disagrees exactly where the primary is wrong.
+    feedback  labelled rows from POST /feedback that no incremental update
+              has trained on yet (so the primary hasn't seen them either):
+              at least --min-feedback rows, and the candidate's accuracy on
+              them no more than --max-accuracy-drop below the primary's.
+
+If everything passes (and --dry-run isn't set) the candidate is published as
+the newest primary version, drift profile included, and a running API
+hot-swaps to it. The shadow directory is left as it is.
+"""
+import json
+import os
+import sys
+import urllib.request
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.drift_monitor import load_profile
+from utils.feedback_store import read_since
+from utils.model_registry import ModelRegistry, publish_artifacts
+from incremental import encode_feedback, load_state, next_version
+from score import load_bundle
+
+
+def add_arguments(parser):
+    parser.add_argument("name", help="Shadow candidate, the directory name under --shadow-dir")
+    parser.add_argument("--model-dir", default=".", help="Directory the API loads model versions from")
+    parser.add_argument("--shadow-dir", help="Shadow candidates (default: <model-dir>/shadow)")
+    parser.add_argument("--live", default="http://127.0.0.1:8000/shadow",
+                        help="URL of the API's /shadow report, or a file holding one")
+    parser.add_argument("--feedback", help="Feedback store (default: <model-dir>/feedback.csv)")
+    parser.add_argument("--min-rows", type=int, default=1000, help="Sampled live rows the comparison needs")
+    parser.add_argument("--max-latency-ratio", type=float, default=2.0,
+                        help="Largest candidate / primary per-row scoring time (p50)")
+    parser.add_argument("--min-feedback", type=int, default=200, help="Labelled rows the accuracy check needs")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.0,
+                        help="How far the candidate's feedback accuracy may fall below the primary's")
+    parser.add_argument("--dry-run", action="store_true", help="Evaluate without publishing")
+    parser.add_argument("--report", help="Optional path to write the evidence and decision as JSON")
+
+
+def read_live(source: str) -> dict:
+    if source.startswith(("http://", "https://")):
+        with urllib.request.urlopen(source, timeout=10) as response:
+            return json.load(response)
+    with open(source) as f:
+        return json.load(f)
+
+
+def check_live(report: dict, name: str, primary, shadow, args) -> tuple:
+    """(evidence, failures) from the API's shadow report."""
+    entry = report.get("shadows", {}).get(name)
+    if entry is None:
+        return None, [f"the live report has no shadow '{name}' (is it under the API's SHADOW_DIR?)"]
+    failures = []
+    if (entry["primary_version"], entry["version"]) != (primary.version, shadow.version):
+        failures.append(f"the live report compares {entry['primary_version']} with {entry['version']}, "
+                        f"not {primary.version} with {shadow.version}")
+    if entry["rows"] < args.min_rows:
+        failures.append(f"{entry['rows']:,} live rows compared, fewer than {args.min_rows:,}")
+    if entry["errors"]:
+        failures.append(f"{entry['errors']} scoring errors: {entry['last_error']}")
+    ratio = entry["latency_us_per_row"]["p50_ratio"]
+    if ratio is None or ratio > args.max_latency_ratio:
+        failures.append(f"per-row scoring time ratio {ratio} is above {args.max_latency_ratio}")
+    return entry, failures
+
+
+def check_feedback(path: str, model_dir: str, primary, shadow, args) -> tuple:
+    """(evidence, failures) from the labelled rows no update has trained on."""
+    if not os.path.exists(path):
+        return None, [f"{path} not found; POST /feedback collects labelled rows"]
+    offset = load_state(model_dir).get("offset", 0)
+    if offset > os.path.getsize(path):
+        offset = 0
+    rows, _ = read_since(path, offset)
+    X_primary, y_primary = encode_feedback(rows, primary.spec)
+    X_shadow, y_shadow = encode_feedback(rows, shadow.spec)
+    evidence = {"rows": len(y_primary), "offset": offset}
+    if len(y_primary) < args.min_feedback or len(y_shadow) < args.min_feedback:
+        return evidence, [f"{min(len(y_primary), len(y_shadow)):,} unseen labelled rows, fewer than {args.min_feedback:,}"]
+
+    truth = primary.spec.decode(y_primary)
+    primary_pred = primary.spec.decode(primary.forest.predict(X_primary))
+    evidence["primary_accuracy"] = float((primary_pred == truth).mean())
+    shadow_pred = shadow.spec.decode(shadow.forest.predict(X_shadow))
+    evidence["shadow_accuracy"] = float((shadow_pred == shadow.spec.decode(y_shadow)).mean())
+    if len(y_shadow) == len(y_primary):
+        # The same rows: who was right where the two disagree
+        differ = primary_pred != shadow_pred
+        evidence["disagreements"] = {
+            "rows": int(differ.sum()),
+            "shadow_right": int((differ & (shadow_pred == truth)).sum()),
+            "primary_right": int((differ & (primary_pred == truth)).sum()),
+        }
+        evidence["per_class_accuracy"] = {
+            str(level): {
+                "rows": int((truth == level).sum()),
+                "primary": float((primary_pred[truth == level] == level).mean()),
+                "shadow": float((shadow_pred[truth == level] == level).mean()),
+            }
+            for level in np.unique(truth)
+        }
+    failures = []
+    if evidence["shadow_accuracy"] < evidence["primary_accuracy"] - args.max_accuracy_drop:
+        failures.append(f"feedback accuracy {evidence['shadow_accuracy']:.4f} is more than "
+                        f"{args.max_accuracy_drop} below the primary's {evidence['primary_accuracy']:.4f}")
+    return evidence, failures
+
+
+def evaluate(args) -> dict:
+    shadow_dir = os.path.join(args.shadow_dir or os.path.join(args.model_dir, "shadow"), args.name)
+    primary_candidate = ModelRegistry(args.model_dir, poll_interval=0).latest_candidate()
+    if primary_candidate is None:
+        raise FileNotFoundError(f"no published model in {args.model_dir}")
+    shadow_candidate = ModelRegistry(shadow_dir, poll_interval=0).latest_candidate() if os.path.isdir(shadow_dir) else None
+    if shadow_candidate is None:
+        raise FileNotFoundError(f"no shadow candidate in {shadow_dir}")
+    primary, shadow = load_bundle(primary_candidate), load_bundle(shadow_candidate)
+    decision = {"name": args.name, "shadow_dir": shadow_dir, "primary_version": primary.version,
+                "shadow_version": shadow.version, "failures": [], "published": None}
+
+    try:
+        live, failures = check_live(read_live(args.live), args.name, primary, shadow, args)
+    except (OSError, ValueError) as e:
+        live, failures = None, [f"could not read the live report from {args.live}: {e}"]
+    decision["live"] = live
+    decision["failures"] += failures
+
+    feedback = args.feedback or os.path.join(args.model_dir, "feedback.csv")
+    decision["feedback"], failures = check_feedback(feedback, args.model_dir, primary, shadow, args)
+    decision["failures"] += failures
+
+    if not decision["failures"] and not args.dry_run:
+        profile = load_profile(shadow_dir, shadow.version)
+        decision["published"] = publish_artifacts(shadow.model, shadow.encoders, args.model_dir,
+                                                  next_version(args.model_dir), profile=profile)
+    return decision
+
+
+def run(args):
+    print(f"🔍 Evaluating shadow '{args.name}' against the primary model in {args.model_dir}...")
+    try:
+        decision = evaluate(args)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return None
+
+    print(f"📦 Primary {decision['primary_version']}, candidate {decision['shadow_version']}")
+    live = decision["live"]
+    if live is not None:
+        latency = live["latency_us_per_row"]
+        agreement = f"{live['agreement']:.2%}" if live["agreement"] is not None else "n/a"
+        shadow_us, primary_us = latency["shadow"]["p50"], latency["primary"]["p50"]
+        scoring = f"{shadow_us:.1f} us vs {primary_us:.1f} us" if shadow_us is not None and primary_us is not None else "n/a"
+        print(f"📊 Live: {live['rows']:,} sampled rows, agreement {agreement}, per-row scoring {scoring} (p50)")
+        for level, entry in live["per_class"].items():
+            print(f"  primary {level:<7} {entry['rows']:>8,} rows  agreement {entry['agreement']:.2%}  "
+                  f"shadow said {entry['shadow_predicted']}")
+    feedback = decision["feedback"]
+    if feedback is not None and "shadow_accuracy" in feedback:
+        print(f"📊 Feedback: {feedback['rows']:,} unseen labelled rows, accuracy "
+              f"{feedback['shadow_accuracy']:.4f} (candidate) vs {feedback['primary_accuracy']:.4f} (primary)")
+        if "disagreements" in feedback:
+            d = feedback["disagreements"]
+            print(f"  {d['rows']:,} disagreements: candidate right on {d['shadow_right']:,}, "
+                  f"primary right on {d['primary_right']:,}")
+
+    if decision["failures"]:
+        for failure in decision["failures"]:
+            print(f"❌ {failure}")
+        print("⏭️ Not promoted")
+    elif decision["published"]:
+        print(f"🏆 Promoted '{args.name}' as version {decision['published']}; a running API swaps to it")
+    else:
+        print("✅ Every check passed (dry run, nothing published)")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(decision, f, indent=2)
+    return decision
@@ -0,0 +1,254 @@
+"""
+Offline bulk scoring of mood entries with the served model.
+
+Run from the training/ directory:
+    python score.py history.csv --output scored.csv --workers 8
+    python score.py history.parquet --output scored.parquet   # needs pyarrow
+
+The input holds rows shaped like the API's InputData (mood, sleep_hours,
+workload, face_emotion, blink_rate, caffeine_intake, exercise_hours,
+screen_time and an optional fatigue column). Every input column is written
+back out with three more: stress_level, tips_key (the tips_mapping entry the
+API answers with) and eye_strain_level. Clamping and label mapping go
+through the API's FeatureSpec and the advice through utils/advice.py, so a
+row scores exactly as POST /predict scores it. Rows with a missing or
+non-numeric feature get empty results and are counted as invalid.
+
+The parent never parses the input. A CSV is cut into byte ranges of about
+--chunk-size rows on line boundaries, and a Parquet file into its row
+groups. Each worker in a process pool reads, encodes, scores and formats its
+own chunk and returns the finished output. The parent appends the chunks in
+input order, with at most 2 x --workers in flight, so memory is bounded by
+the chunk size and the parsing, scoring and formatting spread over the cores.
+The model version is resolved once, and each worker loads exactly that
+version once, in its initializer.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.advice import EYE_STRAIN_LEVELS, eye_strain_levels, tips_key
+from utils.feature_spec import FEATURE_COLUMNS, LABEL_COLUMNS
+from utils.forest_engine import row_slices
+from utils.model_registry import ModelBundle, ModelRegistry
+
+RESULT_COLUMNS = ("stress_level", "tips_key", "eye_strain_level")
+DEFAULT_MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Per-worker state, set once by _init_worker
+_bundle = None
+_options = {}
+
+
+def _file_format(path: str, fmt: str = None) -> str:
+    return fmt or ("parquet" if path.endswith(".parquet") else "csv")
+
+
+def _parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet input needs pyarrow (pip install pyarrow)") from e
+    return pq
+
+
+def resolve_model(model_dir: str, artifact_format: str) -> tuple:
+    """(version, model path, encoders path) of the newest model, as the API's registry picks it."""
+    candidate = ModelRegistry(model_dir, poll_interval=0, artifact_format=artifact_format).latest_candidate()
+    if candidate is None:
+        raise FileNotFoundError(f"no {artifact_format} model found in {model_dir}")
+    return candidate
+
+
+def load_bundle(candidate: tuple) -> ModelBundle:
+    version, model_path, encoders_path = candidate
+    if encoders_path is None:
+        bundle = ModelBundle.load_mmap(version, model_path)
+    else:
+        bundle = ModelBundle.load(version, model_path, encoders_path)
+    bundle.validate()
+    return bundle
+
+
+def plan_chunks(path: str, fmt: str, chunk_size: int) -> list:
+    """Chunk descriptors a worker can read on its own: CSV byte ranges or Parquet row groups."""
+    if fmt == "parquet":
+        return [("parquet", path, group) for group in range(_parquet().ParquetFile(path).num_row_groups)]
+
+    size = os.path.getsize(path)
+    chunks = []
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = f.tell()
+        sample = f.read(1 << 16)
+        step = max(1, int(len(sample) / max(1, sample.count(b"\n")) * chunk_size))
+        while start < size:
+            end = min(size, start + step)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            chunks.append(("csv", path, header, start, end))
+            start = end
+    return chunks
+
+
+def read_chunk(chunk: tuple) -> pd.DataFrame:
+    kind, path, *where = chunk
+    if kind == "parquet":
+        return _parquet().ParquetFile(path).read_row_group(where[0]).to_pandas()
+    header, start, end = where
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(header + data), dtype={col: "category" for col in LABEL_COLUMNS})
+
+
+def score_frame(df: pd.DataFrame, bundle: ModelBundle) -> tuple:
+    """df with the result columns added (input columns of the same name get an _input suffix)."""
+    missing = [col for col in FEATURE_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"input is missing columns {missing}")
+    spec = bundle.spec
+    columns = {
+        col: df[col].values if col in LABEL_COLUMNS else pd.to_numeric(df[col], errors="coerce").to_numpy(float)
+        for col in FEATURE_COLUMNS
+    }
+    X, _ = spec.encode_columns(columns, dtype=np.float32)
+    valid = ~np.isnan(X).any(axis=1)
+
+    stress = np.full(len(df), -1, dtype=np.int64)
+    rows = np.flatnonzero(valid)
+    for part in row_slices(len(rows)):
+        stress[rows[part]] = bundle.forest.predict(X[rows[part]])
+
+    tips_keys = [tips_key(level) for level in spec.targets]
+    tips_categories = sorted(set(tips_keys))
+    tips_codes = np.array([tips_categories.index(key) for key in tips_keys] + [-1])
+    fatigue = df["fatigue"].astype("boolean").fillna(False).to_numpy(bool) if "fatigue" in df.columns else None
+    strain = eye_strain_levels(X[:, FEATURE_COLUMNS.index("blink_rate")],
+                               X[:, FEATURE_COLUMNS.index("screen_time")], fatigue)
+
+    df = df.rename(columns={col: f"{col}_input" for col in RESULT_COLUMNS if col in df.columns})
+    df["stress_level"] = pd.Categorical.from_codes(stress, list(spec.targets))
+    df["tips_key"] = pd.Categorical.from_codes(tips_codes[stress], tips_categories)
+    df["eye_strain_level"] = pd.Categorical.from_codes(np.where(valid, strain, -1), EYE_STRAIN_LEVELS)
+    return df, int((~valid).sum())
+
+
+def _init_worker(candidate: tuple, options: dict):
+    global _bundle, _options
+    _bundle = load_bundle(candidate)
+    _options = options
+
+
+def score_chunk(index: int, chunk: tuple) -> tuple:
+    """Read, score and format one chunk; returns (output, rows, invalid rows)."""
+    df, invalid = score_frame(read_chunk(chunk), _bundle)
+    if _options["output_format"] == "parquet":
+        return df, len(df), invalid
+    return df.to_csv(header=index == 0, index=False).encode(), len(df), invalid
+
+
+def in_order(pool, fn, items, window: int):
+    """pool.submit(fn, i, item) for every item, yielding results in order with at most window pending."""
+    pending = deque()
+    for i, item in enumerate(items):
+        pending.append(pool.submit(fn, i, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class _CsvBytesSink:
+    def __init__(self, path):
+        self._file = open(path, "wb")
+
+    def write(self, chunk):
+        self._file.write(chunk)
+
+    def close(self):
+        self._file.close()
+
+
+def score_file(path: str, output: str, workers: int = 1, chunk_size: int = 200_000,
+               model_dir: str = DEFAULT_MODEL_DIR, artifact_format: str = "pickle",
+               input_format: str = None, output_format: str = None) -> dict:
+    input_format = _file_format(path, input_format)
+    output_format = _file_format(output, output_format)
+    candidate = resolve_model(model_dir, artifact_format)
+    chunks = plan_chunks(path, input_format, chunk_size)
+    options = {"output_format": output_format}
+    if output_format == "parquet":
+        from synthetic_data import _ParquetSink
+        sink = _ParquetSink(output)
+    else:
+        sink = _CsvBytesSink(output)
+
+    started = time.perf_counter()
+    rows = invalid = 0
+    try:
+        if workers <= 1:
+            _init_worker(candidate, options)
+            results = (score_chunk(i, chunk) for i, chunk in enumerate(chunks))
+            for payload, chunk_rows, chunk_invalid in results:
+                sink.write(payload)
+                rows += chunk_rows
+                invalid += chunk_invalid
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(candidate, options)) as pool:
+                for payload, chunk_rows, chunk_invalid in in_order(pool, score_chunk, chunks, 2 * workers):
+                    sink.write(payload)
+                    rows += chunk_rows
+                    invalid += chunk_invalid
+    finally:
+        sink.close()
+    elapsed = time.perf_counter() - started
+    return {
+        "input": path,
+        "output": output,
+        "model_version": candidate[0],
+        "workers": workers,
+        "chunks": len(chunks),
+        "rows": rows,
+        "invalid_rows": invalid,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of mood entries with the stress model")
+    parser.add_argument("input")
+    parser.add_argument("--output", default="scored.csv")
+    parser.add_argument("--input-format", choices=["csv", "parquet"], help="Default: from the file extension")
+    parser.add_argument("--output-format", choices=["csv", "parquet"], help="Default: from the file extension")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=200_000, help="Approximate rows per CSV chunk")
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR)
+    parser.add_argument("--format", choices=["pickle", "mmap"], default="pickle", help="Model artifact format")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"❌ {args.input} not found!")
+        return
+    print(f"📊 Scoring {args.input} with {args.workers} worker(s)...")
+    stats = score_file(args.input, args.output, args.workers, args.chunk_size, args.model_dir,
+                       args.format, args.input_format, args.output_format)
+    print(f"✅ Wrote {stats['rows']:,} rows ({stats['invalid_rows']:,} invalid) to {stats['output']} "
+          f"with model version {stats['model_version']}")
+    print(f"⏱️ {stats['seconds']:.2f}s, {stats['rows_per_second']:,.0f} rows/s over {stats['chunks']} chunks")
+
+
+if __name__ == "__main__":
+    main()
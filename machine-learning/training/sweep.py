@@ -0,0 +1,227 @@
+"""
+Parallel hyperparameter sweep for the stress RandomForest.
+
+Run through train_model.py from the training/ directory:
+    python train_model.py sweep --n-estimators 50 100 150 200 --max-depth none 8 12 \\
+        --min-samples-split 2 3 5 --class-weight none balanced --max-latency-ms 1.0
+
+The grid is the product of the four hyperparameter lists. The StratifiedKFold
+splits are computed once and handed to every worker with the training data
+through the pool initializer, so each configuration sees the same folds and
+nothing is re-split per task. Workers share the best finished CV mean: after
+--min-folds folds, a configuration whose running mean is more than
+--prune-margin below it is abandoned. Surviving configurations are refit on
+the full training split and measured the way they would be served: pickle
+size, compiled forest size and single-row latency for both engines. The best
+configuration is the most accurate one inside the latency/size budget.
+
+Every run appends its rows to --results (default sweep_results.csv) under a
+shared run_id, so runs stay comparable.
+"""
+import itertools
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+import multiprocessing as mp
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.forest_engine import CompiledForest
+from dataset_cache import load_training_split
+from train_model import drift_profile, save_primary
+
+RESULT_COLUMNS = [
+    "run_id", "n_estimators", "max_depth", "min_samples_split", "class_weight",
+    "status", "folds_run", "cv_mean", "cv_std", "test_accuracy", "fit_seconds",
+    "model_mb", "forest_mb", "latency_ms", "sklearn_latency_ms", "within_budget", "selected",
+]
+
+# Per-worker state, set once by _init_worker
+_X_train = _y_train = _X_test = _y_test = _folds = _best = None
+_options = {}
+
+
+def _none_or(cast):
+    def parse(value):
+        return None if value.lower() == "none" else cast(value)
+    return parse
+
+
+def add_arguments(parser):
+    parser.add_argument("--data", default="stress_data.csv")
+    parser.add_argument("--n-estimators", type=int, nargs="+", default=[50, 100, 150, 200])
+    parser.add_argument("--max-depth", type=_none_or(int), nargs="+", default=[None, 8, 12, 16])
+    parser.add_argument("--min-samples-split", type=int, nargs="+", default=[2, 3, 5])
+    parser.add_argument("--class-weight", type=_none_or(str), nargs="+", default=[None, "balanced"])
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--min-folds", type=int, default=2,
+                        help="Folds every configuration runs before it can be pruned")
+    parser.add_argument("--prune-margin", type=float, default=0.03,
+                        help="Prune when the running CV mean trails the best by more than this")
+    parser.add_argument("--max-latency-ms", type=float, help="Budget on compiled single-row latency")
+    parser.add_argument("--max-size-mb", type=float, help="Budget on the pickled model size")
+    parser.add_argument("--latency-repeats", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--results", default="sweep_results.csv")
+    parser.add_argument("--save", action="store_true",
+                        help="Fit the selected configuration and publish it like train_model.py does")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-cache", action="store_true", help="Re-encode the CSV instead of using .dataset_cache")
+
+
+def build_grid(args) -> list:
+    return [
+        {"n_estimators": n, "max_depth": depth, "min_samples_split": split, "class_weight": weight}
+        for n, depth, split, weight in itertools.product(
+            args.n_estimators, args.max_depth, args.min_samples_split, args.class_weight)
+    ]
+
+
+def make_model(config: dict, seed: int) -> RandomForestClassifier:
+    return RandomForestClassifier(max_features="sqrt", random_state=seed, n_jobs=1, **config)
+
+
+def _init_worker(X_train, y_train, X_test, y_test, folds, best, options):
+    global _X_train, _y_train, _X_test, _y_test, _folds, _best, _options
+    _X_train, _y_train, _X_test, _y_test = X_train, y_train, X_test, y_test
+    _folds, _best, _options = folds, best, options
+
+
+def _median_ms(fn, row, repeats: int) -> float:
+    fn(row)
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn(row)
+        timings[i] = time.perf_counter() - start
+    return float(np.median(timings) * 1000.0)
+
+
+def evaluate_config(config: dict) -> dict:
+    """Cross-validate one configuration on the shared folds, then measure it."""
+    seed = _options["seed"]
+    result = {**config, "status": "complete", "folds_run": 0}
+    scores = []
+    started = time.perf_counter()
+    for train_idx, val_idx in _folds:
+        model = make_model(config, seed).fit(_X_train[train_idx], _y_train[train_idx])
+        scores.append(model.score(_X_train[val_idx], _y_train[val_idx]))
+        if len(scores) >= _options["min_folds"] and len(scores) < len(_folds):
+            if np.mean(scores) < _best.value - _options["prune_margin"]:
+                result["status"] = "pruned"
+                break
+    result.update(folds_run=len(scores), cv_mean=float(np.mean(scores)), cv_std=float(np.std(scores)),
+                  fit_seconds=time.perf_counter() - started)
+    if result["status"] == "pruned":
+        return result
+
+    with _best.get_lock():
+        _best.value = max(_best.value, result["cv_mean"])
+
+    model = make_model(config, seed).fit(_X_train, _y_train)
+    forest = CompiledForest.from_sklearn(model)
+    row = _X_test[:1]
+    result.update(
+        test_accuracy=float(model.score(_X_test, _y_test)),
+        model_mb=len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 1e6,
+        forest_mb=forest.nbytes / 1e6,
+        latency_ms=_median_ms(forest.predict, row, _options["latency_repeats"]),
+        sklearn_latency_ms=_median_ms(model.predict, row, max(1, _options["latency_repeats"] // 10)),
+    )
+    return result
+
+
+def within_budget(result: dict, max_latency_ms=None, max_size_mb=None) -> bool:
+    if result["status"] != "complete":
+        return False
+    if max_latency_ms is not None and result["latency_ms"] > max_latency_ms:
+        return False
+    if max_size_mb is not None and result["model_mb"] > max_size_mb:
+        return False
+    return True
+
+
+def select_best(results: list, max_latency_ms=None, max_size_mb=None):
+    """Highest CV mean inside the budget; ties go to the faster, then smaller model."""
+    eligible = [r for r in results if within_budget(r, max_latency_ms, max_size_mb)]
+    if not eligible:
+        return None
+    return max(eligible, key=lambda r: (round(r["cv_mean"], 4), -r["latency_ms"], -r["model_mb"]))
+
+
+def write_results(results: list, path: str, run_id: str) -> pd.DataFrame:
+    rows = [{**r, "run_id": run_id,
+             "max_depth": "none" if r["max_depth"] is None else r["max_depth"],
+             "class_weight": r["class_weight"] or "none"} for r in results]
+    table = pd.DataFrame(rows).reindex(columns=RESULT_COLUMNS)
+    table = table.sort_values(["status", "cv_mean"], ascending=[True, False])
+    table.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+    return table
+
+
+def run(args):
+    if not os.path.exists(args.data):
+        print(f"❌ {args.data} not found! Run train_model.py once to create it.")
+        return None
+
+    print("📊 Loading dataset...")
+    X_train, X_test, y_train, y_test, encoders = load_training_split(args.data, args.seed, not args.no_cache)
+    folds = list(StratifiedKFold(n_splits=args.folds, shuffle=True, random_state=args.seed).split(X_train, y_train))
+    grid = build_grid(args)
+    print(f"\n🔍 Sweeping {len(grid)} configurations x {args.folds} folds on {args.workers} workers...")
+
+    options = {
+        "seed": args.seed,
+        "min_folds": args.min_folds,
+        "prune_margin": args.prune_margin,
+        "latency_repeats": args.latency_repeats,
+    }
+    best = mp.Value("d", 0.0)
+    results = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(X_train, y_train, X_test, y_test, folds, best, options)) as pool:
+        futures = [pool.submit(evaluate_config, config) for config in grid]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"  [{len(results)}/{len(grid)}] {result['status']:>8} "
+                  f"n={result['n_estimators']} depth={result['max_depth']} "
+                  f"split={result['min_samples_split']} weight={result['class_weight']} "
+                  f"cv={result['cv_mean']:.4f} ({result['folds_run']} folds)")
+    elapsed = time.perf_counter() - started
+
+    chosen = select_best(results, args.max_latency_ms, args.max_size_mb)
+    for result in results:
+        result["within_budget"] = within_budget(result, args.max_latency_ms, args.max_size_mb)
+        result["selected"] = result is chosen
+
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    table = write_results(results, args.results, run_id)
+    pruned = sum(r["status"] == "pruned" for r in results)
+    print(f"\n⏱️ Sweep finished in {elapsed:.1f}s ({pruned} of {len(results)} configurations pruned)")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(table.drop(columns=["run_id"]).head(10).to_string(index=False, float_format="%.4f"))
+    print(f"✅ Results appended to {args.results} (run {run_id})")
+
+    if chosen is None:
+        print("❌ No configuration fits the latency/size budget")
+        return None
+    config = {k: chosen[k] for k in ("n_estimators", "max_depth", "min_samples_split", "class_weight")}
+    print(f"\n🏆 Selected {config}: cv={chosen['cv_mean']:.4f} test={chosen['test_accuracy']:.4f} "
+          f"latency={chosen['latency_ms']:.3f} ms size={chosen['model_mb']:.2f} MB")
+
+    if args.save:
+        print("\n💾 Saving selected model and encoders...")
+        model = make_model(config, args.seed).fit(X_train, y_train)
+        forest = CompiledForest.from_sklearn(model)
+        version = save_primary(model, encoders, drift_profile(forest, encoders, args.data), forest)
+        print(f"✅ Model + encoders saved successfully! (version {version})")
+    return chosen
@@ -0,0 +1,188 @@
+"""
+Vectorized synthetic stress data.
+
+Two generators with the correlations train_model.py has always used:
+
+- sample_dataset(): the demo dataset train_model.main() creates when
+  stress_data.csv is missing. Mood picks the stress distribution, sleep,
+  workload and blink rate; emotion and the lifestyle columns are independent.
+- coverage_dataset(): the per-(mood, emotion) rows create_synthetic_data_if_needed()
+  adds so every label is represented, jittered around MOOD_PATTERNS.
+
+Every column is drawn in one call on a seeded numpy Generator instead of per
+row, so a chunk of a million rows is a handful of array operations.
+stream_dataset() writes chunks to CSV or Parquet one at a time, keeping
+memory bounded by --chunk-size no matter how many rows are asked for:
+
+    python synthetic_data.py --rows 10000000 --output stress_10m.csv
+    python synthetic_data.py --rows 10000000 --output stress_10m.parquet   # needs pyarrow
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+MOODS = ['happy', 'sad', 'angry', 'surprise', 'fear', 'disgust', 'neutral']
+EMOTIONS = ['happy', 'sad', 'angry', 'surprise', 'fear', 'disgust', 'neutral']
+STRESS_LEVELS = ['low', 'medium', 'high']
+COLUMNS = [
+    "mood", "sleep_hours", "workload", "face_emotion", "blink_rate",
+    "caffeine_intake", "exercise_hours", "screen_time", "stress_level",
+]
+
+# Typical values for each mood, used by coverage_dataset()
+MOOD_PATTERNS = {
+    'happy': {'stress': 'low', 'sleep': 8, 'workload': 4, 'blink': 15, 'caffeine': 1, 'exercise': 1.5, 'screen': 4},
+    'sad': {'stress': 'medium', 'sleep': 6, 'workload': 6, 'blink': 25, 'caffeine': 2, 'exercise': 0.5, 'screen': 7},
+    'angry': {'stress': 'high', 'sleep': 5, 'workload': 8, 'blink': 30, 'caffeine': 3, 'exercise': 0, 'screen': 8},
+    'surprise': {'stress': 'medium', 'sleep': 7, 'workload': 5, 'blink': 20, 'caffeine': 1, 'exercise': 1, 'screen': 5},
+    'fear': {'stress': 'high', 'sleep': 4, 'workload': 7, 'blink': 35, 'caffeine': 2, 'exercise': 0, 'screen': 6},
+    'disgust': {'stress': 'medium', 'sleep': 6, 'workload': 6, 'blink': 22, 'caffeine': 2, 'exercise': 0.5, 'screen': 6},
+    'neutral': {'stress': 'low', 'sleep': 7, 'workload': 5, 'blink': 18, 'caffeine': 1, 'exercise': 1, 'screen': 5}
+}
+
+# Mood groups of sample_dataset(): stress levels with their probabilities,
+# sleep mean/std, workload range and blink range (high ends exclusive)
+MOOD_GROUPS = [
+    (['happy', 'neutral'], (['low', 'medium'], [0.7, 0.3]), (8, 1.0), (1, 6), (10, 20)),
+    (['sad', 'surprise', 'disgust'], (['medium', 'high'], [0.6, 0.4]), (6, 1.5), (4, 8), (20, 30)),
+    (['angry', 'fear'], (['medium', 'high'], [0.3, 0.7]), (5, 1.5), (6, 10), (25, 40)),
+]
+
+
+def sample_dataset(n_samples: int, rng: np.random.Generator) -> pd.DataFrame:
+    mood_codes = rng.integers(0, len(MOODS), n_samples)
+    emotion_codes = rng.integers(0, len(EMOTIONS), n_samples)
+    stress_codes = np.empty(n_samples, dtype=np.int8)
+    sleep = np.empty(n_samples)
+    workload = np.empty(n_samples, dtype=np.int64)
+    blink = np.empty(n_samples, dtype=np.int64)
+
+    for group_moods, (levels, probs), (sleep_mean, sleep_std), workload_range, blink_range in MOOD_GROUPS:
+        mask = np.isin(mood_codes, [MOODS.index(m) for m in group_moods])
+        count = int(mask.sum())
+        level_codes = np.array([STRESS_LEVELS.index(level) for level in levels], dtype=np.int8)
+        stress_codes[mask] = level_codes[rng.choice(len(levels), count, p=probs)]
+        sleep[mask] = rng.normal(sleep_mean, sleep_std, count)
+        workload[mask] = rng.integers(*workload_range, count)
+        blink[mask] = rng.integers(*blink_range, count)
+
+    # Categoricals keep a million-row chunk at a few bytes per label
+    return pd.DataFrame({
+        'mood': pd.Categorical.from_codes(mood_codes, MOODS),
+        'sleep_hours': np.clip(sleep, 1, 12),
+        'workload': workload,
+        'face_emotion': pd.Categorical.from_codes(emotion_codes, EMOTIONS),
+        'blink_rate': blink,
+        'caffeine_intake': rng.integers(0, 5, n_samples),
+        'exercise_hours': np.maximum(0, rng.normal(1, 0.5, n_samples)),
+        'screen_time': rng.integers(2, 12, n_samples),
+        'stress_level': pd.Categorical.from_codes(stress_codes, STRESS_LEVELS),
+    }, columns=COLUMNS)
+
+
+def coverage_dataset(rng: np.random.Generator, per_combination: int = 3) -> pd.DataFrame:
+    """per_combination rows for every (mood, emotion) pair, jittered around MOOD_PATTERNS."""
+    moods = np.repeat(MOODS, len(EMOTIONS) * per_combination)
+    emotions = np.tile(np.repeat(EMOTIONS, per_combination), len(MOODS))
+    n = len(moods)
+
+    def pattern(key):
+        return np.array([MOOD_PATTERNS[m][key] for m in MOODS]).repeat(len(EMOTIONS) * per_combination)
+
+    return pd.DataFrame({
+        'mood': moods,
+        'sleep_hours': np.clip(pattern('sleep') + rng.normal(0, 1, n), 1, 12),
+        'workload': np.clip(pattern('workload') + rng.integers(-2, 3, n), 1, 10),
+        'face_emotion': emotions,
+        'blink_rate': np.clip(pattern('blink') + rng.integers(-5, 6, n), 5, 50),
+        'caffeine_intake': np.clip(pattern('caffeine') + rng.integers(-1, 2, n), 0, 8),
+        'exercise_hours': np.clip(pattern('exercise') + rng.uniform(-0.5, 0.5, n), 0, 5),
+        'screen_time': np.clip(pattern('screen') + rng.integers(-2, 3, n), 1, 16),
+        'stress_level': pattern('stress'),
+    }, columns=COLUMNS)
+
+
+class _ParquetSink:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)") from e
+        self._pa, self._pq, self._path, self._writer = pa, pq, path, None
+
+    def write(self, chunk):
+        table = self._pa.Table.from_pandas(chunk, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class _CsvSink:
+    def __init__(self, path):
+        self._file = open(path, "w", newline="")
+        self._header = True
+
+    def write(self, chunk):
+        chunk.to_csv(self._file, header=self._header, index=False, float_format="%.2f")
+        self._header = False
+
+    def close(self):
+        self._file.close()
+
+
+def stream_dataset(path: str, rows: int, chunk_size: int = 1_000_000, seed: int = 42, fmt: str = None) -> dict:
+    """Write `rows` sample_dataset() rows to path chunk by chunk; returns throughput stats."""
+    fmt = fmt or ("parquet" if path.endswith(".parquet") else "csv")
+    sink = _ParquetSink(path) if fmt == "parquet" else _CsvSink(path)
+    rng = np.random.default_rng(seed)
+    generate_seconds = 0.0
+    started = time.perf_counter()
+    try:
+        written = 0
+        while written < rows:
+            tick = time.perf_counter()
+            chunk = sample_dataset(min(chunk_size, rows - written), rng)
+            generate_seconds += time.perf_counter() - tick
+            sink.write(chunk)
+            written += len(chunk)
+    finally:
+        sink.close()
+    elapsed = time.perf_counter() - started
+    return {
+        "path": path,
+        "format": fmt,
+        "rows": written,
+        "seconds": elapsed,
+        "rows_per_second": written / elapsed if elapsed else 0.0,
+        "generate_rows_per_second": written / generate_seconds if generate_seconds else 0.0,
+        "bytes": os.path.getsize(path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a synthetic stress dataset to CSV or Parquet")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--output", default="stress_data_synthetic.csv")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"📊 Generating {args.rows:,} rows in chunks of {args.chunk_size:,}...")
+    stats = stream_dataset(args.output, args.rows, args.chunk_size, args.seed, args.format)
+    print(f"✅ Wrote {stats['rows']:,} rows to {stats['path']} ({stats['bytes'] / 1e6:.1f} MB) "
+          f"in {stats['seconds']:.2f}s")
+    print(f"⏱️ {stats['rows_per_second']:,.0f} rows/s end to end, "
+          f"{stats['generate_rows_per_second']:,.0f} rows/s generation only")
+
+
+if __name__ == "__main__":
+    main()
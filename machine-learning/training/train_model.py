@@ -4,10 +4,42 @@ from sklearn.model_selection import train_test_split, StratifiedKFold, cross_val
 from sklearn.preprocessing import LabelEncoder
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, confusion_matrix
+import argparse
 import joblib
 import os
+import sys
 
-def create_synthetic_data_if_needed(df):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.artifact_format import save_mmap_artifact
+from utils.drift_monitor import DriftProfile
+from utils.forest_engine import CompiledForest
+from utils.model_registry import publish_artifacts
+from utils import feature_spec
+from synthetic_data import coverage_dataset, sample_dataset
+
+# Features and target, in the order the API and offline scoring encode them
+FEATURE_COLUMNS = list(feature_spec.FEATURE_COLUMNS)
+CATEGORICAL_COLUMNS = list(feature_spec.CATEGORICAL_COLUMNS)
+
+MODEL_PARAMS = dict(
+    n_estimators=150,
+    max_depth=None,
+    min_samples_split=3,
+    max_features="sqrt",
+    random_state=42,
+    class_weight='balanced'  # Handle class imbalance
+)
+
+def encode_categoricals(df):
+    """Label-encode the categorical columns in place; returns (df, encoders)."""
+    encoders = {}
+    for col in CATEGORICAL_COLUMNS:
+        le = LabelEncoder()
+        df[col] = le.fit_transform(df[col])
+        encoders[col] = le
+    return df, encoders
+
+def create_synthetic_data_if_needed(df, rng=None, per_combination=3):
     """
     Ensure all expected emotions and moods are represented in the dataset
     by creating synthetic data if needed
@@ -32,140 +64,77 @@ def create_synthetic_data_if_needed(df):
     print(f"Existing stress levels: {sorted(existing_stress)}")
     print(f"Missing stress levels: {sorted(missing_stress)}")
     
-    # Create synthetic data for missing combinations
-    synthetic_data = []
-    
-    # Define typical patterns for each mood/emotion combination
-    mood_emotion_patterns = {
-        'happy': {'stress': 'low', 'sleep': 8, 'workload': 4, 'blink': 15, 'caffeine': 1, 'exercise': 1.5, 'screen': 4},
-        'sad': {'stress': 'medium', 'sleep': 6, 'workload': 6, 'blink': 25, 'caffeine': 2, 'exercise': 0.5, 'screen': 7},
-        'angry': {'stress': 'high', 'sleep': 5, 'workload': 8, 'blink': 30, 'caffeine': 3, 'exercise': 0, 'screen': 8},
-        'surprise': {'stress': 'medium', 'sleep': 7, 'workload': 5, 'blink': 20, 'caffeine': 1, 'exercise': 1, 'screen': 5},
-        'fear': {'stress': 'high', 'sleep': 4, 'workload': 7, 'blink': 35, 'caffeine': 2, 'exercise': 0, 'screen': 6},
-        'disgust': {'stress': 'medium', 'sleep': 6, 'workload': 6, 'blink': 22, 'caffeine': 2, 'exercise': 0.5, 'screen': 6},
-        'neutral': {'stress': 'low', 'sleep': 7, 'workload': 5, 'blink': 18, 'caffeine': 1, 'exercise': 1, 'screen': 5}
-    }
-    
-    # Generate synthetic samples for missing moods/emotions
-    for mood in expected_moods:
-        for emotion in expected_emotions:
-            # Create a few samples for each combination
-            for _ in range(3):  # 3 samples per combination
-                pattern = mood_emotion_patterns.get(mood, mood_emotion_patterns['neutral'])
-                
-                # Add some randomness to make it more realistic
-                synthetic_row = {
-                    'mood': mood,
-                    'face_emotion': emotion,
-                    'stress_level': pattern['stress'],
-                    'sleep_hours': max(1, min(12, pattern['sleep'] + np.random.normal(0, 1))),
-                    'workload': max(1, min(10, pattern['workload'] + np.random.randint(-2, 3))),
-                    'blink_rate': max(5, min(50, pattern['blink'] + np.random.randint(-5, 6))),
-                    'caffeine_intake': max(0, min(8, pattern['caffeine'] + np.random.randint(-1, 2))),
-                    'exercise_hours': max(0, min(5, pattern['exercise'] + np.random.uniform(-0.5, 0.5))),
-                    'screen_time': max(1, min(16, pattern['screen'] + np.random.randint(-2, 3)))
-                }
-                synthetic_data.append(synthetic_row)
+    # Create synthetic data for every mood/emotion combination
+    synthetic_df = coverage_dataset(rng if rng is not None else np.random.default_rng(), per_combination)
     
     # Add synthetic data to dataframe
-    if synthetic_data:
-        synthetic_df = pd.DataFrame(synthetic_data)
-        df = pd.concat([df, synthetic_df], ignore_index=True)
-        print(f"✅ Added {len(synthetic_data)} synthetic samples")
+    df = pd.concat([df, synthetic_df], ignore_index=True)
+    print(f"✅ Added {len(synthetic_df)} synthetic samples")
     
     return df
 
-def main():
+def drift_profile(forest, encoders, path="stress_data.csv", chunk_size=100_000):
+    """
+    Reference histograms for the API's drift monitor: the rows of path,
+    encoded as the API encodes requests. The coverage rows are left out, they
+    are not traffic the model should expect.
+    """
+    spec = feature_spec.FeatureSpec(encoders)
+
+    def chunks():
+        for chunk in pd.read_csv(path, chunksize=chunk_size, usecols=FEATURE_COLUMNS):
+            X, mapped = spec.encode_columns({col: chunk[col].to_numpy() for col in FEATURE_COLUMNS})
+            remapped = np.column_stack([chunk[col].astype(str).to_numpy() != mapped[col]
+                                        for col in feature_spec.LABEL_COLUMNS])
+            yield X, remapped
+
+    return DriftProfile.from_chunks(forest, encoders, chunks(), source=path)
+
+def save_primary(model, encoders, profile=None, forest=None) -> str:
+    """
+    Save the primary model every way the API and scripts load it from here:
+    stress_model.pkl + encoders.pkl, the stress_model.forest mmap artifact,
+    drift_profile.json, and a newly published version. Returns the version.
+    """
+    forest = forest if forest is not None else CompiledForest.from_sklearn(model)
+    joblib.dump(model, "stress_model.pkl")
+    joblib.dump(encoders, "encoders.pkl")
+    save_mmap_artifact(forest, encoders, "stress_model.forest")
+    if profile is not None:
+        profile.save("drift_profile.json")
+    return publish_artifacts(model, encoders, ".", profile=profile)
+
+def main(shadow=None):
+    """Fit and publish the primary model, or with `shadow`, a candidate under shadow/<shadow>."""
     # Check if dataset exists
     if not os.path.exists("stress_data.csv"):
         print("❌ stress_data.csv not found!")
         print("Creating a sample dataset for demonstration...")
         
         # Create a sample dataset
-        np.random.seed(42)
-        n_samples = 1000
-        
-        moods = ['happy', 'sad', 'angry', 'surprise', 'fear', 'disgust', 'neutral']
-        emotions = ['happy', 'sad', 'angry', 'surprise', 'fear', 'disgust', 'neutral']
-        stress_levels = ['low', 'medium', 'high']
-        
-        sample_data = []
-        for _ in range(n_samples):
-            mood = np.random.choice(moods)
-            emotion = np.random.choice(emotions)
-            
-            # Create correlations between mood and stress
-            if mood in ['happy', 'neutral']:
-                stress = np.random.choice(['low', 'medium'], p=[0.7, 0.3])
-                sleep = np.random.normal(8, 1)
-                workload = np.random.randint(1, 6)
-                blink = np.random.randint(10, 20)
-            elif mood in ['sad', 'surprise', 'disgust']:
-                stress = np.random.choice(['medium', 'high'], p=[0.6, 0.4])
-                sleep = np.random.normal(6, 1.5)
-                workload = np.random.randint(4, 8)
-                blink = np.random.randint(20, 30)
-            else:  # angry, fear
-                stress = np.random.choice(['medium', 'high'], p=[0.3, 0.7])
-                sleep = np.random.normal(5, 1.5)
-                workload = np.random.randint(6, 10)
-                blink = np.random.randint(25, 40)
-            
-            sample_data.append({
-                'mood': mood,
-                'sleep_hours': max(1, min(12, sleep)),
-                'workload': workload,
-                'face_emotion': emotion,
-                'blink_rate': blink,
-                'caffeine_intake': np.random.randint(0, 5),
-                'exercise_hours': max(0, np.random.normal(1, 0.5)),
-                'screen_time': np.random.randint(2, 12),
-                'stress_level': stress
-            })
-        
-        df = pd.DataFrame(sample_data)
+        df = sample_dataset(1000, np.random.default_rng(42))
         df.to_csv("stress_data.csv", index=False)
         print("✅ Sample dataset created!")
     
-    # Load dataset
+    # Load dataset (parsed and encoded once, then memory-mapped from the cache)
     print("📊 Loading dataset...")
-    df = pd.read_csv("stress_data.csv")
-    print(f"Dataset shape: {df.shape}")
-    print(f"Dataset columns: {list(df.columns)}")
-    
-    # Display basic info about the dataset
-    print("\n📈 Dataset Info:")
-    print(df.describe())
-    print(f"\nUnique moods: {sorted(df['mood'].unique())}")
-    print(f"Unique emotions: {sorted(df['face_emotion'].unique())}")
-    print(f"Unique stress levels: {sorted(df['stress_level'].unique())}")
-    
-    # Ensure all expected labels are present
-    df = create_synthetic_data_if_needed(df)
-    
-    # Encode categorical columns
-    print("\n🔄 Encoding categorical variables...")
-    encoders = {}
-    for col in ["mood", "face_emotion", "stress_level"]:
-        le = LabelEncoder()
-        df[col] = le.fit_transform(df[col])
-        encoders[col] = le
+    from dataset_cache import load_dataset
+    dataset = load_dataset("stress_data.csv")
+    status = "Loaded cached" if dataset.hit else "Built and cached"
+    print(f"✅ {status} encoded dataset {dataset.key} in {dataset.seconds * 1000:.1f} ms")
+    encoders = dataset.encoders
+    for col, le in encoders.items():
         print(f"Encoded {col}: {list(le.classes_)}")
 
     # Features and target
-    feature_columns = [
-        "mood",
-        "sleep_hours",
-        "workload", 
-        "face_emotion",
-        "blink_rate",
-        "caffeine_intake",
-        "exercise_hours",
-        "screen_time"
-    ]
+    feature_columns = FEATURE_COLUMNS
+    
+    X = pd.DataFrame(np.asarray(dataset.X), columns=feature_columns)
+    y = pd.Series(np.asarray(dataset.y), name="stress_level")
     
-    X = df[feature_columns]
-    y = df["stress_level"]
+    # Display basic info about the dataset
+    print("\n📈 Dataset Info:")
+    print(X.describe())
     
     print(f"\n🎯 Feature matrix shape: {X.shape}")
     print(f"Target distribution:")
@@ -184,14 +153,7 @@ def main():
 
     # Train Random Forest
     print("\n🌳 Training Random Forest model...")
-    model = RandomForestClassifier(
-        n_estimators=150,
-        max_depth=None,
-        min_samples_split=3,
-        max_features="sqrt",
-        random_state=42,
-        class_weight='balanced'  # Handle class imbalance
-    )
+    model = RandomForestClassifier(**MODEL_PARAMS)
 
     model.fit(X_train, y_train)
 
@@ -221,9 +183,18 @@ def main():
 
     # Save model + encoders
     print("\n💾 Saving model and encoders...")
-    joblib.dump(model, "stress_model.pkl")
-    joblib.dump(encoders, "encoders.pkl")
-    print("✅ Model + encoders saved successfully!")
+    forest = CompiledForest.from_sklearn(model)
+    # Reference histograms of every feature for the API's drift monitor
+    profile = drift_profile(forest, encoders, "stress_data.csv")
+    if shadow:
+        # Scored next to the primary by the API until `promote` says otherwise
+        shadow_dir = os.path.join("shadow", shadow)
+        os.makedirs(shadow_dir, exist_ok=True)
+        version = publish_artifacts(model, encoders, shadow_dir, profile=profile)
+        print(f"✅ Shadow candidate saved to {shadow_dir} (version {version})")
+    else:
+        version = save_primary(model, encoders, profile, forest)
+        print(f"✅ Model + encoders saved successfully! (version {version})")
     
     # Test the model with sample data
     print("\n🧪 Testing model with sample predictions...")
@@ -233,23 +204,72 @@ def main():
         {'mood': 'fear', 'face_emotion': 'fear', 'sleep_hours': 4, 'workload': 9, 'blink_rate': 35, 'caffeine_intake': 4, 'exercise_hours': 0, 'screen_time': 10}
     ]
     
-    for i, sample in enumerate(test_samples):
-        # Encode the sample
-        encoded_sample = []
-        encoded_sample.append(encoders["mood"].transform([sample['mood']])[0])
-        encoded_sample.append(sample['sleep_hours'])
-        encoded_sample.append(sample['workload'])
-        encoded_sample.append(encoders["face_emotion"].transform([sample['face_emotion']])[0])
-        encoded_sample.append(sample['blink_rate'])
-        encoded_sample.append(sample['caffeine_intake'])
-        encoded_sample.append(sample['exercise_hours'])
-        encoded_sample.append(sample['screen_time'])
-        
-        # Make prediction
-        pred = model.predict([encoded_sample])[0]
-        stress_level = encoders["stress_level"].inverse_transform([pred])[0]
-        
+    spec = feature_spec.FeatureSpec(encoders)
+    encoded_samples, _ = spec.encode_records(test_samples)
+    preds = model.predict(pd.DataFrame(encoded_samples, columns=feature_columns))
+    for i, (sample, stress_level) in enumerate(zip(test_samples, spec.decode(preds))):
         print(f"Sample {i+1}: {sample['mood']}/{sample['face_emotion']} -> {stress_level} stress")
 
+def capture_profile(args):
+    """Write the drift profile of the model the API would load, over the data it was trained on."""
+    from score import load_bundle
+    from utils.drift_monitor import profile_path
+    from utils.model_registry import ModelRegistry
+
+    candidate = ModelRegistry(args.model_dir, poll_interval=0).latest_candidate()
+    if candidate is None:
+        print(f"❌ No model found in {args.model_dir}!")
+        return None
+    if not os.path.exists(args.data):
+        print(f"❌ {args.data} not found!")
+        return None
+    bundle = load_bundle(candidate)
+    profile = drift_profile(bundle.forest, bundle.encoders, args.data)
+    path = profile_path(args.model_dir, bundle.version)
+    profile.save(path)
+    print(f"✅ Drift profile of {profile.rows:,} rows for version {bundle.version} written to {path}")
+    return path
+
+def cli():
+    parser = argparse.ArgumentParser(description="Train the stress model")
+    commands = parser.add_subparsers(dest="command")
+    train_parser = commands.add_parser("train", help="Fit the default model and publish it (default)")
+    train_parser.add_argument("--shadow", metavar="NAME",
+                              help="Publish to shadow/NAME as a candidate the API compares with the primary")
+    sweep_parser = commands.add_parser("sweep", help="Search hyperparameters across a process pool")
+    large_parser = commands.add_parser("large", help="Train out of core on a dataset read in chunks")
+    compress_parser = commands.add_parser("compress", help="Shrink the model within an accuracy budget")
+    update_parser = commands.add_parser("update", help="Grow trees on new feedback and publish without a refit")
+    profile_parser = commands.add_parser("profile", help="Capture the drift reference of an existing model")
+    profile_parser.add_argument("--data", default="stress_data.csv")
+    profile_parser.add_argument("--model-dir", default=".")
+    promote_parser = commands.add_parser("promote", help="Make a shadow candidate the primary if the data supports it")
+    import compress
+    import incremental
+    import out_of_core
+    import promote
+    import sweep
+    sweep.add_arguments(sweep_parser)
+    out_of_core.add_arguments(large_parser)
+    compress.add_arguments(compress_parser)
+    incremental.add_arguments(update_parser)
+    promote.add_arguments(promote_parser)
+
+    args = parser.parse_args()
+    if args.command == "sweep":
+        sweep.run(args)
+    elif args.command == "large":
+        out_of_core.run(args)
+    elif args.command == "compress":
+        compress.run(args)
+    elif args.command == "update":
+        incremental.run(args)
+    elif args.command == "profile":
+        capture_profile(args)
+    elif args.command == "promote":
+        promote.run(args)
+    else:
+        main(getattr(args, "shadow", None))
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    cli()
\ No newline at end of file
@@ -0,0 +1,225 @@
+"""
+Asyncio admission control for the prediction endpoints.
+
+At most `max_concurrency` requests hold a slot (are running) at a time and at
+most `max_queue` more wait for one, in arrival order (0: none wait, a request
+either gets a free slot or is turned away). Everything past that is shed at
+once with Overloaded(429) instead of joining a queue that only makes every
+caller slower.
+
+A request may carry a deadline. The expected wait is estimated from the queue
+length and a moving average of how long a slot is held; when the request
+would not finish in time, or its deadline passes while it waits, it leaves
+the queue and gets `degraded()` (a cheaper answer computed on the spot)
+instead, or Overloaded(503) if it has none or the event loop is already too
+far behind to compute one. Work that already holds a slot is never
+interrupted: a thread can't be cancelled.
+
+Queue and fallback only see requests that got as far as the endpoint; on a
+saturated event loop the wait is in front of it, parsing bodies that will
+never be served. AdmissionMiddleware therefore turns requests away before
+routing, while the queue is full or, with every slot taken, the loop is
+running more than `max_lag_ms` behind (429 and 503 respectively, both with
+Retry-After).
+"""
+import asyncio
+import json
+import math
+import time
+from collections import Counter, deque
+import numpy as np
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing; retry_after is a whole number of seconds."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency: int = 4, max_queue: int = 64, deadline_ms: float = 250.0,
+                 max_lag_ms: float = 50.0, lag_interval_ms: float = 10.0, window: int = 10000):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        # Default budget for requests that don't bring their own
+        self.deadline = deadline_ms / 1000.0 if deadline_ms else None
+        self.active = 0
+        self._waiters = deque()
+        # Seconds a slot is held, smoothed; seeded low so the first requests queue
+        self._service = 0.001
+        self._queue_waits = deque(maxlen=window)
+        self.outcomes = Counter()
+        # Event loop lag, sampled by a callback every lag_interval seconds
+        self.max_lag = max_lag_ms / 1000.0 if max_lag_ms else None
+        self.lag_interval = lag_interval_ms / 1000.0
+        self.lag = 0.0
+        self._loop = None
+        self._next_tick = None
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self, position: int) -> float:
+        """Seconds until the request at `position` in the queue (0 = next) gets a slot."""
+        return (position + 1) * self._service / self.max_concurrency
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.expected_wait(len(self._waiters))))
+
+    def _tick(self) -> None:
+        now = self._loop.time()
+        self.lag = self._smoothed(now)
+        self._next_tick = now + self.lag_interval
+        self._loop.call_at(self._next_tick, self._tick)
+
+    def _smoothed(self, now: float) -> float:
+        # Half the last average, half the newest sample: one GC pause doesn't shed
+        # the requests queued behind it, a backlog that keeps growing does
+        return 0.5 * self.lag + 0.5 * max(0.0, now - self._next_tick)
+
+    def current_lag(self) -> float:
+        """Seconds the loop is behind, averaged; an overdue sample counts before it runs."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First request on this loop; start sampling
+            self._loop, self._next_tick, self.lag = loop, loop.time() + self.lag_interval, 0.0
+            loop.call_at(self._next_tick, self._tick)
+        return max(self.lag, self._smoothed(loop.time()))
+
+    def check(self) -> None:
+        """Raise Overloaded if a request arriving now should be turned away unseen."""
+        # The queue only matters once every slot is taken
+        busy = self.active >= self.max_concurrency
+        if busy and len(self._waiters) >= self.max_queue:
+            self.outcomes["shed_queue_full"] += 1
+            raise Overloaded(429, "queue full", self.retry_after())
+        # A lagging loop with free slots is a hiccup (a GC pause, a burst), not overload
+        if busy and self.max_lag is not None and self.current_lag() > self.max_lag:
+            self.outcomes["shed_loop_lag"] += 1
+            raise Overloaded(503, "event loop lag", max(1, math.ceil(self.current_lag())))
+
+    async def run(self, call, degraded=None, deadline: float = None):
+        """
+        Await call() once a slot is free. deadline is a budget in seconds from
+        now (the controller's default when None, no limit when it is 0).
+        """
+        started = time.perf_counter()
+        budget = self.deadline if deadline is None else deadline or None
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self.outcomes["admitted"] += 1
+        else:
+            if self.active >= self.max_concurrency and len(self._waiters) >= self.max_queue:
+                self.outcomes["shed_queue_full"] += 1
+                raise Overloaded(429, "queue full", self.retry_after())
+            # Still has to run once it gets the slot
+            slack = None if budget is None else budget - self.expected_wait(len(self._waiters)) - self._service
+            if slack is not None and slack <= 0:
+                return self._fallback(degraded, "deadline")
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await asyncio.wait_for(asyncio.shield(future), None if budget is None else budget - self._service)
+            except asyncio.TimeoutError:
+                if not future.done():
+                    future.cancel()
+                    self._waiters.remove(future)
+                    return self._fallback(degraded, "deadline")
+            except BaseException:
+                # The caller went away; hand on a slot it may have just been given
+                if future.done() and not future.cancelled():
+                    self._release()
+                elif not future.done():
+                    future.cancel()
+                    self._waiters.remove(future)
+                raise
+            self._queue_waits.append(time.perf_counter() - started)
+            self.outcomes["queued"] += 1
+
+        held = time.perf_counter()
+        try:
+            return await call()
+        finally:
+            self._service = 0.9 * self._service + 0.1 * (time.perf_counter() - held)
+            self._release()
+
+    def _release(self) -> None:
+        # The slot goes straight to the oldest waiter, so `active` stays as it is
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def _fallback(self, degraded, reason: str):
+        # The fallback runs on the loop; a loop that is already behind can't afford it
+        lagging = self.max_lag is not None and self.current_lag() > self.max_lag
+        if degraded is None or lagging:
+            self.outcomes[f"shed_{reason}"] += 1
+            raise Overloaded(503, f"{reason} can't be met", self.retry_after())
+        self.outcomes["degraded"] += 1
+        return degraded()
+
+    def stats(self) -> dict:
+        waits_ms = np.array(self._queue_waits) * 1000.0
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "deadline_ms": self.deadline * 1000.0 if self.deadline else None,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "service_ms": self._service * 1000.0,
+            "max_lag_ms": self.max_lag * 1000.0 if self.max_lag else None,
+            "loop_lag_ms": self.lag * 1000.0,
+            "outcomes": dict(self.outcomes),
+            "queue_wait_ms": {
+                "mean": float(waits_ms.mean()) if len(waits_ms) else 0.0,
+                "p50": float(np.percentile(waits_ms, 50)) if len(waits_ms) else 0.0,
+                "p99": float(np.percentile(waits_ms, 99)) if len(waits_ms) else 0.0,
+            },
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware answering requests to `paths` that controller().check()
+    refuses before routing. Only `methods` are gated, so CORS preflights
+    (OPTIONS) always get through. Add it inside CORSMiddleware, so the 429
+    and 503 carry the CORS headers a browser needs to read them.
+    """
+
+    def __init__(self, app, controller, paths=(), methods=("POST",)):
+        self.app = app
+        # A callable, so the controller can be swapped or switched off (None) at runtime
+        self.controller = controller
+        self.paths = frozenset(paths)
+        self.methods = frozenset(methods)
+
+    async def __call__(self, scope, receive, send):
+        controller = self.controller()
+        if (scope["type"] != "http" or controller is None or scope["path"] not in self.paths
+                or scope["method"] not in self.methods):
+            await self.app(scope, receive, send)
+            return
+        try:
+            controller.check()
+        except Overloaded as e:
+            body = json.dumps({"detail": f"Server overloaded: {e.reason}"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": e.status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(e.retry_after).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        await self.app(scope, receive, send)
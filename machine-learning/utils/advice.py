@@ -0,0 +1,84 @@
+"""
+Advice returned with every prediction: the stress tips and the eye-strain
+analysis. Shared by the API (one request at a time) and training/score.py,
+which computes the same levels for whole columns at once.
+"""
+import numpy as np
+
+# Stress tips mapping
+tips_mapping = {
+    "low": [
+        "Keep up the good routine!",
+        "Maintain a balanced lifestyle.",
+        "Stay hydrated and active.",
+        "Continue your healthy habits."
+    ],
+    "medium": [
+        "Take short walks or stretch breaks.",
+        "Try breathing or meditation exercises.",
+        "Reduce screen time when possible.",
+        "Consider taking short breaks throughout the day."
+    ],
+    "high": [
+        "Consider journaling your feelings.",
+        "Talk to a friend, family member, or counselor.",
+        "Limit caffeine intake and get enough sleep.",
+        "Try relaxation techniques like deep breathing or yoga."
+    ]
+}
+
+EYE_STRAIN_LEVELS = ("low", "medium", "high")
+# (blink rate below, screen time above) for each level
+HIGH_STRAIN = (10, 4)
+MEDIUM_STRAIN = (15, 2)
+
+
+def tips_key(stress_level: str) -> str:
+    """The tips_mapping key for a stress level; unknown levels get the medium tips."""
+    return stress_level if stress_level in tips_mapping else "medium"
+
+
+def get_eye_strain_analysis(blink_rate: int, screen_time: int, fatigue: bool = False) -> dict:
+    analysis = {
+        "level": "low",
+        "message": "Your blink rate appears normal. Keep up the good routine!",
+        "exercises": []
+    }
+    
+    # A normal blink rate is 15-20 per minute. It often drops to 5-7 during computer use.
+    if blink_rate < HIGH_STRAIN[0] and screen_time > HIGH_STRAIN[1]:
+        analysis["level"] = "high"
+        analysis["message"] = "Your blink rate is lower than average, which can lead to dry eyes and strain, especially with high screen time."
+        analysis["exercises"] = [
+            "The 20-20-20 Rule: Every 20 minutes, look at something 20 feet away for 20 seconds.",
+            "Palming: Gently close your eyes and cover them with your cupped palms for 60 seconds to relax them.",
+            "Focus Change: Hold a finger a few inches from your eye and focus on it. Slowly move it away, holding your focus."
+        ]
+    elif blink_rate < MEDIUM_STRAIN[0] and screen_time > MEDIUM_STRAIN[1]:
+        analysis["level"] = "medium"
+        analysis["message"] = "Your blink rate is slightly low. Remember to take regular screen breaks."
+        analysis["exercises"] = [
+            "The 20-20-20 Rule: Every 20 minutes, look at something 20 feet away for 20 seconds."
+        ]
+
+    if fatigue:
+        # Long or frequent eye closures point to tiredness regardless of blink rate
+        if analysis["level"] == "low":
+            analysis["level"] = "medium"
+            analysis["message"] = "Your eyes are closing often or for long stretches, a sign of fatigue."
+        analysis["exercises"].append("Rest: Step away from the screen and close your eyes for a few minutes.")
+    analysis["fatigue"] = bool(fatigue)
+        
+    return analysis
+
+
+def eye_strain_levels(blink_rate, screen_time, fatigue=None) -> np.ndarray:
+    """Vectorized get_eye_strain_analysis(...)["level"]: indices into EYE_STRAIN_LEVELS."""
+    blink_rate = np.asarray(blink_rate)
+    screen_time = np.asarray(screen_time)
+    levels = np.zeros(blink_rate.shape, dtype=np.int8)
+    levels[(blink_rate < MEDIUM_STRAIN[0]) & (screen_time > MEDIUM_STRAIN[1])] = 1
+    levels[(blink_rate < HIGH_STRAIN[0]) & (screen_time > HIGH_STRAIN[1])] = 2
+    if fatigue is not None:
+        levels[(levels == 0) & np.asarray(fatigue, dtype=bool)] = 1
+    return levels
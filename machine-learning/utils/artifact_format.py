@@ -0,0 +1,96 @@
+"""
+Memory-mappable on-disk format for the compiled forest and its encoders.
+
+An artifact is a directory holding one raw `.npy` file per forest array and a
+small `header.json` with the dtypes, shapes, max depth and the encoder
+classes. Loading opens every array with `np.load(mmap_mode="r")`, so all
+uvicorn workers on a host share the same physical pages through the page
+cache, and no worker has to unpickle sklearn objects (or import sklearn).
+
+    training/stress_model.forest/
+        header.json
+        feature.npy  threshold.npy  left.npy  right.npy
+        children.npy value.npy      roots.npy classes.npy
+"""
+import json
+import os
+import shutil
+import numpy as np
+
+from utils.forest_engine import ARRAY_FIELDS, CompiledForest
+
+FORMAT_VERSION = 1
+HEADER_NAME = "header.json"
+MMAP_ARRAYS = ARRAY_FIELDS + ("children",)
+
+
+class ArrayLabelEncoder:
+    """The parts of sklearn's LabelEncoder the API uses, backed by a sorted class array."""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(sorted(classes))
+
+    def transform(self, labels) -> np.ndarray:
+        labels = np.asarray(labels)
+        indices = np.searchsorted(self.classes_, labels)
+        indices = np.clip(indices, 0, len(self.classes_) - 1)
+        unknown = self.classes_[indices] != labels
+        if np.any(unknown):
+            raise ValueError(f"y contains previously unseen labels: {list(labels[unknown])}")
+        return indices
+
+    def inverse_transform(self, indices) -> np.ndarray:
+        return self.classes_[np.asarray(indices, dtype=np.int64)]
+
+
+def save_mmap_artifact(forest: CompiledForest, encoders: dict, path: str) -> None:
+    """
+    Write the artifact into a temporary directory and rename it into place.
+    header.json is written last, so a directory without one is incomplete.
+    """
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    arrays = {}
+    for name in MMAP_ARRAYS:
+        array = np.ascontiguousarray(getattr(forest, name))
+        np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+        arrays[name] = {"dtype": array.dtype.str, "shape": list(array.shape)}
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "max_depth": forest.max_depth,
+        "arrays": arrays,
+        "encoders": {name: [str(c) for c in encoder.classes_] for name, encoder in encoders.items()},
+    }
+    with open(os.path.join(tmp_path, HEADER_NAME), "w") as f:
+        json.dump(header, f, indent=2)
+
+    if os.path.exists(path):
+        old_path = f"{path}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    else:
+        os.replace(tmp_path, path)
+
+
+def load_mmap_artifact(path: str):
+    """Return (CompiledForest, encoders) with every forest array memory-mapped read-only."""
+    with open(os.path.join(path, HEADER_NAME)) as f:
+        header = json.load(f)
+    if header.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"unsupported artifact format {header.get('format_version')}")
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        if array.dtype.str != spec["dtype"] or list(array.shape) != spec["shape"]:
+            raise ValueError(f"array '{name}' does not match the header")
+        arrays[name] = array
+
+    forest = CompiledForest(max_depth=header["max_depth"], **arrays)
+    encoders = {name: ArrayLabelEncoder(classes) for name, classes in header["encoders"].items()}
+    return forest, encoders
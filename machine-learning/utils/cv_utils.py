@@ -1,17 +1,431 @@
 import cv2
+import numpy as np
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
 
-def detect_face_emotion(image_path: str):
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-    img = cv2.imread(image_path)
+CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+
+
+class DetectorPool:
+    """
+    Process-wide pool of face detectors. Parsing the cascade XML is slow and a
+    CascadeClassifier must not be used by two threads at once, so each caller
+    borrows one for the duration of a detection.
+    """
+
+    def __init__(self, size: int = None, cascade_path: str = CASCADE_PATH):
+        self.size = size or os.cpu_count() or 1
+        self.cascade_path = cascade_path
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        try:
+            detector = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    detector = cv2.CascadeClassifier(self.cascade_path)
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                detector = self._pool.get()
+        try:
+            yield detector
+        finally:
+            self._pool.put(detector)
+
+
+detector_pool = DetectorPool()
+
+
+def decode_image(data: bytes):
+    """Decode JPEG/PNG bytes in memory; returns None if they aren't an image."""
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if buffer.size == 0:
+        return None
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+
+def detect_faces(img):
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+    with detector_pool.acquire() as face_cascade:
+        return face_cascade.detectMultiScale(gray, 1.1, 4)
 
+
+def emotion_from_faces(faces):
     if len(faces) == 0:
         return "neutral"
     else:
         # For demo, assume sad if face found (replace with real classifier later)
         return "sad"
 
-def detect_fatigue(image_path: str):
-    # Placeholder: always return False
-    return False
+
+def detect_face_emotion_image(img):
+    return emotion_from_faces(detect_faces(img))
+
+
+def analyze_frame_bytes(data: bytes) -> dict:
+    """Decode one encoded frame in memory and run face detection on it."""
+    img = decode_image(data)
+    if img is None:
+        raise ValueError("could not decode image")
+    faces = detect_faces(img)
+    return {"faces": len(faces), "face_emotion": emotion_from_faces(faces)}
+
+
+def detect_face_emotion(image_path: str):
+    return detect_face_emotion_image(cv2.imread(image_path))
+
+
+def downscale(gray, width: int):
+    """(gray resized to `width` pixels wide, scale factor)."""
+    scale = width / gray.shape[1]
+    return cv2.resize(gray, (width, int(gray.shape[0] * scale))), scale
+
+
+def largest_face(small):
+    """(x, y, w, h) of the largest face in an already downscaled gray frame, or None."""
+    with detector_pool.acquire() as face_cascade:
+        faces = face_cascade.detectMultiScale(small, 1.1, 2, minSize=(30, 30))
+    if len(faces) == 0:
+        return None
+    return tuple(int(v) for v in max(faces, key=lambda f: f[2] * f[3]))
+
+
+class EyeOpennessTracker:
+    """
+    Per-frame eye openness from a video stream, cheap enough for 30+ fps on one core.
+
+    The face is located with the Haar cascade on a downscaled frame only every
+    `face_interval` frames. In between, openness is read from the eye band of
+    the last face box: open eyes (lids, iris, pupil) produce strong vertical
+    intensity changes that a closed lid smooths out. The gradient energy is
+    divided by a slow running baseline of open-eye frames, so ~1.0 means
+    "as open as usual" and blinks dip well below it.
+    """
+
+    def __init__(self, face_interval: int = 15, detect_width: int = 320, baseline_alpha: float = 0.02):
+        self.face_interval = face_interval
+        self.detect_width = detect_width
+        self.baseline_alpha = baseline_alpha
+        self.face = None
+        self.baseline = None
+        self._frames = 0
+
+    def _locate_face(self, gray):
+        small, scale = downscale(gray, self.detect_width)
+        face = largest_face(small)
+        if face is None:
+            return None
+        return tuple(int(round(v / scale)) for v in face)
+
+    def update(self, frame):
+        """Return the openness of this frame, or None while no face is known."""
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self._frames % self.face_interval == 0:
+            self.face = self._locate_face(gray) or self.face
+        self._frames += 1
+        if self.face is None:
+            return None
+
+        x, y, w, h = self.face
+        band = gray[y + h // 5:y + h // 2, x + w // 8:x + w - w // 8]
+        if band.shape[0] < 4 or band.shape[1] < 2:
+            return None
+        # Halving the band by area averaging suppresses sensor noise before the gradient
+        band = cv2.resize(band, (band.shape[1] // 2, band.shape[0] // 2), interpolation=cv2.INTER_AREA)
+        energy = float(np.abs(np.diff(band.astype(np.int16), axis=0)).mean())
+
+        if self.baseline is None:
+            self.baseline = energy
+        openness = energy / self.baseline if self.baseline > 0 else 1.0
+        if openness > 0.75:
+            # Only frames that look open move the baseline
+            self.baseline += self.baseline_alpha * (energy - self.baseline)
+        return openness
+
+
+class BlinkRateEstimator:
+    """
+    Blink detection and rolling blinks-per-minute in constant memory.
+
+    A small hysteresis state machine turns the openness signal into blinks:
+    OPEN -> CLOSED when openness drops below `close_threshold`, CLOSED -> OPEN
+    once it recovers above `open_threshold`. A closure between `min_blink_s`
+    and `max_blink_s` is a blink; a longer one is a long closure, a fatigue cue.
+    Blinks and closed time are accumulated into one-second buckets of a
+    fixed-size ring covering `window_s`, so memory does not grow with stream
+    length. PERCLOS is the share of that window spent with the eyes closed.
+    """
+
+    OPEN = "open"
+    CLOSED = "closed"
+
+    def __init__(self, window_s: int = 60, close_threshold: float = 0.6, open_threshold: float = 0.8,
+                 min_blink_s: float = 0.05, max_blink_s: float = 0.5):
+        self.window_s = window_s
+        self.close_threshold = close_threshold
+        self.open_threshold = open_threshold
+        self.min_blink_s = min_blink_s
+        self.max_blink_s = max_blink_s
+
+        self.state = self.OPEN
+        self._closed_since = None
+        self._last_ts = None
+        self._start_ts = None
+        self._bucket_second = np.full(window_s, -1, dtype=np.int64)
+        self._blinks = np.zeros(window_s, dtype=np.int32)
+        self._long_closures = np.zeros(window_s, dtype=np.int32)
+        self._closed_time = np.zeros(window_s, dtype=np.float64)
+        self._seen_time = np.zeros(window_s, dtype=np.float64)
+        self.total_blinks = 0
+
+    def _bucket(self, ts: float) -> int:
+        second = int(ts)
+        index = second % self.window_s
+        if self._bucket_second[index] != second:
+            self._bucket_second[index] = second
+            self._blinks[index] = 0
+            self._long_closures[index] = 0
+            self._closed_time[index] = 0.0
+            self._seen_time[index] = 0.0
+        return index
+
+    def update(self, openness, ts: float) -> bool:
+        """Feed one frame; returns True when it completes a blink."""
+        if openness is None:
+            self._last_ts = None
+            return False
+        if self._start_ts is None:
+            self._start_ts = ts
+        index = self._bucket(ts)
+        if self._last_ts is not None:
+            dt = max(0.0, ts - self._last_ts)
+            self._seen_time[index] += dt
+            if self.state == self.CLOSED:
+                self._closed_time[index] += dt
+        self._last_ts = ts
+
+        if self.state == self.OPEN:
+            if openness < self.close_threshold:
+                self.state = self.CLOSED
+                self._closed_since = ts
+            return False
+
+        if openness > self.open_threshold:
+            self.state = self.OPEN
+            duration = ts - self._closed_since
+            if self.min_blink_s <= duration <= self.max_blink_s:
+                self._blinks[index] += 1
+                self.total_blinks += 1
+                return True
+            if duration > self.max_blink_s:
+                self._long_closures[index] += 1
+        return False
+
+    def _live(self, now: float) -> np.ndarray:
+        return (self._bucket_second > int(now) - self.window_s) & (self._bucket_second >= 0)
+
+    def blinks_per_minute(self, now: float = None):
+        """Rolling rate over the window; None until a few seconds have been seen."""
+        now = self._last_ts if now is None else now
+        if now is None or self._start_ts is None:
+            return None
+        span = min(self.window_s, now - self._start_ts)
+        if span < 5.0:
+            return None
+        return float(self._blinks[self._live(now)].sum()) * 60.0 / span
+
+    def snapshot(self, now: float = None) -> dict:
+        now = self._last_ts if now is None else now
+        live = self._live(now) if now is not None else np.zeros(self.window_s, dtype=bool)
+        seen = float(self._seen_time[live].sum())
+        return {
+            "blink_rate": self.blinks_per_minute(now),
+            "perclos": float(self._closed_time[live].sum()) / seen if seen > 0 else 0.0,
+            "long_closures": int(self._long_closures[live].sum()),
+            "total_blinks": self.total_blinks,
+        }
+
+
+def detect_fatigue(snapshot: dict) -> bool:
+    """
+    Fatigue from a BlinkRateEstimator snapshot: eyes closed for more than 15%
+    of the window (PERCLOS), repeated long closures, or a very high blink rate.
+    """
+    blink_rate = snapshot.get("blink_rate")
+    return (
+        snapshot.get("perclos", 0.0) > 0.15
+        or snapshot.get("long_closures", 0) >= 2
+        or (blink_rate is not None and blink_rate > 35)
+    )
+
+
+class EmotionGate:
+    """
+    Runs an emotion model only on frames where its answer could change.
+
+    Once a face is found (Haar cascade on a `detect_width` frame), it is
+    followed by template matching in a small window around its last box and
+    re-detected every `redetect_interval` frames or when the match is lost.
+    The model then sees only the face crop (`face_fn`), with `margin` of the
+    box added on each side; without a face it gets the full frame
+    (`analyze_fn`), as before.
+
+    Each frame is reduced to a 48x48 probe of the tracked face (or 64x48 of
+    the whole frame) and compared with the probe of the last analysed frame
+    in 6x6 blocks, so a change confined to the mouth or eyes is not averaged
+    away. When no block's mean absolute difference reaches
+    `change_threshold` grey levels, inference is skipped, but never more
+    than `max_skip` frames in a row and never while the smoothed label is
+    still settling. The returned
+    label is the majority of the last `window` inferences, ties going to the
+    most recent.
+
+    Instances are callable like any analyze_fn and keep per-thread CPU time
+    of the gate itself and of the model in stats().
+    """
+
+    def __init__(self, analyze_fn, face_fn=None, detect_width: int = 320, redetect_interval: int = 30,
+                 min_match: float = 0.6, margin: float = 0.2, change_threshold: float = 6.0,
+                 max_skip: int = 15, window: int = 5):
+        self.analyze_fn = analyze_fn
+        self.face_fn = face_fn or analyze_fn
+        self.detect_width = detect_width
+        self.redetect_interval = redetect_interval
+        self.min_match = min_match
+        self.margin = margin
+        self.change_threshold = change_threshold
+        self.max_skip = max_skip
+        self.recent = deque(maxlen=window)
+
+        self.face = None
+        self._box = None
+        self._template = None
+        self._since_detect = 0
+        self._reference = None
+        self._skipped_in_row = 0
+
+        self.frames = 0
+        self.inferences = 0
+        self.face_inferences = 0
+        self.skipped = 0
+        self.detections = 0
+        self.tracked = 0
+        self.gate_cpu_s = 0.0
+        self.model_cpu_s = 0.0
+
+    @property
+    def emotion(self):
+        """Majority label of the recent inferences, None before the first one."""
+        if not self.recent:
+            return None
+        counts = Counter(self.recent)
+        best = max(counts.values())
+        for label in reversed(self.recent):
+            if counts[label] == best:
+                return label
+
+    def _detect(self, small):
+        self.detections += 1
+        self._since_detect = 0
+        box = largest_face(small)
+        if box is not None:
+            x, y, w, h = box
+            self._template = small[y:y + h, x:x + w].copy()
+        return box
+
+    def _track(self, small):
+        x, y, w, h = self._box
+        pad = max(w, h) // 2
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        search = small[y0:y + h + pad, x0:x + w + pad]
+        if search.shape[0] < h or search.shape[1] < w:
+            return None
+        _, best, _, (dx, dy) = cv2.minMaxLoc(cv2.matchTemplate(search, self._template, cv2.TM_CCOEFF_NORMED))
+        if best < self.min_match:
+            return None
+        self.tracked += 1
+        return x0 + dx, y0 + dy, w, h
+
+    def _crop(self, frame, box, scale):
+        x, y, w, h = (int(round(v / scale)) for v in box)
+        mx, my = int(w * self.margin), int(h * self.margin)
+        self.face = (x, y, w, h)
+        return frame[max(0, y - my):y + h + my, max(0, x - mx):x + w + mx]
+
+    @staticmethod
+    def _change(reference, probe) -> float:
+        diff = cv2.absdiff(reference, probe)
+        return float(cv2.resize(diff, (diff.shape[1] // 6, diff.shape[0] // 6), interpolation=cv2.INTER_AREA).max())
+
+    def _settled(self) -> bool:
+        return bool(self.recent) and self.emotion == self.recent[-1]
+
+    def __call__(self, frame):
+        started = time.thread_time()
+        self.frames += 1
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small, scale = downscale(gray, self.detect_width)
+
+        box = None
+        if self._box is not None and self._since_detect < self.redetect_interval:
+            box = self._track(small)
+        if box is None:
+            box = self._detect(small)
+        self._since_detect += 1
+        self._box = box
+
+        if box is None:
+            self.face = None
+            crop = None
+            probe = ("frame", cv2.resize(small, (64, 48), interpolation=cv2.INTER_AREA))
+        else:
+            crop = self._crop(frame, box, scale)
+            x, y, w, h = box
+            probe = ("face", cv2.resize(small[y:y + h, x:x + w], (48, 48), interpolation=cv2.INTER_AREA))
+
+        reference = self._reference
+        if (reference is not None and reference[0] == probe[0] and self._skipped_in_row < self.max_skip
+                and self._settled() and self._change(reference[1], probe[1]) < self.change_threshold):
+            self.skipped += 1
+            self._skipped_in_row += 1
+            self.gate_cpu_s += time.thread_time() - started
+            return self.emotion
+
+        inference_started = time.thread_time()
+        self.gate_cpu_s += inference_started - started
+        label = self.analyze_fn(frame) if crop is None else self.face_fn(crop)
+        self.model_cpu_s += time.thread_time() - inference_started
+        self.inferences += 1
+        self.face_inferences += crop is not None
+        self._reference = probe
+        self._skipped_in_row = 0
+        self.recent.append(label)
+        return self.emotion
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "inferences": self.inferences,
+            "face_inferences": self.face_inferences,
+            "skipped": self.skipped,
+            "skip_rate": self.skipped / self.frames if self.frames else 0.0,
+            "detections": self.detections,
+            "tracked": self.tracked,
+            "gate_cpu_s": self.gate_cpu_s,
+            "model_cpu_s": self.model_cpu_s,
+        }
@@ -0,0 +1,401 @@
+"""
+Streaming drift monitor for the inputs and predictions of the stress API.
+
+Every feature has a fixed set of bins: one per whole number of its
+NUMERIC_RANGES (values are rounded and clamped, as the API clamps them) and,
+for the label columns, one per encoder class plus one for labels the spec
+had to remap (a LABEL_FALLBACKS entry such as fear -> sad, or the default).
+The predicted stress level has one bin per class. The layout only depends on
+the FeatureSpec, so it is a couple of hundred counters whatever the traffic.
+
+A DriftProfile is that histogram over the training data and the model's
+predictions on it. Training publishes it next to the model as
+drift_profile-<version>.json (drift_profile.json for the unversioned pair).
+
+DriftMonitor counts live rows into per-thread arrays: an observation turns a
+row into its nine bin indices and adds one to each in the calling thread's
+own array, so request threads never share a lock or a counter. When a thread
+exits (AnyIO retires idle threadpool workers), its counts are merged into
+one shard of retired threads, so there is one array per live thread plus
+that one, however many threads come and go. Counts roll
+over every `window_seconds`; a report sums the current and the previous
+window of every thread (one to two windows of traffic) and compares it with
+the profile: PSI for every feature and the predictions, plus the KS distance
+of the binned CDFs for the numeric features.
+
+    python train_model.py profile   # capture a profile for an existing model
+"""
+import json
+import math
+import os
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+
+import numpy as np
+
+from utils.feature_spec import FEATURE_COLUMNS, LABEL_COLUMNS, NUMERIC_RANGES, TARGET_COLUMN, FeatureSpec
+from utils.forest_engine import row_slices
+
+PROFILE_PREFIX = "drift_profile"
+PROFILE_FORMAT = 1
+REMAPPED_BIN = "<remapped>"
+# Usual PSI reading: below 0.1 stable, up to 0.25 moderate, above that significant
+PSI_BANDS = ((0.1, "stable"), (0.25, "moderate"))
+# Floor for empty bins, so PSI stays finite when one side never saw a value
+_EPS = 1e-4
+
+
+def profile_path(directory: str, version: str) -> str:
+    if version.startswith("unversioned-"):
+        return os.path.join(directory, f"{PROFILE_PREFIX}.json")
+    return os.path.join(directory, f"{PROFILE_PREFIX}-{version}.json")
+
+
+def load_profile(directory: str, version: str):
+    """The DriftProfile published with a model version, or None."""
+    path = profile_path(directory, version)
+    return DriftProfile.load(path) if os.path.exists(path) else None
+
+
+def psi(live: np.ndarray, reference: np.ndarray) -> float:
+    p = np.maximum(live / max(live.sum(), 1), _EPS)
+    q = np.maximum(reference / max(reference.sum(), 1), _EPS)
+    return float(np.sum((p - q) * np.log(p / q)))
+
+
+def ks(live: np.ndarray, reference: np.ndarray) -> float:
+    """Largest gap between the two binned CDFs."""
+    p = np.cumsum(live) / max(live.sum(), 1)
+    q = np.cumsum(reference) / max(reference.sum(), 1)
+    return float(np.max(np.abs(p - q)))
+
+
+def psi_status(value) -> str:
+    for bound, status in PSI_BANDS:
+        if value < bound:
+            return status
+    return "significant"
+
+
+class BinLayout:
+    """Where every feature's bins sit in one flat count vector."""
+
+    def __init__(self, spec: FeatureSpec):
+        self.labels = {}
+        offsets, lows, tops = [], [], []
+        offset = 0
+        for col in FEATURE_COLUMNS:
+            if col in LABEL_COLUMNS:
+                low, top = 0, len(spec.classes[col]) - 1
+                self.labels[col] = list(spec.classes[col]) + [REMAPPED_BIN]
+            else:
+                low, high = NUMERIC_RANGES[col]
+                top = high - low
+                self.labels[col] = [str(value) for value in range(low, high + 1)]
+            offsets.append(offset)
+            lows.append(low)
+            tops.append(top)
+            offset += len(self.labels[col])
+        self.labels[TARGET_COLUMN] = list(spec.classes[TARGET_COLUMN])
+        self.prediction_offset = offset
+        self.size = offset + len(self.labels[TARGET_COLUMN])
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.lows = np.array(lows, dtype=float)
+        self.tops = np.array(tops, dtype=float)
+        self.label_positions = [FEATURE_COLUMNS.index(col) for col in LABEL_COLUMNS]
+        # Bin of a remapped label: one past the column's last class
+        self.remapped_bins = self.offsets[self.label_positions] + self.tops[self.label_positions].astype(np.int64) + 1
+        # Plain Python for bins_one(); numpy's per-call overhead dominates a single row
+        self._columns = list(zip(offsets, lows, tops))
+        self._remapped = list(zip(self.label_positions, self.remapped_bins.tolist()))
+
+    def slices(self) -> dict:
+        """{column: slice of the count vector}, the predicted stress level included."""
+        bounds = list(self.offsets) + [self.prediction_offset, self.size]
+        columns = FEATURE_COLUMNS + (TARGET_COLUMN,)
+        return {col: slice(int(bounds[i]), int(bounds[i + 1])) for i, col in enumerate(columns)}
+
+    def bins(self, X, predictions, remapped=None) -> np.ndarray:
+        """
+        (rows, 9) indices into the count vector for encoded rows X, predicted
+        class codes and, optionally, a (rows, 2) flag of remapped mood and
+        face_emotion labels.
+        """
+        X = np.asarray(X, dtype=float)
+        index = np.empty((len(X), len(FEATURE_COLUMNS) + 1), dtype=np.int64)
+        index[:, :-1] = np.clip(np.rint(X) - self.lows, 0, self.tops) + self.offsets
+        if remapped is not None:
+            remapped = np.asarray(remapped, dtype=bool)
+            positions = self.label_positions
+            index[:, positions] = np.where(remapped, self.remapped_bins, index[:, positions])
+        index[:, -1] = np.asarray(predictions, dtype=np.int64) + self.prediction_offset
+        return index
+
+    def bins_one(self, row, prediction, remapped=None) -> list:
+        """bins() of a single row, as a list; round() rounds half to even like np.rint."""
+        index = []
+        for value, (offset, low, top) in zip(row.tolist(), self._columns):
+            value = round(value) - low
+            index.append(offset + (0 if value < 0 else top if value > top else value))
+        if remapped is not None:
+            for (position, bin), flag in zip(self._remapped, remapped):
+                if flag:
+                    index[position] = bin
+        index.append(self.prediction_offset + int(prediction))
+        return index
+
+    def count(self, X, predictions, remapped=None) -> np.ndarray:
+        return np.bincount(self.bins(X, predictions, remapped).ravel(), minlength=self.size)
+
+
+class DriftProfile:
+    """Reference histograms of every feature and of the predicted stress level."""
+
+    def __init__(self, histograms: dict, rows: int, created_at: str = None, source: str = None):
+        # {column: (bin labels, counts)}
+        self.histograms = histograms
+        self.rows = rows
+        self.created_at = created_at or datetime.now(timezone.utc).isoformat()
+        self.source = source
+
+    @classmethod
+    def from_counts(cls, layout: BinLayout, counts: np.ndarray, rows: int, source: str = None) -> "DriftProfile":
+        histograms = {col: (layout.labels[col], counts[part].astype(np.int64))
+                      for col, part in layout.slices().items()}
+        return cls(histograms, rows, source=source)
+
+    @classmethod
+    def from_chunks(cls, forest, encoders: dict, chunks, source: str = None) -> "DriftProfile":
+        """Profile of (encoded rows, remapped flags or None) chunks and the compiled forest's predictions."""
+        layout = BinLayout(FeatureSpec(encoders))
+        counts = np.zeros(layout.size, dtype=np.int64)
+        rows = 0
+        for X, remapped in chunks:
+            X = np.asarray(X, dtype=float)
+            for part in row_slices(len(X)):
+                flags = None if remapped is None else remapped[part]
+                counts += layout.count(X[part], forest.predict(X[part]), flags)
+            rows += len(X)
+        return cls.from_counts(layout, counts, rows, source)
+
+    @classmethod
+    def from_forest(cls, forest, encoders: dict, X, source: str = None) -> "DriftProfile":
+        """Profile of encoded rows X and the compiled forest's predictions on them."""
+        return cls.from_chunks(forest, encoders, [(X, None)], source)
+
+    def to_dict(self) -> dict:
+        return {
+            "format": PROFILE_FORMAT,
+            "rows": self.rows,
+            "created_at": self.created_at,
+            "source": self.source,
+            "histograms": {col: {"bins": labels, "counts": [int(c) for c in counts]}
+                           for col, (labels, counts) in self.histograms.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DriftProfile":
+        if data.get("format") != PROFILE_FORMAT:
+            raise ValueError(f"unsupported drift profile format {data.get('format')}")
+        histograms = {col: (list(h["bins"]), np.asarray(h["counts"], dtype=np.int64))
+                      for col, h in data["histograms"].items()}
+        return cls(histograms, data["rows"], data.get("created_at"), data.get("source"))
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "DriftProfile":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def reference_for(self, layout: BinLayout) -> dict:
+        """{column: counts} for the columns whose bins match the layout."""
+        return {col: counts for col, (labels, counts) in self.histograms.items()
+                if layout.labels.get(col) == labels}
+
+
+class _Shard:
+    """
+    One thread's counts: the current window and the one before it. Plain
+    lists, since adding one to nine list items is several times cheaper than
+    a numpy fancy-index increment.
+    """
+
+    __slots__ = ("window", "current", "previous")
+
+    def __init__(self, size: int, window: int):
+        self.window = window
+        self.current = [0] * size
+        self.previous = [0] * size
+
+    def roll(self, window: int) -> None:
+        self.previous = self.current if window == self.window + 1 else [0] * len(self.current)
+        self.current = [0] * len(self.previous)
+        self.window = window
+
+    def merge(self, other: "_Shard") -> None:
+        """Add another shard's counts, lined up on the later of the two windows."""
+        if other.window > self.window:
+            self.roll(other.window)
+        if other.window == self.window:
+            pairs = ((self.current, other.current), (self.previous, other.previous))
+        elif other.window == self.window - 1:
+            pairs = ((self.previous, other.current),)
+        else:
+            return
+        for mine, theirs in pairs:
+            for i, count in enumerate(theirs):
+                if count:
+                    mine[i] += count
+
+
+class _Owner:
+    """Held only by a thread's local storage; it goes away with the thread."""
+
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self, shard: _Shard):
+        self.shard = shard
+
+
+class DriftMonitor:
+    def __init__(self, window_seconds: float = 3600.0, min_rows: int = 200, clock=time.monotonic):
+        self.window_seconds = window_seconds
+        self.min_rows = min_rows
+        self.clock = clock
+        self.version = None
+        self.profile = None
+        # (layout, thread-local owner of a shard, list of every live thread's shard
+        # after the retired threads' one), replaced as a whole
+        self._state = None
+        self._reference = {}
+        self._lock = threading.Lock()
+
+    def set_reference(self, spec: FeatureSpec, profile, version: str = None) -> None:
+        """
+        Compare against `profile` (None when the model has none) from now on.
+        Live counts are kept across model versions unless the bins change.
+        """
+        layout = BinLayout(spec)
+        with self._lock:
+            state = self._state
+            if state is None or state[0].labels != layout.labels:
+                self._state = (layout, threading.local(), [_Shard(layout.size, 0)])
+            self._reference = profile.reference_for(self._state[0]) if profile is not None else {}
+            self.profile = profile
+            self.version = version
+
+    def observe(self, X, predictions, remapped=None) -> None:
+        state = self._state
+        if state is None:
+            return
+        layout, local, shards = state
+        window = int(self.clock() // self.window_seconds)
+        owner = getattr(local, "owner", None)
+        if owner is None:
+            owner = local.owner = _Owner(_Shard(layout.size, window))
+            # Not at interpreter exit: nothing reads the counts then
+            weakref.finalize(owner, self._retire, shards, owner.shard).atexit = False
+            with self._lock:
+                shards.append(owner.shard)
+        shard = owner.shard
+        if shard.window != window:
+            shard.roll(window)
+        current = shard.current
+        if len(X) == 1:
+            for i in layout.bins_one(X[0], predictions[0], remapped[0] if remapped is not None else None):
+                current[i] += 1
+        else:
+            counts = np.bincount(layout.bins(X, predictions, remapped).ravel(), minlength=layout.size)
+            for i in np.flatnonzero(counts).tolist():
+                current[i] += int(counts[i])
+
+    def counts(self) -> np.ndarray:
+        """Live counts over the current and previous window of every thread."""
+        state = self._state
+        if state is None:
+            return None
+        layout, _, shards = state
+        window = int(self.clock() // self.window_seconds)
+        total = np.zeros(layout.size, dtype=np.int64)
+        # Under the lock so a retiring shard isn't counted both on its own and
+        # merged. Live shards are read while their threads write; a report may
+        # be a few rows behind
+        with self._lock:
+            for shard in shards:
+                if shard.window == window:
+                    total += np.array(shard.current) + np.array(shard.previous)
+                elif shard.window == window - 1:
+                    total += np.array(shard.current)
+        return total
+
+    def _retire(self, shards: list, shard: _Shard) -> None:
+        # Runs as the thread exits (or when its state is replaced)
+        with self._lock:
+            shards[0].merge(shard)
+            shards.remove(shard)
+
+    def report(self) -> dict:
+        state = self._state
+        if state is None:
+            return {"status": "no_model", "rows": 0}
+        layout = state[0]
+        counts = self.counts()
+        slices = layout.slices()
+        rows = int(counts[slices[TARGET_COLUMN]].sum())
+        report = {
+            "model_version": self.version,
+            "window_seconds": self.window_seconds,
+            "rows": rows,
+            "reference_rows": self.profile.rows if self.profile is not None else None,
+            "reference_created_at": self.profile.created_at if self.profile is not None else None,
+            "features": {},
+        }
+        worst = None
+        for col, part in slices.items():
+            live, reference = counts[part], self._reference.get(col)
+            entry = {}
+            if col in LABEL_COLUMNS:
+                entry["remapped_share"] = float(live[-1] / rows) if rows else None
+            if col == TARGET_COLUMN:
+                entry["live"] = {label: float(c / rows) if rows else 0.0 for label, c in zip(layout.labels[col], live)}
+            if reference is not None and rows:
+                entry["psi"] = psi(live, reference)
+                entry["status"] = psi_status(entry["psi"])
+                if col in NUMERIC_RANGES:
+                    entry["ks"] = ks(live, reference)
+                if col == TARGET_COLUMN:
+                    total = max(int(reference.sum()), 1)
+                    entry["reference"] = {label: float(c / total) for label, c in zip(layout.labels[col], reference)}
+                if worst is None or entry["psi"] > worst:
+                    worst = entry["psi"]
+            if col == TARGET_COLUMN:
+                report["prediction"] = entry
+            else:
+                report["features"][col] = entry
+
+        if not self._reference:
+            report["status"] = "no_reference"
+        elif rows < self.min_rows:
+            report["status"] = "insufficient_data"
+        else:
+            report["status"] = psi_status(worst)
+        report["max_psi"] = worst
+        return report
+
+    def gauges(self) -> list:
+        """((column,), psi) samples for a metrics Gauge, once there are enough rows to score."""
+        report = self.report()
+        if report["status"] in ("no_model", "no_reference", "insufficient_data"):
+            return []
+        samples = [((col,), entry["psi"]) for col, entry in report.get("features", {}).items() if "psi" in entry]
+        prediction = report.get("prediction", {})
+        if "psi" in prediction:
+            samples.append(((TARGET_COLUMN,), prediction["psi"]))
+        return [(labels, value) for labels, value in samples if math.isfinite(value)]
@@ -0,0 +1,145 @@
+"""
+One definition of the model's input: feature order, numeric ranges, label
+fallbacks and the label <-> code tables, shared by training, the API and
+offline scoring.
+
+A FeatureSpec is compiled from a set of fitted encoders (sklearn's
+LabelEncoder or ArrayLabelEncoder, anything with a sorted `classes_`). Every
+label a request may send resolves through one dict lookup to
+`(known label, code)`, so encoding never calls `encoder.transform` or relies
+on exceptions for unseen labels, and decoding is an array index.
+
+Unknown labels resolve deterministically: through LABEL_FALLBACKS when the
+target is known to the encoders, otherwise to DEFAULT_LABELS[column] if the
+encoders know it, otherwise to the first (alphabetically smallest) class.
+
+    spec = FeatureSpec(encoders)
+    row, labels = spec.encode_one({"mood": "fear", "sleep_hours": 5, ...})
+    X, labels = spec.encode_columns({"mood": [...], "sleep_hours": [...], ...})
+    spec.decode(model_predictions)
+"""
+import numpy as np
+
+FEATURE_COLUMNS = (
+    "mood",
+    "sleep_hours",
+    "workload",
+    "face_emotion",
+    "blink_rate",
+    "caffeine_intake",
+    "exercise_hours",
+    "screen_time",
+)
+LABEL_COLUMNS = ("mood", "face_emotion")
+TARGET_COLUMN = "stress_level"
+CATEGORICAL_COLUMNS = LABEL_COLUMNS + (TARGET_COLUMN,)
+
+# Inclusive (low, high) clamp applied to every numeric feature before encoding
+NUMERIC_RANGES = {
+    "sleep_hours": (0, 24),
+    "workload": (1, 10),
+    "blink_rate": (5, 60),
+    "caffeine_intake": (0, 20),
+    "exercise_hours": (0, 12),
+    "screen_time": (0, 24),
+}
+
+# Mapping for unseen labels to known labels
+LABEL_FALLBACKS = {
+    "mood": {"fear": "sad", "disgust": "angry"},
+    "face_emotion": {"fear": "sad", "disgust": "angry"},
+}
+# Used for labels with no (usable) fallback, when the encoders know it
+DEFAULT_LABELS = {"mood": "neutral", "face_emotion": "neutral"}
+
+
+def clamp(column: str, value):
+    low, high = NUMERIC_RANGES[column]
+    return max(low, min(high, value))
+
+
+class FeatureSpec:
+    def __init__(self, encoders: dict, fallbacks: dict = None, defaults: dict = None):
+        fallbacks = LABEL_FALLBACKS if fallbacks is None else fallbacks
+        defaults = DEFAULT_LABELS if defaults is None else defaults
+        self.columns = FEATURE_COLUMNS
+        self.n_features = len(FEATURE_COLUMNS)
+        self.classes = {col: [str(c) for c in encoders[col].classes_] for col in CATEGORICAL_COLUMNS}
+        self.codes = {col: {label: code for code, label in enumerate(self.classes[col])}
+                      for col in CATEGORICAL_COLUMNS}
+        # label -> (known label, code) for every known label and every usable fallback
+        self.resolved = {}
+        self.default = {}
+        for col in LABEL_COLUMNS:
+            codes = self.codes[col]
+            table = {label: (label, code) for label, code in codes.items()}
+            for label, target in fallbacks.get(col, {}).items():
+                if label not in codes and target in codes:
+                    table[label] = (target, codes[target])
+            self.resolved[col] = table
+            default = defaults.get(col)
+            default = default if default in codes else self.classes[col][0]
+            self.default[col] = (default, codes[default])
+        self.targets = np.asarray(self.classes[TARGET_COLUMN], dtype=object)
+
+    def resolve(self, column: str, label) -> tuple:
+        """(known label, code) for any label, see the module docstring for unknown ones."""
+        return self.resolved[column].get(label) or self.default[column]
+
+    def map_label(self, column: str, label) -> str:
+        return self.resolve(column, label)[0]
+
+    def encode_one(self, record, out: np.ndarray = None) -> tuple:
+        """
+        Encode one dict (or any object with the feature attributes) into a
+        float64 row in FEATURE_COLUMNS order. Numeric values are clamped.
+        Returns (row, {label column: mapped label}).
+        """
+        get = record.get if isinstance(record, dict) else lambda name: getattr(record, name)
+        row = np.empty(self.n_features, dtype=float) if out is None else out
+        labels = {}
+        for i, col in enumerate(FEATURE_COLUMNS):
+            value = get(col)
+            if col in self.resolved:
+                labels[col], row[i] = self.resolve(col, value)
+            else:
+                row[i] = clamp(col, value)
+        return row, labels
+
+    def encode_records(self, records) -> tuple:
+        """encode_one over a sequence; returns (X, [mapped labels per record])."""
+        X = np.empty((len(records), self.n_features), dtype=float)
+        labels = [self.encode_one(record, X[i])[1] for i, record in enumerate(records)]
+        return X, labels
+
+    def encode_columns(self, columns: dict, dtype=float) -> tuple:
+        """
+        Encode a columnar batch ({column: sequence, array or pandas
+        Categorical}) without importing pandas. Each label column is resolved
+        once per distinct value. Returns
+        (X, {label column: object array of mapped labels}).
+        """
+        n = len(columns[FEATURE_COLUMNS[0]])
+        X = np.empty((n, self.n_features), dtype=dtype)
+        labels = {}
+        for i, col in enumerate(FEATURE_COLUMNS):
+            values = columns[col]
+            if col in self.resolved:
+                if hasattr(values, "categories"):
+                    # A pandas Categorical is already factorized; code -1 (missing) takes the default
+                    uniques, inverse = np.asarray(values.categories, dtype=str), np.asarray(values.codes)
+                else:
+                    uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+                pairs = [self.resolve(col, label) for label in uniques.tolist()] + [self.default[col]]
+                mapped = np.empty(len(pairs), dtype=object)
+                mapped[:] = [label for label, _ in pairs]
+                X[:, i] = np.array([code for _, code in pairs], dtype=dtype)[inverse]
+                labels[col] = mapped[inverse]
+            else:
+                low, high = NUMERIC_RANGES[col]
+                np.clip(np.asarray(values, dtype=dtype), low, high, out=X[:, i])
+        return X, labels
+
+    def decode(self, predictions) -> np.ndarray:
+        """Stress level labels for predicted class codes."""
+        return self.targets[np.asarray(predictions, dtype=np.int64)]
@@ -0,0 +1,114 @@
+"""
+Append-only store of labelled feedback for incremental retraining.
+
+POST /feedback appends one CSV row per record: the InputData fields as the
+client sent them, the stress level the user reported and the model version
+that was serving. The file is opened with O_APPEND and each call is written
+with a single os.write, so several API workers can append to the same file
+without interleaving rows, and nothing is ever rewritten in place.
+
+training/incremental.py reads it back without rescanning it: rows past a
+byte offset it remembers (read_since) and the newest n rows (read_tail),
+found by reading blocks backwards from the end.
+"""
+import csv
+import io
+import os
+import threading
+import time
+
+from utils.feature_spec import FEATURE_COLUMNS, TARGET_COLUMN
+
+FEEDBACK_COLUMNS = ("received_at", "model_version") + FEATURE_COLUMNS + (TARGET_COLUMN,)
+_HEADER = (",".join(FEEDBACK_COLUMNS) + "\n").encode()
+
+
+def _format_rows(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue().encode()
+
+
+class FeedbackStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.appended = 0
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> int:
+        if self._fd is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            try:
+                fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+                os.write(fd, _HEADER)
+                os.close(fd)
+            except FileExistsError:
+                pass
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        return self._fd
+
+    def append(self, records, model_version=None) -> int:
+        """Append dicts with FEATURE_COLUMNS and TARGET_COLUMN; returns the number written."""
+        received_at = time.time()
+        data = _format_rows(
+            [f"{received_at:.3f}", model_version or ""] + [record[col] for col in FEATURE_COLUMNS + (TARGET_COLUMN,)]
+            for record in records
+        )
+        if not data:
+            return 0
+        with self._lock:
+            os.write(self._open(), data)
+            self.appended += len(records)
+        return len(records)
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def stats(self) -> dict:
+        return {"bytes": self.size(), "appended": self.appended}
+
+
+def _frame(data: bytes):
+    import pandas as pd
+
+    return pd.read_csv(io.BytesIO(_HEADER + data), dtype={"model_version": str})
+
+
+def read_since(path: str, offset: int = 0) -> tuple:
+    """(DataFrame of the complete rows after byte offset, offset after the last of them)."""
+    with open(path, "rb") as f:
+        offset = max(offset, len(_HEADER))
+        f.seek(offset)
+        data = f.read()
+    # A row still being written has no newline yet; leave it for the next read
+    data = data[:data.rfind(b"\n") + 1]
+    return _frame(data), offset + len(data)
+
+
+def read_tail(path: str, rows: int, block_size: int = 1 << 16) -> tuple:
+    """(DataFrame of the last `rows` complete rows, byte offset just past them)."""
+    with open(path, "rb") as f:
+        start = f.seek(0, os.SEEK_END)
+        data = b""
+        while start > len(_HEADER) and data.count(b"\n") <= rows:
+            step = min(block_size, start - len(_HEADER))
+            start -= step
+            f.seek(start)
+            data = f.read(step) + data
+    end = start + data.rfind(b"\n") + 1
+    lines = data[:end - start].split(b"\n")[:-1]
+    if start > len(_HEADER):
+        # The first line was cut by the block boundary
+        lines = lines[1:]
+    kept = lines[-rows:] if rows > 0 else []
+    return _frame(b"".join(line + b"\n" for line in kept)), max(end, len(_HEADER))
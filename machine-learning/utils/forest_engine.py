@@ -0,0 +1,234 @@
+"""
+Array-based inference for the stress RandomForest.
+
+The sklearn forest is flattened into a handful of contiguous NumPy arrays
+(one row per node, all trees concatenated) and traversed level by level for
+every (row, tree) pair at once. Leaves point back at themselves, so the loop
+runs a fixed number of steps (the deepest tree) with no per-tree Python
+dispatch and no sklearn input validation.
+
+build_contributions() adds path-based attributions (Saabas): every split on
+the way from a root to a leaf moves the class probabilities, and the move is
+credited to the split's feature. The totals are tabulated once per leaf, so
+explain() is the traversal predict() already does plus one table lookup per
+(row, tree). The first explain() builds the tables: they are a few MB of
+private memory per process, which a forest that only predicts (a read-only
+mmap shared between workers, say) never pays for. The bias (the mean root value) plus a row's contributions is its
+predict_proba.
+"""
+import json
+import os
+import threading
+import numpy as np
+
+ARRAY_FIELDS = ("feature", "threshold", "left", "right", "value", "roots", "classes")
+# Rows per predict() call when scoring a large array: apply() holds a handful
+# of (rows x trees) int64 arrays, 20 MB each at this size with 150 trees
+PREDICT_SLICE = 16384
+
+
+def row_slices(n_rows: int, size: int = PREDICT_SLICE):
+    """slice objects covering range(n_rows) in steps of `size`."""
+    for start in range(0, n_rows, size):
+        yield slice(start, min(start + size, n_rows))
+
+
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, value, roots, classes, max_depth, children=None,
+                 n_features=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes = classes
+        self.max_depth = int(max_depth)
+        # Interleaved (left, right) pairs so one take() picks the next node
+        if children is None:
+            children = np.ascontiguousarray(np.stack([left, right], axis=1).ravel().astype(np.int64))
+        self.children = children
+        # Width of the attribution tables; the highest split feature + 1 when unknown
+        self.n_features = n_features
+        # Filled in by build_contributions(), bias last
+        self.leaf_slot = self.leaf_contributions = self.bias = None
+        self._build_lock = threading.Lock()
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in ARRAY_FIELDS)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompiledForest":
+        """Flatten a fitted RandomForestClassifier (or a single tree) into node arrays."""
+        estimators = getattr(model, "estimators_", [model])
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            n = tree.node_count
+            node_ids = np.arange(n, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+
+            feature = np.where(is_leaf, 0, tree.feature).astype(np.int32)
+            threshold = np.where(is_leaf, np.inf, tree.threshold)
+            left = np.where(is_leaf, node_ids, tree.children_left).astype(np.int32) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right).astype(np.int32) + offset
+
+            # Same normalisation DecisionTreeClassifier.predict_proba applies
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            value = value / normalizer
+
+            features.append(feature)
+            thresholds.append(threshold)
+            lefts.append(left)
+            rights.append(right)
+            values.append(value)
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features)),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds)),
+            left=np.ascontiguousarray(np.concatenate(lefts)),
+            right=np.ascontiguousarray(np.concatenate(rights)),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.array(roots, dtype=np.int32),
+            classes=np.asarray(model.classes_),
+            max_depth=max_depth,
+        )
+
+    def save(self, path: str) -> None:
+        np.savez(
+            path,
+            max_depth=np.array(self.max_depth),
+            **{name: getattr(self, name) for name in ARRAY_FIELDS},
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledForest":
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in ARRAY_FIELDS}
+            return cls(max_depth=int(data["max_depth"]), **arrays)
+
+    def head(self, n_trees: int) -> "CompiledForest":
+        """The first n_trees trees as a forest of their own, sharing this one's node arrays."""
+        return CompiledForest(
+            self.feature, self.threshold, self.left, self.right, self.value,
+            self.roots[:n_trees], self.classes, self.max_depth, children=self.children,
+            n_features=self.n_features,
+        )
+
+    def apply(self, X) -> np.ndarray:
+        """Return the leaf index reached in every tree, shape (n_rows, n_trees)."""
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat_x = X.ravel()
+        row_offsets = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, self.n_trees)
+        nodes = np.tile(self.roots.astype(np.int64), n_rows)
+        children = self.children
+        for _ in range(self.max_depth):
+            go_right = flat_x.take(row_offsets + self.feature.take(nodes)) > self.threshold.take(nodes)
+            nodes = children.take(2 * nodes + go_right)
+        return nodes.reshape(n_rows, self.n_trees)
+
+    def build_contributions(self, n_features: int = None) -> None:
+        """Tabulate, for every leaf, each feature's total change in class probabilities along its path."""
+        n_nodes, n_classes = self.value.shape
+        n_features = n_features or self.n_features or int(self.feature.max()) + 1
+        is_leaf = self.left == np.arange(n_nodes)
+        path = np.zeros((n_nodes, n_features, n_classes), dtype=np.float64)
+        frontier = self.roots.astype(np.int64)
+        while len(frontier):
+            parents = frontier[~is_leaf[frontier]]
+            split = self.feature[parents]
+            for children in (self.left[parents], self.right[parents]):
+                path[children] = path[parents]
+                path[children, split] += self.value[children] - self.value[parents]
+            frontier = np.concatenate([self.left[parents], self.right[parents]]).astype(np.int64)
+        leaves = np.flatnonzero(is_leaf)
+        leaf_slot = np.full(n_nodes, -1, dtype=np.int32)
+        leaf_slot[leaves] = np.arange(len(leaves), dtype=np.int32)
+        # Published in this order: a forest with a bias has its tables
+        self.leaf_slot = leaf_slot
+        self.leaf_contributions = np.ascontiguousarray(path[leaves])
+        self.bias = self.value[self.roots].mean(axis=0)
+
+    @property
+    def contributions_nbytes(self) -> int:
+        if self.leaf_contributions is None:
+            return 0
+        return self.leaf_slot.nbytes + self.leaf_contributions.nbytes + self.bias.nbytes
+
+    def explain(self, X, chunk_rows: int = 128) -> tuple:
+        """
+        (proba, contributions) with contributions of shape (rows, features,
+        classes): proba[i] equals bias + contributions[i].sum(axis=0) up to
+        rounding. Builds the tables on the first call.
+        """
+        if self.bias is None:
+            with self._build_lock:
+                if self.bias is None:
+                    self.build_contributions()
+        leaves = self.apply(X)
+        proba = self._proba(leaves)
+        contributions = np.empty((leaves.shape[0],) + self.leaf_contributions.shape[1:], dtype=np.float64)
+        # Chunks keep the gathered (rows x trees x features x classes) block a few MB
+        for i in range(0, leaves.shape[0], chunk_rows):
+            gathered = self.leaf_contributions.take(self.leaf_slot.take(leaves[i:i + chunk_rows]), axis=0)
+            contributions[i:i + chunk_rows] = gathered.sum(axis=1)
+        contributions /= self.n_trees
+        return proba, contributions
+
+    def _proba(self, leaves) -> np.ndarray:
+        proba = np.zeros((leaves.shape[0], self.value.shape[1]), dtype=np.float64)
+        # Accumulate tree by tree, in the same order sklearn does
+        for t in range(self.n_trees):
+            proba += self.value.take(leaves[:, t], axis=0)
+        proba /= self.n_trees
+        return proba
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self._proba(self.apply(X))
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def export_forest(model_path: str, output_path: str) -> CompiledForest:
+    import joblib
+
+    forest = CompiledForest.from_sklearn(joblib.load(model_path))
+    forest.save(output_path)
+    return forest
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Flatten a pickled RandomForest into a .npz node-array file")
+    parser.add_argument("model", help="Path to the joblib model pickle")
+    parser.add_argument("output", help="Path of the .npz file to write")
+    args = parser.parse_args()
+
+    forest = export_forest(args.model, args.output)
+    print(json.dumps({
+        "trees": forest.n_trees,
+        "nodes": forest.n_nodes,
+        "max_depth": forest.max_depth,
+        "array_bytes": forest.nbytes,
+        "file_bytes": os.path.getsize(args.output),
+    }, indent=2))
@@ -0,0 +1,287 @@
+"""
+Producer/consumer pipeline behind api/mood.py.
+
+    capture thread ──latest-frame slot──> analysis thread ──asyncio.Queue──> sender
+    (cv2 at capture_fps)  (drop-oldest)    (analyze_fn at      (one pooled httpx
+                                             analysis_fps)       client, /predict/batch)
+
+Capture never waits on inference or HTTP: the slot holds only the newest
+frame, and a frame that is replaced before the analyser took it counts as
+dropped. The capture thread also feeds every frame to the blink estimator,
+so blink_rate and fatigue in the payload come from the full frame rate.
+With api/mood.py's default EmotionGate as analyze_fn, the model runs on the
+tracked face crop and only when the face has changed.
+The sender batches analysed results and posts them over a single
+keep-alive connection. End-to-end latency is measured from frame capture to
+the API response.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Example fixed values for the features the webcam can't observe
+DEFAULT_DATA = {
+    "sleep_hours": 6,
+    "workload": 5,
+    "blink_rate": 20,
+    "caffeine_intake": 1,
+    "exercise_hours": 1,
+    "screen_time": 5
+}
+
+_END = object()
+
+
+def deepface_emotion(frame) -> str:
+    from deepface import DeepFace
+
+    result = DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
+    return result[0]['dominant_emotion']
+
+
+def deepface_face_emotion(face) -> str:
+    """Emotion of an already cropped face (see EmotionGate): DeepFace's own detector is skipped."""
+    from deepface import DeepFace
+
+    result = DeepFace.analyze(face, actions=['emotion'], enforce_detection=False, detector_backend='skip')
+    return result[0]['dominant_emotion']
+
+
+class LatestFrameSlot:
+    """Single-slot buffer: put() overwrites, get() takes the newest frame."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item) -> None:
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def get(self, timeout: float = None):
+        """Return the newest item, or _END once closed and empty."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._item is not None or self._closed, timeout)
+            item, self._item = self._item, None
+            if item is None and self._closed:
+                return _END
+            return item
+
+
+class MoodPipeline:
+    def __init__(self, source=0, api_url="http://127.0.0.1:8000", analyze_fn=deepface_emotion,
+                 capture_fps: float = 30.0, analysis_fps: float = 5.0, batch_size: int = 8,
+                 batch_wait_ms: float = 200.0, payload_defaults: dict = None, on_result=None,
+                 track_blinks: bool = True):
+        self.source = source
+        self.batch_url = api_url.rstrip("/") + "/predict/batch"
+        self.analyze_fn = analyze_fn
+        self.capture_fps = capture_fps
+        self.analysis_fps = analysis_fps
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000.0
+        self.payload_defaults = payload_defaults or DEFAULT_DATA
+        self.on_result = on_result
+        self.track_blinks = track_blinks
+        self.eye_tracker = None
+        self.blinks = None
+
+        self._slot = LatestFrameSlot()
+        self._stop = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._outbox = None
+        self._sender_ready = threading.Event()
+        self._threads = []
+
+        self.captured = 0
+        self.analyzed = 0
+        self.analysis_errors = 0
+        self.sent = 0
+        self.batches = 0
+        self.send_errors = 0
+        self.latencies = deque(maxlen=10000)
+        self._started_at = None
+        self._finished_at = None
+
+    # Capture
+
+    def _capture(self):
+        cap = None
+        try:
+            # Inside the try: whatever fails here still closes the slot, or the analyser waits forever
+            import cv2
+            from utils.cv_utils import BlinkRateEstimator, EyeOpennessTracker
+
+            if self.track_blinks:
+                self.eye_tracker = EyeOpennessTracker()
+                self.blinks = BlinkRateEstimator()
+            cap = cv2.VideoCapture(self.source)
+            interval = 1.0 / self.capture_fps if self.capture_fps > 0 else 0.0
+            next_tick = time.perf_counter()
+            while not self._stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                self.captured += 1
+                captured_at = time.perf_counter()
+                if self.track_blinks:
+                    self.blinks.update(self.eye_tracker.update(frame), captured_at)
+                self._slot.put((captured_at, frame))
+                next_tick += interval
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.perf_counter()
+        finally:
+            if cap is not None:
+                cap.release()
+            self._slot.close()
+
+    # Analysis
+
+    def _analyze(self):
+        interval = 1.0 / self.analysis_fps if self.analysis_fps > 0 else 0.0
+        next_tick = time.perf_counter()
+        while True:
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            item = self._slot.get(timeout=0.5)
+            if item is _END:
+                break
+            if item is None:
+                continue
+            next_tick = time.perf_counter() + interval
+
+            captured_at, frame = item
+            try:
+                mood = self.analyze_fn(frame)
+            except Exception as e:
+                self.analysis_errors += 1
+                logger.warning(f"Emotion analysis failed: {e}")
+                continue
+            self.analyzed += 1
+            payload = {"mood": mood, "face_emotion": mood, **self.payload_defaults, **self._eye_features()}
+            self._loop.call_soon_threadsafe(self._outbox.put_nowait, (captured_at, payload))
+        self._loop.call_soon_threadsafe(self._outbox.put_nowait, _END)
+
+    def _eye_features(self) -> dict:
+        from utils.cv_utils import detect_fatigue
+
+        if self.blinks is None:
+            return {}
+        snapshot = self.blinks.snapshot()
+        if snapshot["blink_rate"] is None:
+            return {}
+        return {"blink_rate": int(round(snapshot["blink_rate"])), "fatigue": detect_fatigue(snapshot)}
+
+    # Sending
+
+    async def _send_loop(self):
+        import httpx
+
+        done = False
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            while not done:
+                first = await self._outbox.get()
+                if first is _END:
+                    break
+                batch = [first]
+                deadline = self._loop.time() + self.batch_wait
+                while len(batch) < self.batch_size:
+                    remaining = deadline - self._loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._outbox.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    if item is _END:
+                        done = True
+                        break
+                    batch.append(item)
+                await self._post(client, batch)
+
+    async def _post(self, client, batch):
+        try:
+            response = await client.post(self.batch_url, json=[payload for _, payload in batch])
+            response.raise_for_status()
+            results = response.json()["results"]
+        except Exception as e:
+            self.send_errors += len(batch)
+            logger.warning(f"API error: {e}")
+            return
+        received_at = time.perf_counter()
+        self.batches += 1
+        self.sent += len(batch)
+        for (captured_at, payload), result in zip(batch, results):
+            self.latencies.append(received_at - captured_at)
+            if self.on_result is not None:
+                self.on_result(payload, result)
+
+    def _run_sender(self):
+        asyncio.set_event_loop(self._loop)
+        self._outbox = asyncio.Queue()
+        self._sender_ready.set()
+        self._loop.run_until_complete(self._send_loop())
+        self._loop.close()
+
+    # Lifecycle
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        sender = threading.Thread(target=self._run_sender, name="mood-sender", daemon=True)
+        sender.start()
+        self._sender_ready.wait()
+        for target, name in ((self._capture, "mood-capture"), (self._analyze, "mood-analysis")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._threads.append(sender)
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout: float = None):
+        for thread in self._threads:
+            thread.join(timeout)
+        self._finished_at = time.perf_counter()
+
+    def stats(self) -> dict:
+        elapsed = (self._finished_at or time.perf_counter()) - (self._started_at or time.perf_counter())
+        latencies_ms = np.array(self.latencies) * 1000.0
+        return {
+            "elapsed_s": elapsed,
+            "captured": self.captured,
+            "dropped_frames": self._slot.dropped,
+            "analyzed": self.analyzed,
+            "analysis_errors": self.analysis_errors,
+            "sent": self.sent,
+            "batches": self.batches,
+            "send_errors": self.send_errors,
+            "capture_fps": self.captured / elapsed if elapsed else 0.0,
+            "blinks": self.blinks.snapshot() if self.blinks else None,
+            "analysis_fps": self.analyzed / elapsed if elapsed else 0.0,
+            "gate": self.analyze_fn.stats() if hasattr(self.analyze_fn, "stats") else None,
+            "latency_ms": {
+                "p50": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else None,
+                "p95": float(np.percentile(latencies_ms, 95)) if len(latencies_ms) else None,
+                "max": float(latencies_ms.max()) if len(latencies_ms) else None,
+            },
+        }
@@ -0,0 +1,231 @@
+"""
+In-process metrics in the Prometheus text format, without extra dependencies.
+
+Histograms keep fixed cumulative-bucket counts per label set behind one lock,
+so an observation is a bisect and a few integer increments: cheap enough to
+time every stage of every request. /metrics renders the registry in the
+text exposition format (version 0.0.4) that Prometheus scrapes.
+
+StageTimer splits a request into stages with one perf_counter() call per
+stage boundary. RequestMetricsMiddleware is a plain ASGI middleware (no
+BaseHTTPMiddleware, which wraps every request in extra tasks) timing the
+whole request, including routing and pydantic validation, that happens
+before a handler runs. SampledLogger replaces unconditional per-request log
+lines with one structured JSON line for a sample of requests plus every
+slow one.
+"""
+import bisect
+import json
+import random
+import threading
+import time
+
+# Seconds; spans the sub-millisecond stages up to slow frame uploads
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """A gauge whose samples are read from a callback at scrape time."""
+
+    def __init__(self, name: str, help: str, labelnames=(), collect=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in (self.collect() if self.collect else []):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for labels, (counts, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """Times consecutive stages of one request into a histogram, labelled by endpoint and stage."""
+
+    __slots__ = ("histogram", "endpoint", "started", "last", "stages")
+
+    def __init__(self, histogram: Histogram, endpoint: str):
+        self.histogram = histogram
+        self.endpoint = endpoint
+        self.started = self.last = time.perf_counter()
+        self.stages = {}
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter()
+        elapsed = now - self.last
+        self.last = now
+        self.stages[stage] = elapsed
+        self.histogram.observe(elapsed, self.endpoint, stage)
+
+    def total(self) -> float:
+        return self.last - self.started
+
+    def summary_ms(self) -> dict:
+        return {stage: round(seconds * 1000.0, 4) for stage, seconds in self.stages.items()}
+
+
+class NullStageTimer:
+    """Drop-in StageTimer that records nothing."""
+
+    __slots__ = ()
+
+    def mark(self, stage: str) -> None:
+        pass
+
+    def total(self):
+        return None
+
+    def summary_ms(self) -> dict:
+        return {}
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording request latency and count by route and status."""
+
+    def __init__(self, app, latency: Histogram, requests: Counter, paths=None, enabled=lambda: True):
+        self.app = app
+        self.latency = latency
+        self.requests = requests
+        self.paths = paths
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled():
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            path = scope["path"]
+            # Unknown paths share one label so scanners can't blow up cardinality
+            if self.paths is not None and path not in self.paths():
+                path = "other"
+            self.latency.observe(time.perf_counter() - started, path)
+            self.requests.inc(path, str(status[0]))
+
+
+class SampledLogger:
+    """
+    One JSON log line for a `rate` share of events, and for every event slower
+    than slow_ms. Callers check sample() first so unsampled requests never
+    build the log fields.
+    """
+
+    def __init__(self, logger, rate: float = 0.01, slow_ms: float = 250.0):
+        self.logger = logger
+        self.rate = rate
+        self.slow_ms = slow_ms
+        self._random = random.random
+
+    def sample(self, duration_s: float = None) -> bool:
+        if duration_s is not None and duration_s * 1000.0 >= self.slow_ms:
+            return True
+        return self.rate > 0 and self._random() < self.rate
+
+    def emit(self, event: str, duration_s: float = None, **fields) -> None:
+        record = {"event": event}
+        if duration_s is not None:
+            record["duration_ms"] = round(duration_s * 1000.0, 3)
+            record["slow"] = duration_s * 1000.0 >= self.slow_ms
+        record.update(fields)
+        self.logger.info(json.dumps(record, default=str))
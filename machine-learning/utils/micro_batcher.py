@@ -0,0 +1,98 @@
+"""
+Asyncio micro-batching for single-item requests.
+
+Requests that arrive within `max_wait_ms` of each other (up to
+`max_batch_size`) are coalesced and handed to one `process_fn(items)` call
+running in the default executor, and each caller gets its own result back.
+`process_fn` must return one result per item, in order; an item whose result
+is an Exception has that exception raised in its caller.
+"""
+import asyncio
+import time
+from collections import Counter, deque
+import numpy as np
+
+
+class MicroBatcher:
+    def __init__(self, process_fn, max_batch_size: int = 32, max_wait_ms: float = 5.0, window: int = 10000):
+        self.process_fn = process_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        # Rolling samples for the metrics, bounded so memory stays constant
+        self._queue_waits = deque(maxlen=window)
+        self._batch_sizes = deque(maxlen=window)
+        self._size_counts = Counter()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        result = await future
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch = self._pending[:self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        started = time.perf_counter()
+        for _, _, enqueued in batch:
+            self._queue_waits.append(started - enqueued)
+        self._batch_sizes.append(len(batch))
+        self._size_counts[len(batch)] += 1
+        self.batches += 1
+        self.items += len(batch)
+
+        items = [item for item, _, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(None, self.process_fn, items)
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        waits_ms = np.array(self._queue_waits) * 1000.0
+        sizes = np.array(self._batch_sizes)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self.batches,
+            "items": self.items,
+            "pending": len(self._pending),
+            "batch_size": {
+                "mean": float(sizes.mean()) if len(sizes) else 0.0,
+                "max": int(sizes.max()) if len(sizes) else 0,
+                "histogram": {str(size): count for size, count in sorted(self._size_counts.items())},
+            },
+            "queue_wait_ms": {
+                "mean": float(waits_ms.mean()) if len(waits_ms) else 0.0,
+                "p50": float(np.percentile(waits_ms, 50)) if len(waits_ms) else 0.0,
+                "p99": float(np.percentile(waits_ms, 99)) if len(waits_ms) else 0.0,
+            },
+        }
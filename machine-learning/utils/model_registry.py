@@ -0,0 +1,267 @@
+"""
+Versioned model artifacts and hot reloading for the stress API.
+
+Training publishes `stress_model-<version>.pkl` next to `encoders-<version>.pkl`
+(see `publish_artifacts`). The registry watches the directory from a
+background thread, loads and validates the newest pair off the request path,
+and swaps the active bundle with a single reference assignment. Requests grab
+`registry.active` once and keep using that bundle even if a swap happens
+mid-request. Without versioned files, the plain `stress_model.pkl` /
+`encoders.pkl` pair is used and reloaded whenever it changes on disk.
+
+With `artifact_format="mmap"` the registry serves `stress_model-<version>.forest`
+(or `stress_model.forest`) directories instead, see utils/artifact_format.py.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+from utils.feature_spec import FeatureSpec
+from utils.artifact_format import HEADER_NAME, load_mmap_artifact, save_mmap_artifact
+from utils.drift_monitor import profile_path
+from utils.forest_engine import CompiledForest
+
+logger = logging.getLogger(__name__)
+
+MODEL_PREFIX = "stress_model"
+ENCODERS_PREFIX = "encoders"
+REQUIRED_ENCODERS = ("mood", "face_emotion", "stress_level")
+N_FEATURES = 8
+
+_VERSIONED_MODEL = re.compile(rf"^{MODEL_PREFIX}-(?P<version>[\w.]+)\.pkl$")
+_VERSIONED_MMAP = re.compile(rf"^{MODEL_PREFIX}-(?P<version>[\w.]+)\.forest$")
+
+
+def _natural_key(version: str):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", version)]
+
+
+def _file_signature(*paths):
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature.append((os.path.basename(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _dump_atomic(obj, path: str) -> None:
+    import joblib
+
+    tmp_path = f"{path}.tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def publish_artifacts(model, encoders, directory: str, version: str = None, profile=None) -> str:
+    """
+    Write a versioned model/encoders pair, plus its memory-mappable twin, that a
+    running registry will pick up. Encoders are written first and every file is
+    renamed into place, so the watcher never sees a half-written pair. A
+    DriftProfile (utils/drift_monitor.py) is written before either.
+    """
+    version = version or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    if profile is not None:
+        profile.save(profile_path(directory, version))
+    forest = CompiledForest.from_sklearn(model)
+    save_mmap_artifact(forest, encoders, os.path.join(directory, f"{MODEL_PREFIX}-{version}.forest"))
+    _dump_atomic(encoders, os.path.join(directory, f"{ENCODERS_PREFIX}-{version}.pkl"))
+    _dump_atomic(model, os.path.join(directory, f"{MODEL_PREFIX}-{version}.pkl"))
+    return version
+
+
+class ModelBundle:
+    """Everything one prediction needs, loaded and validated together."""
+
+    def __init__(self, version, model, encoders, signature, forest=None):
+        self.version = version
+        # None when the bundle was opened from a memory-mapped artifact
+        self.model = model
+        self.encoders = encoders
+        self.signature = signature
+        # Flattened copy of the forest used for inference instead of model.predict
+        self.forest = forest if forest is not None else CompiledForest.from_sklearn(model)
+        # Get the classes that the encoders were trained on
+        self.mood_classes = set(encoders["mood"].classes_)
+        self.face_emotion_classes = set(encoders["face_emotion"].classes_)
+        # Label and feature lookup tables, compiled by validate()
+        self.spec = None
+        self.loaded_at = time.time()
+
+    @classmethod
+    def load(cls, version, model_path, encoders_path, signature=None) -> "ModelBundle":
+        import joblib  # only the pickle format needs joblib (and, through the pickles, sklearn)
+
+        signature = signature or _file_signature(model_path, encoders_path)
+        return cls(version, joblib.load(model_path), joblib.load(encoders_path), signature)
+
+    @classmethod
+    def load_mmap(cls, version, path, signature=None) -> "ModelBundle":
+        signature = signature or _file_signature(os.path.join(path, HEADER_NAME))
+        forest, encoders = load_mmap_artifact(path)
+        return cls(version, None, encoders, signature, forest=forest)
+
+    def validate(self) -> None:
+        """Raise ValueError if the pair can't safely serve traffic."""
+        missing = [name for name in REQUIRED_ENCODERS if name not in self.encoders]
+        if missing:
+            raise ValueError(f"encoders missing {missing}")
+        for name in REQUIRED_ENCODERS:
+            if len(self.encoders[name].classes_) == 0:
+                raise ValueError(f"encoder '{name}' has no classes")
+        self.spec = FeatureSpec(self.encoders)
+        if int(np.max(self.forest.feature)) >= N_FEATURES:
+            raise ValueError(f"forest splits on features beyond the {N_FEATURES} the API sends")
+        # Width of the attribution tables the first explain=true request builds
+        self.forest.n_features = N_FEATURES
+        if len(self.forest.classes) != len(self.encoders["stress_level"].classes_):
+            raise ValueError("model classes do not match the stress_level encoder")
+
+        # Smoke prediction: one mid-range row through the forest and the decoder
+        X = np.array([[0, 7, 5, 0, 15, 2, 1, 6]], dtype=float)
+        actual = self.forest.predict(X)
+        if self.model is not None:
+            if getattr(self.model, "n_features_in_", N_FEATURES) != N_FEATURES:
+                raise ValueError(f"model expects {self.model.n_features_in_} features, not {N_FEATURES}")
+            if not np.array_equal(self.model.predict(X), actual):
+                raise ValueError("compiled forest disagrees with the model on the smoke row")
+        self.spec.decode(actual)
+
+    def describe(self) -> dict:
+        return {
+            "version": self.version,
+            "loaded_at": datetime.fromtimestamp(self.loaded_at, timezone.utc).isoformat(),
+            "trees": self.forest.n_trees,
+            "format": "pickle" if self.model is not None else "mmap",
+        }
+
+
+class ModelRegistry:
+    def __init__(self, directory: str, poll_interval: float = 5.0, artifact_format: str = "pickle"):
+        if artifact_format not in ("pickle", "mmap"):
+            raise ValueError(f"unknown artifact format '{artifact_format}'")
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.artifact_format = artifact_format
+        self.active = None
+        self.last_error = None
+        self.swaps = 0
+        self._failed = set()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_listener(self, callback) -> None:
+        """Call callback(bundle) after every swap."""
+        self._listeners.append(callback)
+
+    def latest_candidate(self):
+        """Return (version, model_path, encoders_path) of the newest usable pair, or None."""
+        if self.artifact_format == "mmap":
+            return self._latest_mmap_candidate()
+        versions = []
+        for name in os.listdir(self.directory):
+            match = _VERSIONED_MODEL.match(name)
+            if not match:
+                continue
+            version = match.group("version")
+            encoders_path = os.path.join(self.directory, f"{ENCODERS_PREFIX}-{version}.pkl")
+            if os.path.exists(encoders_path):
+                versions.append((version, os.path.join(self.directory, name), encoders_path))
+        if versions:
+            return max(versions, key=lambda candidate: _natural_key(candidate[0]))
+
+        model_path = os.path.join(self.directory, f"{MODEL_PREFIX}.pkl")
+        encoders_path = os.path.join(self.directory, f"{ENCODERS_PREFIX}.pkl")
+        if os.path.exists(model_path) and os.path.exists(encoders_path):
+            mtime = datetime.fromtimestamp(os.path.getmtime(model_path), timezone.utc)
+            return f"unversioned-{mtime.strftime('%Y%m%d%H%M%S')}", model_path, encoders_path
+        return None
+
+    def _latest_mmap_candidate(self):
+        versions = []
+        for name in os.listdir(self.directory):
+            match = _VERSIONED_MMAP.match(name)
+            path = os.path.join(self.directory, name)
+            if match and os.path.exists(os.path.join(path, HEADER_NAME)):
+                versions.append((match.group("version"), path, None))
+        if versions:
+            return max(versions, key=lambda candidate: _natural_key(candidate[0]))
+
+        path = os.path.join(self.directory, f"{MODEL_PREFIX}.forest")
+        header_path = os.path.join(path, HEADER_NAME)
+        if os.path.exists(header_path):
+            mtime = datetime.fromtimestamp(os.path.getmtime(header_path), timezone.utc)
+            return f"unversioned-{mtime.strftime('%Y%m%d%H%M%S')}", path, None
+        return None
+
+    def check(self) -> bool:
+        """Load, validate and activate the newest pair if it differs from the active one."""
+        with self._lock:
+            signature = None
+            try:
+                candidate = self.latest_candidate()
+                if candidate is None:
+                    return False
+                version, model_path, encoders_path = candidate
+                if encoders_path is None:
+                    signature = _file_signature(os.path.join(model_path, HEADER_NAME))
+                else:
+                    signature = _file_signature(model_path, encoders_path)
+                if self.active is not None and self.active.signature == signature:
+                    return False
+                if signature in self._failed:
+                    return False
+
+                logger.info(f"Loading model version {version}")
+                if encoders_path is None:
+                    bundle = ModelBundle.load_mmap(version, model_path, signature)
+                else:
+                    bundle = ModelBundle.load(version, model_path, encoders_path, signature)
+                bundle.validate()
+            except Exception as e:
+                if signature is not None:
+                    self._failed.add(signature)
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.error(f"Rejected model candidate: {self.last_error}")
+                return False
+
+            previous = self.active.version if self.active else None
+            self.active = bundle
+            self.swaps += 1
+            self.last_error = None
+            logger.info(f"Activated model version {version} (previous: {previous})")
+
+        for callback in self._listeners:
+            try:
+                callback(bundle)
+            except Exception as e:
+                logger.error(f"Model swap listener failed: {e}")
+        return True
+
+    def start(self) -> None:
+        if self.poll_interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.check()
+
+    def status(self) -> dict:
+        return {
+            "active": self.active.describe() if self.active else None,
+            "swaps": self.swaps,
+            "watching": self._thread is not None and self._thread.is_alive(),
+            "poll_interval": self.poll_interval,
+            "artifact_format": self.artifact_format,
+            "last_error": self.last_error,
+        }
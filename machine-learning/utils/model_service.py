@@ -0,0 +1,104 @@
+"""
+Lazily initialized models behind the API.
+
+Importing the app no longer loads anything: the registry's first check (which
+unpickles the forest and so imports sklearn in pickle mode) and its watcher
+thread start on the first request that needs a model, or from warmup().
+Concurrent first requests wait on one lock, so the model is loaded once.
+
+The service also owns the older 3-feature pipeline behind routes.py
+(models/stress_model.pkl), loaded with joblib on first use only.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# WARMUP values and what they load
+WARMUP_TARGETS = {
+    "model": ("model",),
+    "all": ("model", "legacy", "cv"),
+}
+
+
+class ModelService:
+    def __init__(self, registry, legacy_path: str = None):
+        self.registry = registry
+        self.legacy_path = legacy_path
+        self.started = False
+        self.load_seconds = None
+        self._legacy = None
+        self._lock = threading.Lock()
+        self._legacy_lock = threading.Lock()
+
+    def start(self) -> None:
+        """Load the newest model version and start watching for new ones."""
+        if self.started:
+            return
+        with self._lock:
+            if self.started:
+                return
+            began = time.perf_counter()
+            self.registry.check()
+            self.registry.start()
+            self.load_seconds = time.perf_counter() - began
+            self.started = True
+        bundle = self.registry.active
+        if bundle is None:
+            logger.error(f"Error loading model or encoders: {self.registry.last_error}")
+        else:
+            logger.info(f"Loaded model version {bundle.version} in {self.load_seconds * 1000:.0f} ms")
+            logger.info(f"Available mood classes: {bundle.mood_classes}")
+            logger.info(f"Available face emotion classes: {bundle.face_emotion_classes}")
+
+    def bundle(self):
+        """The active ModelBundle, loading it on first use; None if no model could be loaded."""
+        if not self.started:
+            self.start()
+        return self.registry.active
+
+    def legacy_model(self):
+        """The 3-feature (mood, sleep, workload) pipeline, loaded on first use."""
+        if self._legacy is None:
+            with self._legacy_lock:
+                if self._legacy is None:
+                    import joblib
+
+                    if self.legacy_path is None or not os.path.exists(self.legacy_path):
+                        raise FileNotFoundError(f"legacy model not found: {self.legacy_path}")
+                    self._legacy = joblib.load(self.legacy_path)
+        return self._legacy
+
+    def warmup(self, targets) -> None:
+        """Load the given targets ("model", "legacy", "cv") ahead of the first request."""
+        began = time.perf_counter()
+        for target in targets:
+            try:
+                if target == "model":
+                    self.start()
+                elif target == "legacy":
+                    self.legacy_model()
+                elif target == "cv":
+                    from utils.cv_utils import detector_pool
+
+                    with detector_pool.acquire():
+                        pass
+                else:
+                    raise ValueError(f"unknown warmup target '{target}'")
+            except Exception as e:
+                logger.error(f"Warmup of {target} failed: {e}")
+        logger.info(f"Warmup of {', '.join(targets)} done in {(time.perf_counter() - began) * 1000:.0f} ms")
+
+    def warmup_in_background(self, targets) -> threading.Thread:
+        thread = threading.Thread(target=self.warmup, args=(tuple(targets),), name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> dict:
+        return {
+            "started": self.started,
+            "load_seconds": self.load_seconds,
+            "legacy_loaded": self._legacy is not None,
+        }
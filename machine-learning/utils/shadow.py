@@ -0,0 +1,263 @@
+"""
+Shadow evaluation of candidate models on live traffic, off the request path.
+
+Every shadow candidate is a model directory of its own (MODEL_DIR/shadow/<name>
+by default) watched by its own ModelRegistry, so candidates are published,
+validated and hot-reloaded exactly like the primary model. A request pays for
+`offer()` only: one random draw against `sample_rate` and, for the sampled
+ones, a put_nowait of its inputs, encoded rows and primary predictions on a
+bounded queue. When the queue is full the sample is dropped and counted;
+requests never wait for a shadow.
+
+Background threads drain the queue in batches of up to `batch_rows` rows,
+waiting up to `batch_wait_ms` for one to fill. Each batch is encoded with
+every shadow's own FeatureSpec (its label encoders may differ from the
+primary's), scored by the shadow and, for the latency comparison, by the
+primary forest again under the same conditions. Predictions are compared as
+decoded stress levels: agreement overall and per primary class, the full
+primary x shadow table, and per-row scoring time of both.
+
+Counts, scoring errors included, start over whenever the primary or the
+shadow changes version, so a report always describes one pair.
+"""
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+import numpy as np
+
+from utils.model_registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+
+def discover_shadows(directory: str) -> list:
+    """(name, path) of every subdirectory of `directory`, the shadow candidates."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        (name, os.path.join(directory, name)) for name in os.listdir(directory)
+        if not name.startswith(".") and os.path.isdir(os.path.join(directory, name))
+    )
+
+
+def _percentiles(values) -> dict:
+    values = np.array(values)
+    if not len(values):
+        return {"p50": None, "p99": None}
+    return {"p50": float(np.percentile(values, 50)), "p99": float(np.percentile(values, 99))}
+
+
+class ShadowStats:
+    """Comparison counts of one shadow against the primary, for one pair of versions."""
+
+    def __init__(self, window: int = 10000):
+        self.window = window
+        self._lock = threading.Lock()
+        self.reset(None, None)
+
+    def reset(self, primary_version, shadow_version) -> None:
+        self.primary_version = primary_version
+        self.shadow_version = shadow_version
+        self.since = time.time()
+        self.rows = 0
+        self.agreed = 0
+        self.pairs = Counter()
+        self.errors = 0
+        self.last_error = None
+        # Microseconds per row of forest.predict on the same batches
+        self.primary_us = deque(maxlen=self.window)
+        self.shadow_us = deque(maxlen=self.window)
+
+    def record(self, primary_version, shadow_version, primary_labels, shadow_labels,
+               primary_us: float, shadow_us: float) -> None:
+        pairs = Counter(zip(primary_labels, shadow_labels))
+        with self._lock:
+            if (primary_version, shadow_version) != (self.primary_version, self.shadow_version):
+                self.reset(primary_version, shadow_version)
+            self.rows += len(primary_labels)
+            self.agreed += sum(count for (p, s), count in pairs.items() if p == s)
+            self.pairs.update(pairs)
+            self.primary_us.append(primary_us)
+            self.shadow_us.append(shadow_us)
+
+    def record_error(self, primary_version, shadow_version, error: str) -> None:
+        with self._lock:
+            if (primary_version, shadow_version) != (self.primary_version, self.shadow_version):
+                self.reset(primary_version, shadow_version)
+            self.errors += 1
+            self.last_error = error
+
+    def report(self) -> dict:
+        with self._lock:
+            pairs = dict(self.pairs)
+            rows, agreed = self.rows, self.agreed
+            errors, last_error = self.errors, self.last_error
+            primary_us, shadow_us = _percentiles(self.primary_us), _percentiles(self.shadow_us)
+            versions = {"primary_version": self.primary_version, "version": self.shadow_version}
+            since = datetime.fromtimestamp(self.since, timezone.utc).isoformat()
+        per_class = {}
+        for (p, s), count in sorted(pairs.items()):
+            entry = per_class.setdefault(p, {"rows": 0, "agreement": 0.0, "shadow_predicted": {}})
+            entry["rows"] += count
+            entry["shadow_predicted"][s] = count
+        for p, entry in per_class.items():
+            entry["agreement"] = entry["shadow_predicted"].get(p, 0) / entry["rows"]
+        return {
+            **versions,
+            "since": since,
+            "rows": rows,
+            "agreement": agreed / rows if rows else None,
+            "errors": errors,
+            "last_error": last_error,
+            # Keyed by the primary's prediction; shadow_predicted is that row of the confusion table
+            "per_class": per_class,
+            "latency_us_per_row": {
+                "primary": primary_us,
+                "shadow": shadow_us,
+                "p50_ratio": shadow_us["p50"] / primary_us["p50"] if primary_us["p50"] else None,
+            },
+        }
+
+
+class Shadow:
+    def __init__(self, name: str, directory: str, poll_interval: float, artifact_format: str, window: int):
+        self.name = name
+        self.directory = directory
+        self.registry = ModelRegistry(directory, poll_interval=poll_interval, artifact_format=artifact_format)
+        self.stats = ShadowStats(window)
+
+
+class ShadowEvaluator:
+    def __init__(self, shadows: list, sample_rate: float = 0.1, workers: int = 1, max_pending: int = 1000,
+                 batch_rows: int = 256, batch_wait_ms: float = 500.0, poll_interval: float = 5.0,
+                 artifact_format: str = "pickle", window: int = 10000):
+        self.shadows = [Shadow(name, directory, poll_interval, artifact_format, window) for name, directory in shadows]
+        self.sample_rate = sample_rate
+        self.workers = workers
+        self.batch_rows = batch_rows
+        self.batch_wait = batch_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._random = random.random
+        self._threads = []
+        self._lock = threading.Lock()
+        self.started = False
+        self.dropped = 0
+        self.scored = 0
+
+    def offer(self, bundle, items: list, X: np.ndarray, preds: np.ndarray) -> None:
+        """Maybe queue one request's inputs and primary predictions for the shadows. Never blocks."""
+        if self._random() >= self.sample_rate:
+            return
+        if not self.started:
+            self.start()
+        try:
+            self._queue.put_nowait((bundle, items, X, preds))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def start(self) -> None:
+        """Start the workers; the first one loads the shadows, so offer() doesn't wait for it."""
+        with self._lock:
+            if self.started:
+                return
+            for n in range(self.workers):
+                thread = threading.Thread(target=self._work, args=(n == 0,), name=f"shadow-{n}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self.started = True
+
+    def stop(self) -> None:
+        for shadow in self.shadows:
+            shadow.registry.stop()
+        # Unscored samples are dropped, so the sentinels can't block on a full queue
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        for _ in self._threads:
+            self._queue.put(None)
+
+    def _work(self, load: bool) -> None:
+        if load:
+            for shadow in self.shadows:
+                shadow.registry.check()
+                shadow.registry.start()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            rows = len(item[1])
+            # Wait for a fuller batch: forest.predict costs about the same for 1 row as for 100
+            deadline = time.perf_counter() + self.batch_wait
+            while rows < self.batch_rows:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+                rows += len(item[1])
+            # A model swap mid-batch leaves items of two primary versions; score them apart
+            for bundle in {id(b): b for b, _, _, _ in batch}.values():
+                self._score(bundle, [entry for entry in batch if entry[0] is bundle])
+
+    def _score(self, primary, batch: list) -> None:
+        items = [item for _, entry_items, _, _ in batch for item in entry_items]
+        X = np.vstack([X for _, _, X, _ in batch])
+        preds = np.concatenate([preds for _, _, _, preds in batch])
+        started = time.perf_counter()
+        primary.forest.predict(X)
+        primary_us = (time.perf_counter() - started) / len(items) * 1e6
+        primary_labels = primary.spec.decode(preds).tolist()
+        for shadow in self.shadows:
+            bundle = shadow.registry.active
+            if bundle is None:
+                continue
+            try:
+                X_shadow, _ = bundle.spec.encode_records(items)
+                started = time.perf_counter()
+                shadow_preds = bundle.forest.predict(X_shadow)
+                shadow_us = (time.perf_counter() - started) / len(items) * 1e6
+                shadow_labels = bundle.spec.decode(shadow_preds).tolist()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                shadow.stats.record_error(primary.version, bundle.version, error)
+                logger.error(f"Shadow {shadow.name} failed: {error}")
+                continue
+            shadow.stats.record(primary.version, bundle.version, primary_labels, shadow_labels, primary_us, shadow_us)
+        with self._lock:
+            self.scored += len(items)
+
+    def _stats_report(self, shadow: Shadow) -> dict:
+        report = shadow.stats.report()
+        # A version that failed to load never scores, so its error is the registry's
+        report["last_error"] = report["last_error"] or shadow.registry.last_error
+        return report
+
+    def report(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "workers": self.workers,
+            "pending": self._queue.qsize(),
+            "scored_rows": self.scored,
+            "dropped_requests": self.dropped,
+            "shadows": {
+                shadow.name: {
+                    "directory": shadow.directory,
+                    "loaded": shadow.registry.active is not None,
+                    "trees": shadow.registry.active.forest.n_trees if shadow.registry.active else None,
+                    **self._stats_report(shadow),
+                }
+                for shadow in self.shadows
+            },
+        }